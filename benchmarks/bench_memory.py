@@ -0,0 +1,106 @@
+# Check that the staged pipeline (qr_pipeline) runs in flat memory: stream synthetic records
+# through every stage, and report the peak traced Python memory (tracemalloc) of each tenth
+# of the input, along with the process's RSS. The peaks of the later windows must not grow
+# past the first full one; the script exits with 1 if they do.
+#
+# Every record is a new payload and is validated, formatted, rasterized and saved. Encoding a
+# QR code takes milliseconds (tens of them under tracemalloc), so by default the encode
+# stage returns one small precomputed matrix instead: a million records then take about
+# half an hour. --encode real encodes every payload, for shorter runs.
+#
+# Usage:
+#   python benchmarks/bench_memory.py [--records 1000000] [--windows 10] [-o badges.tar]
+#   python benchmarks/bench_memory.py --records 2000 --encode real
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import qr_archive
+import qr_batch
+import qr_engine
+import qr_metrics
+import qr_pipeline
+from synthetic import synthetic_records
+
+# Allowed growth of a window's peak over the reference window
+TOLERANCE = 1.10
+
+
+def current_rss():
+    """Resident set size in bytes, where /proc is available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def stub_encoder():
+    """An encode function for qr_pipeline.Pipeline: the same version 1 matrix for every payload"""
+    matrix = qr_batch.get_matrix("STUB")
+    return lambda payload, error_correction, optimize: matrix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the staged pipeline runs in flat memory.")
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--encode', choices=('stub', 'real'), default='stub',
+                        help="use one precomputed matrix, or encode every payload (default: stub)")
+    parser.add_argument('--windows', type=int, default=10, help="report the memory peak this many times")
+    parser.add_argument('--format', dest='qr_format', choices=qr_engine.FORMATS, default='vcard')
+    parser.add_argument('--box-size', type=int, default=2, help="small by default, to keep the run short")
+    parser.add_argument('--buffer', action='append', metavar='STAGE=SIZE', help="see qr_batch.py --buffer")
+    parser.add_argument('-o', '--output', help="also write the codes here (archives hold their manifest in "
+                                               "memory up to 8 MB, and a .zip a small entry per member)")
+    args = parser.parse_args(argv)
+
+    options = {'qr_format': args.qr_format, 'box_size': args.box_size, 'palette': True}
+    encode = stub_encoder() if args.encode == 'stub' else None
+    pipeline = qr_pipeline.Pipeline(synthetic_records(args.records, 2), options,
+                                    qr_pipeline.parse_buffers(args.buffer), encode=encode)
+    window = max(1, args.records // args.windows)
+    sink = qr_archive.open_sink(args.output) if args.output else None
+
+    tracemalloc.start()
+    start = last = time.perf_counter()
+    peaks = []
+    print(f"{'records':>10} {'peak MB':>8} {'RSS MB':>7} {'rec/s':>7}")
+    for count, result in enumerate(pipeline, 1):
+        if sink is not None and result.error is None:
+            sink.write(result.record_id, f"{result.record_id}.png", result.data, result.payload_hash,
+                       result.version)
+        del result
+        if count % window == 0 or count == args.records:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            peaks.append(peak)
+            now = time.perf_counter()
+            rss = current_rss()
+            print(f"{count:>10} {peak / 1e6:>8.2f} {rss / 1e6 if rss else float('nan'):>7.1f} "
+                  f"{window / (now - last):>7.0f}", flush=True)
+            last = now
+    tracemalloc.stop()
+    if sink is not None:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    peak_rss = qr_metrics.peak_rss()
+    print(f"{args.records} records in {elapsed:.1f}s, peak RSS "
+          f"{peak_rss / 1e6 if peak_rss else float('nan'):.1f} MB")
+    for name, stage in pipeline.stages().items():
+        print(f"  {name:10} queue {stage['peak']}/{stage['buffer']}, {stage['blocked']:.1f}s waiting on the next stage")
+
+    # The first window includes start-up (imports, warming up); compare against the second
+    reference = peaks[1] if len(peaks) > 2 else peaks[0]
+    growth = max(peaks[1:] or peaks) / reference
+    print(f"largest window peak is {growth:.2f}x the reference window")
+    return 0 if growth <= TOLERANCE else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# Compare RGB output with 1-bit/palette output: PNG size and memory.
+#
+# Usage:
+#   python benchmarks/bench_palette.py [--count 200] [--fill black --back "#f0f0f0"]
+import argparse
+import os
+import resource
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qr_engine
+from bench_raster import VERSIONS, matrix_for_version
+
+# Pillow stores RGB/RGBA pixels in 4 bytes and "1"/"P" pixels in 1 byte
+BYTES_PER_PIXEL = {"1": 1, "P": 1, "RGB": 4, "RGBA": 4}
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def hold_images(count, version, colors, palette):
+    """Child process: keep count images in memory and print the peak RSS growth in KiB"""
+    matrix = matrix_for_version(version)
+    baseline = peak_rss_kb()
+    images = [qr_engine.rasterize(matrix, colors, palette=palette) for _ in range(count)]
+    print(peak_rss_kb() - baseline, len(images))
+
+
+def measure_peak(count, version, colors, palette):
+    command = [sys.executable, os.path.abspath(__file__), '--child', str(version), '--count', str(count),
+               '--fill', colors["fill"], '--back', colors["back"]]
+    if palette:
+        command.append('--palette')
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return int(output.split()[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare RGB output with 1-bit/palette output: PNG size and memory.")
+    parser.add_argument('--count', type=int, default=200, help="images held in memory for the peak test")
+    parser.add_argument('--fill', default=qr_engine.DEFAULT_COLORS['fill'])
+    parser.add_argument('--back', default=qr_engine.DEFAULT_COLORS['back'])
+    parser.add_argument('--palette', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    colors = {"fill": args.fill, "back": args.back}
+
+    if args.child:
+        hold_images(args.count, args.child, colors, args.palette)
+        return
+
+    print(f"colors: {colors['fill']} on {colors['back']}, {args.count} images held for the peak test")
+    print(f"{'version':>7} {'mode':>5} {'PNG bytes':>10} {'pixel bytes':>12} {'peak RSS KiB':>13}")
+    for version in VERSIONS:
+        matrix = matrix_for_version(version)
+        rows = []
+        for palette in (False, True):
+            image = qr_engine.rasterize(matrix, colors, palette=palette)
+            png = len(qr_engine.image_to_png(image))
+            pixels = image.width * image.height * BYTES_PER_PIXEL[image.mode]
+            peak = measure_peak(args.count, version, colors, palette)
+            rows.append((png, pixels, peak))
+            print(f"{version:>7} {image.mode:>5} {png:>10} {pixels:>12} {peak:>13}")
+        (png_rgb, px_rgb, peak_rgb), (png_pal, px_pal, peak_pal) = rows
+        print(f"{'':>7} {'saved':>5} {1 - png_pal / png_rgb:>10.0%} {1 - px_pal / px_rgb:>12.0%} "
+              f"{1 - peak_pal / max(peak_rgb, 1):>13.0%}")
+
+
+if __name__ == "__main__":
+    main()
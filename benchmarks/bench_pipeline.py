@@ -0,0 +1,128 @@
+# Benchmark every stage of the generation pipeline over synthetic record sets and emit
+# the results as JSON, so runs on different commits can be compared.
+#
+# Stages: validate (normalize_record), format (create_vcard_format/create_text_format),
+# encode (qr_engine.encode_matrix), rasterize (qr_engine.rasterize), display (convert('RGB')
+# + LANCZOS resize of the image to 300x300, the app's display path before qr_display),
+# display_view (the 300x300 view drawn from the matrix by qr_display, as in display_qr_code)
+# and save (PNG). Stage names are never reused for different work, so results stay
+# comparable across commits.
+#
+# Usage:
+#   python benchmarks/bench_pipeline.py --records 50,200 --custom-fields 0,5,25 -o results.json
+#   python benchmarks/bench_pipeline.py -o new.json --compare results.json
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+import qr_display
+import qr_engine
+from synthetic import synthetic_records
+
+DISPLAY_SIZE = 300
+
+
+def timed(function, items):
+    """Run function over items and return (outputs, seconds)"""
+    start = time.perf_counter()
+    outputs = [function(item) for item in items]
+    return outputs, time.perf_counter() - start
+
+
+def run_case(count, custom_fields, qr_format, seed):
+    """Time each stage separately over one record set; each stage gets the previous stage's outputs"""
+    records = list(synthetic_records(count, custom_fields, seed))
+    colors = qr_engine.DEFAULT_COLORS
+    timings = {}
+
+    user_infos, timings["validate"] = timed(qr_engine.normalize_record, records)
+    payloads, timings["format"] = timed(lambda info: qr_engine.create_payload(info, qr_format), user_infos)
+    matrices, timings["encode"] = timed(qr_engine.encode_matrix, payloads)
+    images, timings["rasterize"] = timed(lambda m: qr_engine.rasterize(m, colors), matrices)
+    _, timings["display"] = timed(
+        lambda image: image.convert('RGB').resize((DISPLAY_SIZE, DISPLAY_SIZE), Image.Resampling.LANCZOS), images)
+    _, timings["display_view"] = timed(lambda m: qr_display.render_view(m, colors, DISPLAY_SIZE), matrices)
+    _, timings["save"] = timed(lambda image: qr_engine.save_png(image, io.BytesIO()), images)
+
+    versions = [m.version for m in matrices]
+    return [{
+        "records": count,
+        "custom_fields": custom_fields,
+        "format": qr_format,
+        "stage": stage,
+        "seconds": round(seconds, 6),
+        "us_per_record": round(seconds / count * 1e6, 2),
+        "mean_version": round(sum(versions) / len(versions), 2),
+    } for stage, seconds in timings.items()]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print the per-stage change against an earlier results file"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r["records"], r["custom_fields"], r["format"], r["stage"]): r for r in json.load(f)["results"]}
+    print(f"{'records':>7} {'custom':>6} {'format':>6} {'stage':>12} {'before us':>10} {'after us':>10} {'change':>7}",
+          file=sys.stderr)
+    for r in results:
+        old = baseline.get((r["records"], r["custom_fields"], r["format"], r["stage"]))
+        if old is None:
+            continue
+        change = r["us_per_record"] / old["us_per_record"] - 1 if old["us_per_record"] else 0
+        print(f"{r['records']:>7} {r['custom_fields']:>6} {r['format']:>6} {r['stage']:>12} "
+              f"{old['us_per_record']:>10.1f} {r['us_per_record']:>10.1f} {change:>+7.0%}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the generation "
+                                                 "pipeline and emit the results as JSON.")
+    parser.add_argument('--records', default="50,200", help="comma-separated record set sizes")
+    parser.add_argument('--custom-fields', default="0,5,25", help="comma-separated custom field counts")
+    parser.add_argument('--formats', default="vcard,text")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="write JSON here instead of stdout")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    results = []
+    for qr_format in args.formats.split(','):
+        for custom_fields in map(int, args.custom_fields.split(',')):
+            for count in map(int, args.records.split(',')):
+                results.extend(run_case(count, custom_fields, qr_format, args.seed))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
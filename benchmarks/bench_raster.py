@@ -0,0 +1,54 @@
+# Compare the NumPy rasterizer with qrcode's per-module drawing.
+#
+# Usage:
+#   python benchmarks/bench_raster.py [--repeat 20] [--box-size 10]
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import qrcode
+import qr_engine
+import qr_raster
+
+VERSIONS = (5, 15, 40)
+
+
+def matrix_for_version(version):
+    """Encode a small payload at a fixed version"""
+    qr = qrcode.QRCode(version=version, error_correction=qr_engine.DEFAULT_ERROR_CORRECTION, border=0)
+    qr.add_data("benchmark")
+    qr.make(fit=False)
+    return qr_engine.QRMatrix(qr.modules, version, qr.error_correction)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the NumPy rasterizer with qrcode's per-module drawing.")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--box-size', type=int, default=qr_engine.DEFAULT_BOX_SIZE)
+    args = parser.parse_args(argv)
+
+    if not qr_raster.available():
+        sys.exit("NumPy is not installed")
+
+    colors = qr_engine.DEFAULT_COLORS
+    print(f"{'version':>7} {'modules':>7} {'reference ms':>13} {'numpy ms':>9} {'speedup':>8}")
+    for version in VERSIONS:
+        matrix = matrix_for_version(version)
+        reference = qr_engine.rasterize_reference(matrix, colors, args.box_size)
+        vectorized = qr_raster.rasterize(matrix, colors, args.box_size, qr_engine.DEFAULT_BORDER)
+        assert reference.tobytes() == vectorized.tobytes(), "rasterizers disagree"
+
+        ref_time = min(timeit.repeat(lambda: qr_engine.rasterize_reference(matrix, colors, args.box_size),
+                                     number=1, repeat=args.repeat))
+        np_time = min(timeit.repeat(lambda: qr_raster.rasterize(matrix, colors, args.box_size,
+                                                                qr_engine.DEFAULT_BORDER),
+                                    number=1, repeat=args.repeat))
+        print(f"{version:>7} {matrix.size:>7} {ref_time * 1000:>13.2f} {np_time * 1000:>9.2f} "
+              f"{ref_time / np_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
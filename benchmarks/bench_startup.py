@@ -0,0 +1,93 @@
+# Cold-start report: an `-X importtime` breakdown of the app and CLI modules, plus the
+# app's own time-to-first-paint and time-to-ready (needs a display).
+#
+# Usage:
+#   python benchmarks/bench_startup.py [--top 15] [--json]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ("qr_engine", "qr_batch", "qr_server", "qr_code_genrator")
+
+
+def import_times(module):
+    """
+    Import module in a fresh interpreter with -X importtime; return (total_us, rows), where
+    total_us is the module's cumulative import time, or (None, error)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                     "depth": depth})
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    # The module's own row already includes everything it imports (interpreter start-up
+    # imports are listed separately and left out)
+    total = next(row["cumulative_us"] for row in rows if row["module"] == module and row["depth"] == 0)
+    return total, rows
+
+
+def gui_times():
+    """Run the app with --startup-report; returns its timings or an error message"""
+    start = time.perf_counter()
+    try:
+        result = subprocess.run([sys.executable, 'qr_code_genrator.py', '--startup-report'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        return {"error": "timed out"}
+    if result.returncode != 0:
+        return {"error": (result.stderr.strip().splitlines() or ["failed"])[-1]}
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process"] = round(time.perf_counter() - start, 4)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the cold-start import times and the "
+                                                 "app's time to first paint and to ready.")
+    parser.add_argument('--top', type=int, default=10, help="slowest imports listed per module")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = {"imports": {}, "gui": gui_times()}
+    for module in MODULES:
+        total, rows = import_times(module)
+        if total is None:
+            report["imports"][module] = {"error": rows}
+            continue
+        slowest = sorted((row for row in rows if row["depth"] == 1), key=lambda r: -r["cumulative_us"])
+        report["imports"][module] = {"total_ms": round(total / 1000, 1),
+                                     "slowest": [(r["module"], round(r["cumulative_us"] / 1000, 1))
+                                                 for r in slowest[:args.top]]}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for module, info in report["imports"].items():
+        if "error" in info:
+            print(f"{module}: import failed ({info['error']})")
+            continue
+        print(f"{module}: {info['total_ms']} ms")
+        for name, ms in info["slowest"]:
+            print(f"    {ms:>8.1f} ms  {name}")
+    gui = report["gui"]
+    if "error" in gui:
+        print(f"app: not measured ({gui['error']})")
+    else:
+        print(f"app: imports {gui['imports'] * 1000:.0f} ms, first paint {gui['first_paint'] * 1000:.0f} ms, "
+              f"ready {gui['ready'] * 1000:.0f} ms, process exit {gui['process'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
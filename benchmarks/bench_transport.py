@@ -0,0 +1,77 @@
+# Compare the two ways pool workers hand rendered images back to the parent: pickled
+# results (the default) and shared-memory slots (qr_shm). The records cycle through a few
+# distinct payloads and the workers' render caches serve the repeats, so after warming up
+# the workers do little besides sending images and the transfer itself is what is timed.
+# Reports records/s, MB/s and the parent's CPU time per 1000 records; the parent is the
+# process that becomes the bottleneck.
+#
+# Usage:
+#   python benchmarks/bench_transport.py [--records 20000] [--workers 4] [--box-size 10]
+import argparse
+import itertools
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import qr_batch
+import qr_shm
+from synthetic import synthetic_records
+
+TRANSPORTS = ("pickle", "shm")
+
+
+def cycled_records(count, distinct):
+    base = list(synthetic_records(distinct, 2))
+    return (dict(record, id=f"rec{index:08d}") for index, record in zip(range(count), itertools.cycle(base)))
+
+
+def run(transport, args):
+    """Render every record and write it to /dev/null; returns (records/s, MB/s, parent CPU ms per 1000)"""
+    records = cycled_records(args.records, args.distinct)
+    options = {'box_size': args.box_size, 'image_format': args.image_format}
+    if transport == "shm":
+        results = qr_shm.render_records(records, options, args.workers, args.chunk_size,
+                                         cache_options={'max_items': args.distinct}, slot_bytes=args.slot_kb * 1024,
+                                         min_bytes=args.min_kb * 1024)
+    else:
+        results = qr_batch.render_records(records, options, args.workers, args.chunk_size,
+                                          cache_options={'max_items': args.distinct})
+    warmup = max(1, args.records // 10) # Until every worker's cache is warm
+    total = 0
+    with open(os.devnull, 'wb') as out:
+        for count, result in enumerate(results, 1):
+            out.write(result.data)
+            if count == warmup:
+                start, cpu, total = time.perf_counter(), time.process_time(), 0
+            total += len(result.data)
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    measured = args.records - warmup
+    return measured / elapsed, total / elapsed / 1e6, cpu / measured * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare pickled and shared-memory transport "
+                                                 "of rendered images from pool workers.")
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--distinct', type=int, default=20, help="distinct payloads (default: 20)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--box-size', type=int, default=10, help="larger boxes make larger images")
+    parser.add_argument('--slot-kb', type=int, default=qr_shm.DEFAULT_SLOT_BYTES // 1024, help="shm slot size in kB")
+    parser.add_argument('--min-kb', type=int, default=0,
+                        help="smallest image sent through shm, in kB (default: 0, all of them; qr_batch uses "
+                             f"{qr_shm.DEFAULT_MIN_BYTES // 1024})")
+    parser.add_argument('--output-format', dest='image_format', choices=('png', 'svg', 'pdf'), default='png')
+    args = parser.parse_args(argv)
+
+    print(f"{'transport':>9} {'records/s':>10} {'MB/s':>7} {'parent CPU ms/1000':>19}")
+    for transport in TRANSPORTS:
+        rate, mb, cpu = run(transport, args)
+        print(f"{transport:>9} {rate:>10.0f} {mb:>7.1f} {cpu:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
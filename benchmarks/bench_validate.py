@@ -0,0 +1,85 @@
+# Compare record-at-a-time validation (qr_engine.normalize_record) with the column-wise
+# bulk validator (qr_validate) in records per second. A share of the records gets broken
+# fields so the error paths are exercised too; both validators must agree on the results.
+# Each validator runs --repeat times, alternating, and its best time counts.
+#
+# --block-size sets how many records each column pass covers, to check where the column
+# passes stop paying off.
+#
+# Usage:
+#   python benchmarks/bench_validate.py [--records 200000] [--invalid 0.05] [--block-size 4096]
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import qr_engine
+import qr_validate
+from synthetic import synthetic_records
+
+BROKEN_VALUES = {'name': "", 'phone': "12-34", 'whatsapp': "call me", 'email': "jane.doe@"}
+
+
+def make_records(count, invalid, seed=0):
+    """Synthetic records where about `invalid` of them have one or more bad fields"""
+    rng = random.Random(seed)
+    records = list(synthetic_records(count, 2, seed))
+    for record in records:
+        if rng.random() < invalid:
+            for key in rng.sample(sorted(BROKEN_VALUES), rng.randint(1, 2)):
+                record[key] = BROKEN_VALUES[key]
+    return records
+
+
+def per_record(records):
+    results = []
+    for record in records:
+        try:
+            results.append((qr_engine.normalize_record(record), []))
+        except qr_engine.RecordError as e:
+            results.append((None, [field for field, _ in e.errors]))
+    return results
+
+
+def bulk(records, block_size):
+    return [(user_info, [error.field for error in errors])
+            for _, _, user_info, errors in qr_validate.iter_validated(records, block_size)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark bulk record validation.")
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--invalid', type=float, default=0.05, help="share of records with bad fields")
+    parser.add_argument('--block-size', type=int, default=qr_validate.BLOCK_SIZE)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    records = make_records(args.records, args.invalid)
+    validators = {"per record": lambda: per_record(records),
+                  "column-wise": lambda: bulk(records, args.block_size)}
+    timings = dict.fromkeys(validators, float('inf'))
+    results = {}
+    for _ in range(args.repeat):
+        for name, validate in validators.items():
+            gc.collect()
+            start = time.perf_counter()
+            results[name] = validate()
+            timings[name] = min(timings[name], time.perf_counter() - start)
+    expected, actual = results["per record"], results["column-wise"]
+
+    if actual != expected:
+        raise SystemExit("The validators disagree")
+    invalid = sum(1 for user_info, _ in expected if user_info is None)
+    print(f"{args.records} records, {invalid} invalid")
+    for name, seconds in timings.items():
+        print(f"  {name:<12} {args.records / seconds:>12,.0f} records/s")
+    print(f"  speedup      {timings['per record'] / timings['column-wise']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Load test for qr_server.py: starts a local instance (unless --url is given), fires
+# concurrent keep-alive requests at it and reports latency percentiles and throughput.
+#
+# Usage:
+#   python benchmarks/load_test.py --requests 2000 --concurrency 32 --distinct 200 --workers 4
+#   python benchmarks/load_test.py --url http://127.0.0.1:8080
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request_targets(count, distinct):
+    """Build request paths; only `distinct` different records, so some requests repeat"""
+    for i in range(count):
+        n = i % distinct
+        yield "/qr?" + urlencode({'name': f"Load Test {n}", 'phone': f"+1555{n:07d}",
+                                  'email': f"user{n}@example.com", 'company': "PARMAGTEE"})
+
+
+async def fetch(reader, writer, host, target):
+    """Send one GET on an open connection and return (status, body length)"""
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status, length
+
+
+async def client(host, port, queue, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                target = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            status, _ = await fetch(reader, writer, host, target)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(host, port, args):
+    queue = asyncio.Queue()
+    for target in request_targets(args.requests, args.distinct):
+        queue.put_nowait(target)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, queue, latencies, errors) for _ in range(args.concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def wait_until_ready(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            await fetch(reader, writer, host, "/health")
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for qr_server.py: latency percentiles and throughput.")
+    parser.add_argument('--url', help="test a running server instead of starting one")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--distinct', type=int, default=100, help="number of different records requested")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="workers of the local server")
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = '127.0.0.1', free_port()
+        process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'qr_server.py'), '--port', str(port),
+                                    '--workers', str(args.workers)], stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_ready(host, port))
+        latencies, errors, elapsed = asyncio.run(run(host, port, args))
+    finally:
+        if process:
+            process.terminate() # The server shuts its worker pool down on SIGTERM
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    print(f"requests:    {len(latencies)} ({len(errors)} errors), concurrency {args.concurrency}, "
+          f"{args.distinct} distinct records")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} requests/s")
+    print(f"latency p50: {percentile(latencies, 0.50) * 1000:.1f} ms")
+    print(f"latency p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Reproducible synthetic records for the benchmarks.
+import random
+
+FIRST_NAMES = ("Adam", "Sara", "Omar", "Lina", "John", "Maria", "Wei", "Aisha", "Lucas", "Yuki")
+LAST_NAMES = ("Elsharkawy", "Smith", "Hassan", "Garcia", "Chen", "Müller", "Okafor", "Rossi")
+COMPANIES = ("PARMAGTEE", "Acme Corp", "Globex", "Initech", "Umbrella Ltd")
+TITLES = ("Engineer", "Sales Manager", "Designer", "Accountant", "Team Lead")
+
+
+def synthetic_record(rng, index, custom_fields=0):
+    """Build one record with every standard field filled and custom_fields extra fields"""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    user = f"{first}.{last}{index}".lower().encode("ascii", "ignore").decode()
+    phone = f"+20{rng.randint(1000000000, 1999999999)}"
+    return {
+        'id': f"emp{index:07d}",
+        'name': f"{first} {last}",
+        'job_title': rng.choice(TITLES),
+        'company': rng.choice(COMPANIES),
+        'phone': phone,
+        'whatsapp': phone if rng.random() < 0.5 else f"+20{rng.randint(1000000000, 1999999999)}",
+        'email': f"{user}@example.com",
+        'address': f"{rng.randint(1, 999)} Nile Street, Cairo",
+        'website': f"example.com/{user}",
+        'facebook': user,
+        'linkedin': user,
+        'custom_fields': {f"Field {n}": f"Value {rng.randint(0, 99999)}" for n in range(custom_fields)},
+    }
+
+
+def synthetic_records(count, custom_fields=0, seed=0):
+    """Yield count records; the same seed always gives the same records"""
+    rng = random.Random(seed)
+    for index in range(count):
+        yield synthetic_record(rng, index, custom_fields)
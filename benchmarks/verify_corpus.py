@@ -0,0 +1,225 @@
+# Decode-back verification over a reproducible corpus. Every case (a record plus output
+# options) is formatted, generated through the batch render path and decoded again with
+# qr_decode, which shares no code with qrcode; the payload must come back unchanged, with
+# no codeword needing correction. Some PNG cases carry a logo (see qr_style): those must
+# decode through error correction at the raised level. For cases that use the plain encoder
+# without a logo, the pixels of the generated PNG are also hashed and compared with the
+# reference qrcode path (QRCode.make_image), and the matrix cache's serialization must
+# round-trip. A faster encoder, rasterizer or writer is only safe once this passes.
+#
+# Usage:
+#   python benchmarks/verify_corpus.py [--records 2000] [--seed 0] [--workers 8]
+#   python benchmarks/verify_corpus.py --save-corpus corpus.jsonl   (then --corpus corpus.jsonl)
+import argparse
+import collections
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import qr_batch
+import qr_decode
+import qr_display
+import qr_engine
+import qr_style
+from synthetic import synthetic_records
+
+# Free-text values that stress escaping and multi-byte encoding
+TRICKY_TEXT = ("José Müller-Lüdenscheidt", "李小龍", "O'Brien; Jr.", "Ana, María", "Zoë \\ Back\\slash",
+               "Line one\nLine two", "😀 Smiley Ltd", "Ünïcödé, Inc.; Tést", "  padded  ")
+COLORS = ({"fill": "black", "back": "white"}, dict(qr_engine.DEFAULT_COLORS),
+          {"fill": "#003366", "back": "#ffffcc"}, {"fill": "#202020", "back": "transparent"})
+IMAGE_FORMATS = ("png", "png", "png", "svg", "pdf")
+LOGO_SCALES = (0.1, qr_style.DEFAULT_STYLE["logo_scale"], qr_style.MAX_LOGO_SCALE)
+
+
+def make_case(rng, index, record):
+    """Mutate a synthetic record and pick the output options of one case"""
+    for key in ('name', 'company', 'job_title', 'address'):
+        if rng.random() < 0.3:
+            record[key] = rng.choice(TRICKY_TEXT)
+    for key in ('whatsapp', 'website', 'facebook', 'linkedin', 'address'):
+        if rng.random() < 0.15:
+            record[key] = ""
+    if rng.random() < 0.1:
+        record['custom_fields']["Notes"] = "x" * rng.randint(100, 600) # Large versions
+    image_format = rng.choice(IMAGE_FORMATS)
+    logo = image_format == "png" and rng.random() < 0.25
+    return {
+        "case": index,
+        "record": record,
+        "qr_format": rng.choice(qr_engine.FORMATS),
+        "optimize": rng.random() < 0.3,
+        "error_correction": rng.choice(sorted(qr_engine.ERROR_CORRECTION_LEVELS)),
+        "colors": rng.choice(COLORS),
+        "box_size": rng.randint(1, 6),
+        "border": rng.randint(0, 4),
+        "palette": rng.random() < 0.5,
+        "image_format": image_format,
+        "logo_scale": rng.choice(LOGO_SCALES) if logo else None,
+    }
+
+
+def make_corpus(count, seed=0):
+    """Yield count cases; the same seed always gives the same corpus"""
+    rng = random.Random(seed)
+    for index, record in enumerate(synthetic_records(count, 2, seed)):
+        yield make_case(rng, index, record)
+
+
+def test_logo():
+    """A colored, partly transparent logo, drawn once per process into the temp directory"""
+    from PIL import Image, ImageDraw
+    path = os.path.join(tempfile.gettempdir(), f"qr_verify_logo_{os.getpid()}.png")
+    if not os.path.exists(path):
+        image = Image.new("RGBA", (240, 160), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+        draw.ellipse((0, 0, 239, 159), fill=(200, 30, 30, 255))
+        draw.rectangle((60, 50, 180, 110), fill=(20, 20, 20, 255))
+        image.save(path)
+    return path
+
+
+def pixel_hash(image):
+    return hashlib.sha256(image.convert("RGBA").tobytes()).hexdigest()
+
+
+def reference_image(payload, error_correction, colors, box_size, border):
+    """The code drawn by qrcode alone, with none of this app's encoding or drawing"""
+    import qrcode
+    qr = qrcode.QRCode(error_correction=error_correction, box_size=box_size, border=border)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.make_image(fill_color=colors["fill"], back_color=colors["back"]).get_image()
+
+
+def verify_case(case):
+    """Return a list of (check, message) problems for one case; empty if it passes"""
+    from PIL import Image
+    error_correction = qr_engine.ERROR_CORRECTION_LEVELS[case["error_correction"]]
+    logo_scale = case.get("logo_scale")
+    logo = test_logo() if logo_scale else None
+    try:
+        user_info = qr_engine.normalize_record(case["record"])
+        payload = qr_batch.create_payload(user_info, case["qr_format"], case["optimize"])
+        data, _, version = qr_batch.render_payload(
+            payload, case["colors"], error_correction, case["box_size"], case["border"], case["palette"],
+            case["optimize"], case["image_format"], logo=logo, logo_scale=logo_scale)
+    except Exception as e:
+        return [("generate", f"{type(e).__name__}: {e}")]
+    if logo:
+        error_correction = qr_style.logo_error_correction(error_correction, logo_scale)
+
+    problems = []
+    try:
+        # Codes without a logo must be perfect; a logo is read through error correction
+        decoded = qr_decode.read_bytes(data, correct=bool(logo))
+        if decoded.payload != payload:
+            problems.append(("decode", "the decoded payload differs"))
+        if decoded.error_correction != error_correction:
+            problems.append(("level", f"level {qr_decode.LEVEL_NAMES[decoded.error_correction]}, expected "
+                                      f"{qr_decode.LEVEL_NAMES[error_correction]}"))
+    except qr_decode.DecodeError as e:
+        problems.append(("decode", str(e)))
+
+    matrix = qr_batch.encode(payload, error_correction, case["optimize"])
+    if matrix.version != version:
+        problems.append(("version", f"generated version {version}, encoder version {matrix.version}"))
+    if qr_engine.QRMatrix.from_bytes(matrix.to_bytes()) != matrix:
+        problems.append(("matrix-cache", "the serialized matrix does not round-trip"))
+    try:
+        view = qr_display.render_view(matrix, case["colors"], 300, case["border"], (logo, logo_scale) if logo else None)
+        if qr_decode.decode_image(view, correct=bool(logo)) != payload:
+            problems.append(("display", "the decoded payload differs"))
+    except qr_decode.DecodeError as e:
+        problems.append(("display", str(e)))
+
+    if case["image_format"] == "png" and not case["optimize"] and not logo:
+        reference = reference_image(payload, error_correction, case["colors"], case["box_size"], case["border"])
+        if pixel_hash(reference) != pixel_hash(Image.open(io.BytesIO(data))):
+            problems.append(("pixels", "the PNG differs from qrcode's make_image()"))
+    return problems
+
+
+def verify_chunk(cases):
+    """Worker entry point: verify a list of cases, returning (case, problems) pairs"""
+    return [(case, verify_case(case)) for case in cases]
+
+
+def run(cases, workers, chunk_size=16):
+    """Yield (case, problems) for every case, verifying chunks in parallel with a bounded queue"""
+    chunks = qr_batch.iter_chunks(cases, chunk_size)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from verify_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(verify_chunk, chunk))
+            if len(pending) >= workers * 4:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a reproducible corpus of QR codes "
+                                                 "and verify that every one decodes back.")
+    parser.add_argument('--records', type=int, default=2000, help="corpus size (default: 2000)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus', help="verify the cases of this JSON-lines file instead")
+    parser.add_argument('--save-corpus', help="write the generated cases to this JSON-lines file and exit")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--report', help="write every failed case, with its problems, to this JSON-lines file")
+    args = parser.parse_args(argv)
+
+    if args.save_corpus:
+        with open(args.save_corpus, 'w', encoding='utf-8') as f:
+            for case in make_corpus(args.records, args.seed):
+                f.write(json.dumps(case, ensure_ascii=False) + '\n')
+        print(f"{args.records} cases written to {args.save_corpus}")
+        return 0
+    if args.corpus:
+        cases = (json.loads(line) for line in open(args.corpus, encoding='utf-8') if line.strip())
+    else:
+        cases = make_corpus(args.records, args.seed)
+
+    report = open(args.report, 'w', encoding='utf-8') if args.report else None
+    failures = collections.Counter()
+    total = failed = 0
+    start = time.perf_counter()
+    for case, problems in run(cases, args.workers):
+        total += 1
+        if not problems:
+            continue
+        failed += 1
+        for check, message in problems:
+            failures[check] += 1
+            if failures[check] <= 3:
+                print(f"case {case['case']} ({case['qr_format']}, {case['image_format']}, "
+                      f"optimize={case['optimize']}, logo={case.get('logo_scale')}): {check}: {message}",
+                      file=sys.stderr)
+        if report:
+            report.write(json.dumps({"case": case, "problems": problems}, ensure_ascii=False) + '\n')
+    elapsed = time.perf_counter() - start
+    if report:
+        report.close()
+
+    print(f"{total} cases verified in {elapsed:.1f}s ({total / elapsed:.1f} cases/s, {args.workers} workers), "
+          f"{failed} failed")
+    for check, count in sorted(failures.items()):
+        print(f"  {check}: {count}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# Output sinks for batch generation: a plain directory, or a ZIP/TAR archive that
+# images are streamed into straight from memory (no temporary image files).
+# Every sink also writes a manifest.jsonl with one line per image:
+#   {"record_id": ..., "member": ..., "payload_hash": ..., "version": ...}
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+
+MANIFEST_NAME = "manifest.jsonl"
+
+# The manifest is kept in memory up to this size, then spills to disk
+MANIFEST_SPOOL_BYTES = 8 * 1024 * 1024
+
+# ZIP members that are already compressed and are stored as they are; the rest (SVG, PDF
+# and the manifest) are deflated
+STORED_SUFFIXES = (".png",)
+
+
+class OutputSink:
+    """Base class for batch outputs. Use as a context manager."""
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    def write(self, record_id, member, data, payload_hash=None, version=None):
+        """Store one image and record it in the manifest"""
+        self._write_member(member, data)
+        entry = {"record_id": record_id, "member": member, "payload_hash": payload_hash, "version": version}
+        self._write_manifest_line(json.dumps(entry) + '\n')
+        self.count += 1
+
+    def _write_member(self, member, data):
+        raise NotImplementedError
+
+    def _write_manifest_line(self, line):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DirectorySink(OutputSink):
+    """Write each image as its own file in a directory"""
+    def __init__(self, path):
+        super().__init__(path)
+        os.makedirs(path, exist_ok=True)
+        self._manifest = open(os.path.join(path, MANIFEST_NAME), 'w', encoding='utf-8')
+
+    def _write_member(self, member, data):
+        with open(os.path.join(self.path, member), 'wb') as f:
+            f.write(data)
+
+    def _write_manifest_line(self, line):
+        self._manifest.write(line)
+
+    def close(self):
+        self._manifest.close()
+
+
+class ArchiveSink(OutputSink):
+    """Common manifest handling for archive sinks: the manifest is added as the last member"""
+    def __init__(self, path):
+        super().__init__(path)
+        self._manifest = tempfile.SpooledTemporaryFile(max_size=MANIFEST_SPOOL_BYTES)
+        self._closed = False
+
+    def _write_manifest_line(self, line):
+        self._manifest.write(line.encode('utf-8'))
+
+    def _add_manifest(self):
+        raise NotImplementedError
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._manifest.seek(0)
+        self._add_manifest()
+        self._manifest.close()
+
+
+class ZipSink(ArchiveSink):
+    """
+    Stream images into a ZIP archive. PNG data is already compressed, so PNGs are stored;
+    SVG, PDF and the manifest are deflated. Note that zipfile keeps one small entry per
+    member for the central directory.
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED, allowZip64=True)
+
+    def _write_member(self, member, data):
+        self._zip.writestr(self._info(member), data)
+
+    def _info(self, member):
+        info = zipfile.ZipInfo(member, date_time=time.localtime()[:6])
+        if not member.lower().endswith(STORED_SUFFIXES):
+            info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+    def _add_manifest(self):
+        with self._zip.open(self._info(MANIFEST_NAME), 'w', force_zip64=True) as f:
+            while True:
+                block = self._manifest.read(1024 * 1024)
+                if not block: break
+                f.write(block)
+        self._zip.close()
+
+
+class TarSink(ArchiveSink):
+    """Stream images into a TAR archive (optionally gzip/bz2/xz compressed)"""
+    def __init__(self, path, compression=''):
+        super().__init__(path)
+        self._tar = tarfile.open(path, f'w:{compression}')
+
+    def _add(self, member, fileobj, size):
+        info = tarfile.TarInfo(member)
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        self._tar.addfile(info, fileobj)
+        # tarfile remembers every member it wrote; that list is only needed when reading
+        self._tar.members.clear()
+
+    def _write_member(self, member, data):
+        self._add(member, io.BytesIO(data), len(data))
+
+    def _add_manifest(self):
+        self._manifest.seek(0, os.SEEK_END)
+        size = self._manifest.tell()
+        self._manifest.seek(0)
+        self._add(MANIFEST_NAME, self._manifest, size)
+        self._tar.close()
+
+
+# TAR suffixes and the compression each one means
+TAR_SUFFIXES = (((".tar",), ''), ((".tar.gz", ".tgz"), 'gz'), ((".tar.bz2",), 'bz2'), ((".tar.xz",), 'xz'))
+
+
+def is_archive(path):
+    """Return True if open_sink() would write this path as an archive rather than a directory"""
+    return path.lower().endswith(('.zip',) + tuple(s for suffixes, _ in TAR_SUFFIXES for s in suffixes))
+
+
+def open_sink(path):
+    """Pick the output sink from the path: .zip, .tar[.gz|.bz2|.xz] or a directory"""
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        return ZipSink(path)
+    for suffixes, compression in TAR_SUFFIXES:
+        if lower.endswith(suffixes):
+            return TarSink(path, compression)
+    return DirectorySink(path)
@@ -0,0 +1,497 @@
+# Headless batch generation of QR codes from CSV/JSONL files.
+#
+# Usage:
+#   python qr_batch.py employees.csv -o badges/
+#   python qr_batch.py employees.jsonl -o badges/ --format text --fill "#003366" --back white
+#   python qr_batch.py employees.csv -o badges/ --workers 8 --chunk-size 128 --unordered
+#   python qr_batch.py employees.csv -o badges.zip
+#   python qr_batch.py employees.csv -o badges/ --output-format svg
+#   python qr_batch.py employees.csv -o badges/ --incremental   (only re-renders changed records)
+#   python qr_batch.py huge.csv -o badges.tar --pipeline         (staged, memory-bounded, see qr_pipeline)
+#   python qr_batch.py employees.csv -o badges/ --preset acme    (saved colors, sizes and logo, see qr_style)
+import argparse
+import collections
+import csv
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import qr_archive
+import qr_cache
+import qr_engine
+import qr_metrics
+import qr_style
+import qr_validate
+import qr_vector
+
+# Columns used to name the output files, in order of preference
+ID_FIELDS = ('id', 'record_id')
+
+# Outcome of rendering one record: PNG bytes on success, an error message otherwise.
+# metrics holds the stage timings and sizes (see qr_metrics).
+BatchResult = collections.namedtuple('BatchResult', 'index record_id data error cached payload_hash version metrics',
+                                     defaults=(None,))
+
+# Image and matrix caches of the current process, set up by init_worker()
+_cache = None
+_matrix_cache = None
+
+# Share of the disk cache's size limit given to matrices: a matrix is about a tenth the size
+# of a default PNG, and the images get the rest
+MATRIX_DISK_SHARE = 0.125
+
+
+def iter_csv_records(path):
+    """Yield records from a CSV file. Unknown columns become custom fields."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            record = {'custom_fields': {}}
+            for key, value in row.items():
+                if key is None: continue
+                key = key.strip()
+                if key in qr_engine.RECORD_FIELDS or key in ID_FIELDS:
+                    record[key] = value
+                elif value:
+                    record['custom_fields'][key] = value
+            yield record
+
+
+def iter_jsonl_records(path):
+    """Yield records from a JSON-lines file, one object per line"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_records(path):
+    """Stream records from a CSV or JSONL file, picked by extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return iter_csv_records(path)
+    if ext in ('.jsonl', '.ndjson'):
+        return iter_jsonl_records(path)
+    raise ValueError(f"Unsupported input file: {path} (expected .csv or .jsonl)")
+
+
+def record_id(record, index):
+    """Return a filesystem-safe identifier for the record"""
+    for key in ID_FIELDS:
+        if record.get(key):
+            return re.sub(r'[^\w.-]', '_', str(record[key]).strip())
+    return f"{index:06d}"
+
+
+def generate_record(record, qr_format="vcard", colors=None,
+                    box_size=qr_engine.DEFAULT_BOX_SIZE, border=qr_engine.DEFAULT_BORDER):
+    """Validate, format and encode a single record, returning the QR image"""
+    user_info = qr_engine.normalize_record(record)
+    payload = qr_engine.create_payload(user_info, qr_format)
+    return qr_engine.make_qr_image(payload, colors, box_size=box_size, border=border)
+
+
+def init_worker(cache_options=None, images=True):
+    """
+    Set up the render caches of this process (also used as the pool initializer).
+    With images=False only the matrix cache is set up.
+    """
+    global _cache, _matrix_cache
+    if cache_options is None:
+        _cache = _matrix_cache = None
+        return
+    image_options = dict(cache_options)
+    matrix_options = dict(cache_options)
+    if cache_options.get('directory'):
+        # Both tiers live under the directory and share its size limit
+        image_options['directory'] = os.path.join(cache_options['directory'], 'images')
+        matrix_options['directory'] = os.path.join(cache_options['directory'], 'matrices')
+        limit = cache_options.get('max_disk_bytes', qr_cache.DEFAULT_MAX_DISK_BYTES)
+        matrix_options['max_disk_bytes'] = int(limit * MATRIX_DISK_SHARE)
+        image_options['max_disk_bytes'] = limit - matrix_options['max_disk_bytes']
+    _cache = qr_cache.RenderCache(**image_options) if images else None
+    _matrix_cache = qr_cache.RenderCache(**matrix_options)
+
+
+def encode(payload, error_correction=qr_engine.DEFAULT_ERROR_CORRECTION, optimize=False):
+    """Encode the payload, with the optimal segmentation if optimize is set"""
+    if optimize:
+        import qr_optimize
+        return qr_optimize.encode_optimized(payload, error_correction)
+    return qr_engine.encode_matrix(payload, error_correction)
+
+
+def get_matrix(payload, error_correction=qr_engine.DEFAULT_ERROR_CORRECTION, optimize=False):
+    """Return the QRMatrix for the payload, encoding it only if it is not cached"""
+    if _matrix_cache is None:
+        return encode(payload, error_correction, optimize)
+    key = qr_cache.make_matrix_key(payload, error_correction, optimize)
+    data = _matrix_cache.get(key)
+    if data is not None:
+        return qr_engine.QRMatrix.from_bytes(data)
+    matrix = encode(payload, error_correction, optimize)
+    _matrix_cache.put(key, matrix.to_bytes())
+    return matrix
+
+
+def output_version(data, box_size, border, image_format="png"):
+    """Work out the QR version of a rendered code from its size (the PNG header width, or the SVG/PDF size)"""
+    if image_format == "png":
+        side = int.from_bytes(data[16:20], 'big') // box_size
+    else:
+        side = qr_vector.side_modules(data, image_format, box_size)
+    return (side - 2 * border - 17) // 4
+
+
+def render_payload(payload, colors=None, error_correction=qr_engine.DEFAULT_ERROR_CORRECTION,
+                   box_size=qr_engine.DEFAULT_BOX_SIZE, border=qr_engine.DEFAULT_BORDER, palette=False,
+                   optimize=False, image_format="png", timer=None, logo=None, logo_scale=None):
+    """
+    Return (data, cached, version) for the payload, serving unchanged codes from the cache.
+    data is PNG bytes, or SVG/PDF bytes drawn straight from the matrix for those formats.
+    timer (a qr_metrics.StageTimer) records the time of each stage.
+    logo is an image file pasted in the center (PNG only, see qr_style); the error
+    correction level is raised to make up for it.
+    """
+    timer = timer or qr_metrics.NULL_TIMER
+    colors = colors or qr_engine.DEFAULT_COLORS
+    if logo:
+        if image_format != "png":
+            raise ValueError("Logos are only drawn on PNG output")
+        logo_scale = logo_scale or qr_style.DEFAULT_STYLE["logo_scale"]
+        error_correction = qr_style.logo_error_correction(error_correction, logo_scale)
+    key = None
+    if _cache is not None:
+        with timer.stage("cache"):
+            key = qr_cache.make_key(payload, colors, error_correction, box_size, border, palette, optimize,
+                                    image_format, qr_style.logo_key(logo, logo_scale) if logo else None)
+            data = _cache.get(key)
+        if data is not None:
+            return data, True, output_version(data, box_size, border, image_format)
+
+    with timer.stage("encode"):
+        matrix = get_matrix(payload, error_correction, optimize)
+    if image_format == "png":
+        with timer.stage("rasterize"):
+            image = qr_engine.rasterize(matrix, colors, box_size, border, palette)
+        if logo:
+            with timer.stage("logo"):
+                image = qr_style.apply_logo(image, matrix, colors, box_size, border, logo, logo_scale)
+        with timer.stage("save"):
+            data = qr_engine.image_to_png(image)
+    else:
+        with timer.stage("vector"):
+            data = qr_vector.render(matrix, image_format, colors, box_size, border)
+    if key is not None:
+        with timer.stage("cache"):
+            _cache.put(key, data)
+    return data, False, matrix.version
+
+
+def create_payload(user_info, qr_format="vcard", optimize=False):
+    """Build the standard payload, or the compact one when optimizing"""
+    if optimize:
+        import qr_optimize
+        return qr_optimize.create_compact_payload(user_info, qr_format)
+    return qr_engine.create_payload(user_info, qr_format)
+
+
+def render_job(index, record, options, user_info=None):
+    """
+    Render one record to PNG bytes. Never raises; failures are returned in the result.
+    user_info is the already validated record, if the caller has it.
+    """
+    rid = record_id(record, index)
+    style = dict(options)
+    qr_format = style.pop('qr_format', 'vcard')
+    timer = qr_metrics.StageTimer()
+    try:
+        if user_info is None:
+            with timer.stage("validate"):
+                user_info = qr_engine.normalize_record(record)
+        with timer.stage("format"):
+            payload = create_payload(user_info, qr_format, style.get('optimize'))
+        data, cached, version = render_payload(payload, timer=timer, **style)
+        metrics = {"stages": timer.stages, "payload_bytes": len(payload.encode('utf-8'))}
+        return BatchResult(index, rid, data, None, cached, qr_engine.payload_hash(payload), version, metrics)
+    except Exception as e:
+        return BatchResult(index, rid, None, str(e), False, None, None, {"stages": timer.stages})
+
+
+def render_chunk(chunk, options):
+    """Render a list of (index, record) pairs inside a worker process, validating them all at once"""
+    start = time.perf_counter()
+    user_infos, errors = qr_validate.validate_columns([record for _, record in chunk])
+    validate_seconds = (time.perf_counter() - start) / len(chunk) # Shared evenly by the chunk's records
+    messages = collections.defaultdict(list)
+    for error in errors:
+        messages[error.index - 1].append(error.message)
+
+    results = []
+    for i, ((index, record), user_info) in enumerate(zip(chunk, user_infos)):
+        if user_info is None:
+            message = ' '.join(messages[i])
+            results.append(BatchResult(index, record_id(record, index), None, message, False, None, None,
+                                       {"stages": {"validate": validate_seconds}}))
+        else:
+            result = render_job(index, record, options, user_info)
+            result.metrics["stages"]["validate"] = validate_seconds
+            results.append(result)
+    return results
+
+
+def iter_chunks(iterable, size):
+    """Split an iterable into lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def render_records(records, options=None, workers=1, chunk_size=64, max_in_flight=None, ordered=True,
+                   cache_options=None, transport="pickle"):
+    """
+    Render records and yield a BatchResult for each one.
+    With workers > 1 the records are sharded in chunks across a process pool. At most
+    max_in_flight chunks are queued at once so memory stays bounded for large inputs.
+    cache_options (RenderCache arguments) enables the render cache in every worker.
+    With transport="shm" the images come back through shared memory (see qr_shm); their
+    data is then a memoryview that is only valid until the next result is requested.
+    """
+    options = options or {}
+    chunks = iter_chunks(enumerate(records, 1), chunk_size)
+
+    if workers <= 1:
+        init_worker(cache_options)
+        for chunk in chunks:
+            yield from render_chunk(chunk, options)
+        return
+
+    if transport == "shm":
+        import qr_shm
+        yield from qr_shm.render_records(records, options, workers, chunk_size, max_in_flight, ordered,
+                                         cache_options)
+        return
+    max_in_flight = max_in_flight or workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(cache_options,)) as pool:
+        if ordered:
+            # Results come back in input order: always wait on the oldest chunk
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.submit(render_chunk, chunk, options))
+                if len(pending) >= max_in_flight:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        else:
+            # Results come back as soon as any chunk finishes
+            pending = set()
+            for chunk in chunks:
+                pending.add(pool.submit(render_chunk, chunk, options))
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+
+def run_batch(path, output, options=None, workers=1, chunk_size=64, max_in_flight=None,
+              ordered=True, error_report=None, cache_options=None, metrics=None, buffers=None, transport="pickle"):
+    """
+    Generate a PNG (or SVG/PDF) for every record in the input file. output is a directory or a
+    .zip/.tar archive (see qr_archive.open_sink); either way a manifest is written too.
+    Returns a dictionary of counters (written, failed, cache_hits, cache_misses). Bad records
+    are reported on stderr (and in the optional JSON-lines error report) and skipped.
+    Every result is also added to metrics (a qr_metrics.Metrics), if given.
+    With buffers ({stage: size}, see qr_pipeline) the records go through the staged
+    pipeline instead, in one process; the stats then also report each stage.
+    """
+    stats = {"written": 0, "failed": 0, "cache_hits": 0, "cache_misses": 0}
+    image_format = (options or {}).get('image_format', 'png')
+    pipeline = None
+    if buffers is not None:
+        if workers > 1:
+            raise ValueError("The staged pipeline runs in a single process; use workers=1")
+        import qr_pipeline
+        pipeline = qr_pipeline.Pipeline(iter_records(path), options, buffers, cache_options)
+    report = open(error_report, 'w', encoding='utf-8') if error_report else None
+    try:
+        if pipeline is not None:
+            results = pipeline
+        else:
+            results = render_records(iter_records(path), options, workers, chunk_size, max_in_flight, ordered,
+                                     cache_options, transport)
+        with qr_archive.open_sink(output) as sink:
+            for result in results:
+                if metrics is not None:
+                    metrics.add_result(result)
+                if result.error is not None:
+                    stats["failed"] += 1
+                    print(f"record {result.record_id}: {result.error}", file=sys.stderr)
+                    if report:
+                        report.write(json.dumps(result._replace(data=None, metrics=None)._asdict()) + '\n')
+                    continue
+                sink.write(result.record_id, f"{result.record_id}.{image_format}", result.data,
+                           result.payload_hash, result.version)
+                stats["written"] += 1
+                stats["cache_hits" if result.cached else "cache_misses"] += 1
+    finally:
+        if report:
+            report.close()
+    if pipeline is not None:
+        stats["stages"] = pipeline.stages()
+    return stats
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate QR codes from a CSV or JSONL file without the GUI.")
+    parser.add_argument('input', help="input .csv or .jsonl file")
+    parser.add_argument('-o', '--output', default='qr_codes',
+                        help="output directory, or a .zip/.tar/.tar.gz archive (default: qr_codes)")
+    parser.add_argument('--format', dest='qr_format', choices=qr_engine.FORMATS, default='vcard')
+    parser.add_argument('--fill', default=qr_engine.DEFAULT_COLORS['fill'], help="QR code color")
+    parser.add_argument('--back', default=qr_engine.DEFAULT_COLORS['back'], help="background color")
+    parser.add_argument('--box-size', type=int, default=qr_engine.DEFAULT_BOX_SIZE)
+    parser.add_argument('--border', type=int, default=qr_engine.DEFAULT_BORDER)
+    parser.add_argument('--error-correction', choices=sorted(qr_engine.ERROR_CORRECTION_LEVELS), default=None,
+                        help="error correction level (default: M, raised automatically under a logo)")
+    parser.add_argument('--logo', help="image drawn in the center of every code (PNG output only)")
+    parser.add_argument('--logo-scale', type=float, default=None,
+                        help=f"width of the logo's plate as a fraction of the code "
+                             f"(default: {qr_style.DEFAULT_STYLE['logo_scale']})")
+    parser.add_argument('--preset', help="use a saved style preset (see qr_style.py); other options override it")
+    parser.add_argument('--presets', help="presets file (default: the app's, see qr_style.py)")
+    parser.add_argument('--output-format', dest='image_format', choices=('png',) + qr_vector.FORMATS,
+                        default='png', help="image format; svg and pdf are vector files (default: png)")
+    parser.add_argument('--palette', action='store_true',
+                        help="write 1-bit/2-color palette PNGs instead of RGB (much smaller files)")
+    parser.add_argument('--optimize', action='store_true',
+                        help="use compact payloads and optimal segmentation for the smallest QR versions")
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (default: 1)")
+    parser.add_argument('--chunk-size', type=int, default=64, help="records per work unit (default: 64)")
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help="maximum queued chunks (default: 4 per worker)")
+    parser.add_argument('--unordered', action='store_true', help="write results as soon as they are ready")
+    parser.add_argument('--transport', choices=('pickle', 'shm'), default='pickle',
+                        help="how workers send images back: pickled, or through shared memory (see qr_shm)")
+    parser.add_argument('--error-report', help="write failed records to this JSON-lines file")
+    parser.add_argument('--cache-dir', help="keep rendered codes in this directory between runs")
+    parser.add_argument('--cache-size-mb', type=int, default=512, help="disk cache size limit (default: 512)")
+    parser.add_argument('--cache-items', type=int, default=1024,
+                        help="in-memory cache entries per process (default: 1024, 0 disables the cache)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only render new or changed records and delete outputs of removed ones "
+                             "(directory output only; see qr_manifest)")
+    parser.add_argument('--manifest', help="manifest database for --incremental "
+                                           "(default: .qr_manifest.sqlite in the output directory)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="run the stages in threads joined by bounded queues, in one process "
+                             "(memory stays flat for any input size, see qr_pipeline)")
+    parser.add_argument('--buffer', action='append', metavar='STAGE=SIZE',
+                        help="items a pipeline stage may queue (read, validate, format, encode, rasterize); "
+                             "implies --pipeline")
+    parser.add_argument('--metrics-jsonl', help="write per-record stage timings and sizes to this JSON-lines file")
+    parser.add_argument('--metrics-prom', help="write the run's totals to this Prometheus text file")
+    parser.add_argument('--profile', help="profile the run with cProfile and save the stats to this file "
+                                          "(profiles this process only; use with --workers 1)")
+    parser.add_argument('--trace-memory', action='store_true', help="report the top Python allocations (tracemalloc)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.preset:
+        # The preset replaces the defaults, so options given on the command line still win
+        try:
+            style = qr_style.PresetStore(args.presets).get(args.preset)
+        except (KeyError, ValueError) as e:
+            parser.error(e.args[0])
+        parser.set_defaults(**{key: style[key] for key in qr_style.DEFAULT_STYLE})
+        args = parser.parse_args(argv)
+    if args.logo:
+        if args.image_format != 'png':
+            parser.error("--logo needs PNG output")
+        if not os.path.isfile(args.logo):
+            parser.error(f"logo file not found: {args.logo}")
+        if args.logo_scale is not None and not 0 < args.logo_scale <= qr_style.MAX_LOGO_SCALE:
+            parser.error(f"--logo-scale must be above 0 and at most {qr_style.MAX_LOGO_SCALE}")
+    if args.incremental and qr_archive.is_archive(args.output):
+        parser.error("--incremental needs a directory output")
+    buffers = None
+    if args.pipeline or args.buffer:
+        import qr_pipeline
+        if args.workers > 1 or args.incremental:
+            parser.error("--pipeline runs in one process and cannot be combined with --workers or --incremental")
+        try:
+            buffers = qr_pipeline.parse_buffers(args.buffer)
+        except ValueError as e:
+            parser.error(str(e))
+    options = {
+        'qr_format': args.qr_format,
+        'colors': {"fill": args.fill, "back": args.back},
+        'box_size': args.box_size,
+        'border': args.border,
+        'palette': args.palette,
+        'optimize': args.optimize,
+        'image_format': args.image_format,
+    }
+    # Only set when used, so the manifests of incremental runs stay valid
+    if args.error_correction:
+        options['error_correction'] = qr_engine.ERROR_CORRECTION_LEVELS[args.error_correction]
+    if args.logo:
+        options['logo'] = os.path.abspath(args.logo)
+        options['logo_scale'] = args.logo_scale or qr_style.DEFAULT_STYLE["logo_scale"]
+    cache_options = None
+    if args.cache_items > 0:
+        cache_options = {
+            'max_items': args.cache_items,
+            'directory': args.cache_dir,
+            'max_disk_bytes': args.cache_size_mb * 1024 * 1024,
+        }
+    sinks = []
+    if args.metrics_jsonl:
+        sinks.append(qr_metrics.JSONLinesSink(args.metrics_jsonl))
+    if args.metrics_prom:
+        sinks.append(qr_metrics.PrometheusSink(args.metrics_prom))
+    metrics = qr_metrics.Metrics(sinks) if sinks else None
+    with qr_metrics.profiled(args.profile, args.trace_memory):
+        if args.incremental:
+            import qr_manifest
+            stats = qr_manifest.run_incremental(args.input, args.output, options, args.workers, args.chunk_size,
+                                                args.max_in_flight, args.error_report, cache_options, metrics,
+                                                args.manifest, args.transport)
+        else:
+            stats = run_batch(args.input, args.output, options, args.workers, args.chunk_size,
+                              args.max_in_flight, not args.unordered, args.error_report, cache_options, metrics,
+                              buffers, args.transport)
+    if metrics is not None:
+        metrics.close()
+    peak = qr_metrics.peak_rss()
+    if peak is not None:
+        workers_peak = qr_metrics.peak_rss(children=True) if args.workers > 1 else None
+        print(f"peak RSS: {peak / 1e6:.0f} MB" +
+              (f" (largest worker: {workers_peak / 1e6:.0f} MB)" if workers_peak else ""))
+    for name, stage in stats.get("stages", {}).items():
+        print(f"  {name:10} {stage['items']} items, queue {stage['peak']}/{stage['buffer']}, "
+              f"{stage['blocked']:.1f}s waiting on the next stage")
+    if args.incremental:
+        print(f"{stats['written']} QR codes written to {args.output}, {stats['unchanged']} unchanged, "
+              f"{stats['removed']} removed, {stats['failed']} failed")
+        return 1 if stats['failed'] else 0
+    print(f"{stats['written']} QR codes written to {args.output}, {stats['failed']} failed "
+          f"(cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses)")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# Content-addressed cache for rendered QR codes.
+# Image entries are keyed on a hash of the final payload plus every styling option that
+# changes the output, so an unchanged record is served without re-encoding it. Matrix
+# entries are keyed on the payload and error-correction level only, so re-theming a run
+# (new colors, box size or border) only pays for rasterization. The size limit of the disk
+# tier holds for the whole directory, however many processes share it.
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+# Bump this when the rendering output changes, to invalidate old disk entries
+CACHE_VERSION = 1
+
+# Files kept next to the entries of a disk cache: the lock shared by every process using the
+# directory, and the directory's total size in bytes
+LOCK_FILE = ".lock"
+SIZE_FILE = ".size"
+
+# Default size limit of the disk tier
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+# A full disk tier is trimmed to this share of its limit, so the directory is rarely rescanned
+LOW_WATER = 0.9
+
+
+def make_key(payload, colors, error_correction, box_size, border, palette=False, optimize=False,
+             image_format="png", logo=None):
+    """
+    Return the cache key for a payload rendered with the given styling.
+    logo is the logo's qr_style.logo_key(), if the code has one.
+    """
+    style = [CACHE_VERSION, colors["fill"], colors["back"], int(error_correction),
+             int(box_size), int(border), bool(palette), bool(optimize)]
+    if image_format != "png": # PNG keys stay the same as before vector output existed
+        style.append(image_format)
+    if logo is not None:
+        style.append(logo)
+    style = json.dumps(style)
+    digest = hashlib.sha256(style.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(payload.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def make_matrix_key(payload, error_correction, optimize=False):
+    """Return the cache key for the encoded module matrix of a payload"""
+    digest = hashlib.sha256(json.dumps([CACHE_VERSION, "matrix", int(error_correction),
+                                        bool(optimize)]).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(payload.encode('utf-8'))
+    return digest.hexdigest()
+
+
+@contextlib.contextmanager
+def locked(path):
+    """Hold an exclusive lock on the file at path (created if missing) for the block"""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class RenderCache:
+    """
+    Two-tier cache of rendered image bytes: an in-memory LRU per process and an optional
+    on-disk directory. The directory may be shared by several processes (the workers of a
+    batch, or runs in parallel): its total size is kept in a file updated under a lock file,
+    and once it grows past max_disk_bytes the least recently used entries are deleted.
+    """
+    def __init__(self, max_items=1024, directory=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_items = max_items
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = collections.OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            with self._locked():
+                size = self._read_size() # None for a new directory, or one from an older version
+                if size is None or size > max_disk_bytes:
+                    self._trim()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _locked(self):
+        return locked(os.path.join(self.directory, LOCK_FILE))
+
+    def _read_size(self):
+        try:
+            with open(os.path.join(self.directory, SIZE_FILE)) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _write_size(self, size):
+        with open(os.path.join(self.directory, SIZE_FILE), 'w') as f:
+            f.write(str(size))
+
+    def get(self, key):
+        """Return the cached bytes for key, or None on a miss"""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["memory_hits"] += 1
+            return data
+
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path) # Mark as recently used
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+                return data
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, data):
+        """Store data under key in both tiers"""
+        self._remember(key, data)
+        if self.directory and not os.path.exists(self._path(key)):
+            self._write_disk(key, data)
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _write_disk(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._locked():
+            size = self._read_size()
+            if size is None or size + len(data) > self.max_disk_bytes:
+                self._trim()
+            else:
+                self._write_size(size + len(data))
+
+    def _trim(self):
+        """
+        Measure the directory and, if it is over its limit, delete the least recently used
+        entries until it is down to LOW_WATER of the limit. Called with the lock held.
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if len(name) != 64: # Skip the lock, the size file and temporary files
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        total = sum(size for _, _, size in entries)
+        if total > self.max_disk_bytes:
+            for _, path, size in sorted(entries):
+                if total <= self.max_disk_bytes * LOW_WATER:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.stats["evictions"] += 1
+        self._write_size(total)
@@ -1,47 +1,95 @@
-# Import necessary CustomTkinter and other libraries
+# Import necessary CustomTkinter and other libraries.
+# PIL, qrcode and webbrowser are imported when first needed to keep startup fast.
+import time
+STARTUP_TIME = time.perf_counter() # Reference point for the --startup-report timings
+
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox, filedialog, colorchooser
-import qrcode
-from PIL import Image, ImageTk 
+import json
 import os
-import re
-import webbrowser
+import queue
+import sys
+import threading
+import qr_display
+import qr_engine
+import qr_style
+
+IMPORTS_DONE_TIME = time.perf_counter()
 
 # Set the appearance mode and default color theme for the application
 ctk.set_appearance_mode("System")  # Supports "System", "Dark", "Light"
 ctk.set_default_color_theme("blue") # Supports "blue", "green", "dark-blue"
 
+# Delay after the last keystroke before the live preview re-renders
+LIVE_PREVIEW_DELAY_MS = 300
+
+# Sizes of the QR code in the main window and in the preview window
+DISPLAY_SIZE = 300
+PREVIEW_SIZE = 500
+
+# Initial size of the main window
+WINDOW_SIZE = (800, 900)
+
 class QRCodeGenerator(ctk.CTk):
     """
     Main application class for the personal QR Code Generator.
     """
-    def __init__(self):
+    def __init__(self, startup_report=False):
         super().__init__()
+        self.startup_report = startup_report
+        self.startup_times = {"imports": IMPORTS_DONE_TIME - STARTUP_TIME}
         
         # --- Configure the main window ---
         self.title("🔲 Personal QR Code Generator")
-        self.geometry("800x900")
+        self.geometry(f"{WINDOW_SIZE[0]}x{WINDOW_SIZE[1]}")
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
         
         # Variables
         self.qr_image = None
+        self.qr_matrix = None # Encoded modules of the current QR code, reused when only colors change
+        self.display_views = None # Cached display-size images of the current QR code
         self.custom_fields = {} # A dictionary to store custom field widgets.
-        self.current_colors = {"fill": "black", "back": "#f0f0f0"}
+        
+        # Style presets, and the style of the last session (see qr_style)
+        try:
+            self.presets = qr_style.PresetStore()
+        except (OSError, ValueError) as e:
+            print(f"Style presets unavailable: {e}", file=sys.stderr)
+            self.presets = None
+        self.style = self.presets.last() if self.presets else dict(qr_style.DEFAULT_STYLE)
+        if self.style["logo"] and not os.path.isfile(self.style["logo"]):
+            self.style["logo"] = None
+        self.current_colors = {"fill": self.style["fill"], "back": self.style["back"]}
+        
+        # Background rendering: workers put finished renders on this queue and the main
+        # loop polls it. Only the result of the latest request (render_id) is shown.
+        self.render_queue = queue.Queue()
+        self.render_id = 0
+        self.polling_renders = False
+        
+        # Live preview state: the payload currently shown and the one being rendered
+        self.qr_payload = None
+        self.pending_payload = None
+        self.live_preview_job = None
         
         # Create GUI
         self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Center window after creating widgets
         self.center_window()
 
     def center_window(self):
-        """Center the window on screen"""
-        self.update_idletasks()
-        x = (self.winfo_screenwidth() // 2) - (self.winfo_width() // 2)
-        y = (self.winfo_screenheight() // 2) - (self.winfo_height() // 2)
-        self.geometry(f"+{x}+{y}")
+        """
+        Center the window on screen. Uses the requested size rather than update_idletasks(),
+        which would run the deferred section builds before the window is first painted.
+        """
+        width, height = WINDOW_SIZE
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f"{width}x{height}+{x}+{y}")
 
     def create_widgets(self):
         """Main function to build the UI layout using CustomTkinter components"""
@@ -60,36 +108,56 @@ class QRCodeGenerator(ctk.CTk):
                                    font=ctk.CTkFont(size=20, weight="bold"))
         title_label.pack(pady=(0, 20))
         
-        # Basic Information Section
-        self.create_basic_info_section(scrollable_frame)
-        
-        # Separator
-        ctk.CTkLabel(scrollable_frame, text="─" * 40).pack(fill='x', pady=10)
-        
-        # Contact Information Section
-        self.create_contact_section(scrollable_frame)
-        
-        # Separator
-        ctk.CTkLabel(scrollable_frame, text="─" * 40).pack(fill='x', pady=10)
-        
-        # Social Media Section
-        self.create_social_section(scrollable_frame)
-        
-        # Separator
-        ctk.CTkLabel(scrollable_frame, text="─" * 40).pack(fill='x', pady=10)
-        
-        # Custom Fields Section
-        self.create_custom_fields_section(scrollable_frame)
-        
-        # Separator
-        ctk.CTkLabel(scrollable_frame, text="─" * 40).pack(fill='x', pady=10)
-        
-        # QR Code Options Section
-        self.create_qr_options_section(scrollable_frame)
+        # The sections are built one per event loop turn once the window is on screen,
+        # so the window appears without waiting for every widget
+        self.build_steps = [
+            self.create_basic_info_section, # Basic Information Section
+            self.create_separator,
+            self.create_contact_section, # Contact Information Section
+            self.create_separator,
+            self.create_social_section, # Social Media Section
+            self.create_separator,
+            self.create_custom_fields_section, # Custom Fields Section
+            self.create_separator,
+            self.create_qr_options_section, # QR Code Options Section
+            self.create_separator,
+            self.create_generate_section, # Generate Button and QR Code Display
+            self.create_footer_section, # Footer Section
+        ]
+        # First paint is the window's first Expose event, which mainloop delivers
+        self.bind("<Expose>", self.record_first_paint, add="+")
+        self.after_idle(self.build_next_section, scrollable_frame)
+
+    def record_first_paint(self, event=None):
+        if "first_paint" not in self.startup_times:
+            self.startup_times["first_paint"] = time.perf_counter() - STARTUP_TIME
+            self.report_startup()
+
+    def report_startup(self):
+        """With --startup-report, print the timings and exit once the window is painted and built"""
+        if self.startup_report and "first_paint" in self.startup_times and "ready" in self.startup_times:
+            print(json.dumps({name: round(seconds, 4) for name, seconds in self.startup_times.items()}))
+            self.destroy()
+
+    def build_next_section(self, parent):
+        """Build the next pending section, then yield to the event loop so the window can paint"""
+        self.build_steps.pop(0)(parent)
+        if self.build_steps:
+            self.after(1, self.build_next_section, parent)
+            return
         
-        # Separator
-        ctk.CTkLabel(scrollable_frame, text="─" * 40).pack(fill='x', pady=10)
+        # Re-render the preview as the user types
+        self.bind_live_preview()
         
+        self.startup_times["ready"] = time.perf_counter() - STARTUP_TIME
+        self.report_startup()
+
+    def create_separator(self, parent):
+        """Create a separator line between sections"""
+        ctk.CTkLabel(parent, text="─" * 40).pack(fill='x', pady=10)
+
+    def create_generate_section(self, scrollable_frame):
+        """Create the generate button and the QR code display area"""
         # Generate Button
         generate_btn = ctk.CTkButton(scrollable_frame, 
                                      text="🚀 Generate QR Code", 
@@ -117,9 +185,6 @@ class QRCodeGenerator(ctk.CTk):
                                          command=self.preview_qr_code, state="disabled")
         self.preview_btn.pack(side="left", padx=5)
 
-        # Footer Section
-        self.create_footer_section(scrollable_frame)
-
     def create_basic_info_section(self, parent):
         """Create a section for personal details"""
         basic_frame = ctk.CTkFrame(parent, corner_radius=10)
@@ -233,11 +298,13 @@ class QRCodeGenerator(ctk.CTk):
         self.format_var = tk.StringVar(value="vcard")
         
         vcard_radio = ctk.CTkRadioButton(format_frame, text="VCard (Contact)", 
-                                         variable=self.format_var, value="vcard")
+                                         variable=self.format_var, value="vcard",
+                                         command=self.schedule_live_preview)
         vcard_radio.pack(side="left", padx=(10, 15))
         
         text_radio = ctk.CTkRadioButton(format_frame, text="Text with Links", 
-                                         variable=self.format_var, value="text")
+                                         variable=self.format_var, value="text",
+                                         command=self.schedule_live_preview)
         text_radio.pack(side="left")
         
         # Color selection
@@ -256,6 +323,39 @@ class QRCodeGenerator(ctk.CTk):
         color_btn = ctk.CTkButton(color_frame, text="Choose Colors", 
                                      command=self.choose_colors)
         color_btn.pack(side="left", padx=5)
+        
+        # Logo in the center of the code
+        logo_frame = ctk.CTkFrame(options_frame, fg_color="transparent")
+        logo_frame.pack(fill="x", pady=(0, 10), padx=10)
+        
+        ctk.CTkLabel(logo_frame, text="Logo:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self.logo_label = ctk.CTkLabel(logo_frame, text=self.logo_name())
+        self.logo_label.pack(side="left", padx=10)
+        ctk.CTkButton(logo_frame, text="Choose Logo", width=100, command=self.choose_logo).pack(side="left", padx=5)
+        ctk.CTkButton(logo_frame, text="Remove", width=70, command=self.remove_logo,
+                      fg_color="gray", hover_color="darkgray").pack(side="left", padx=5)
+        
+        # Saved styles: colors, error correction, sizes and logo
+        preset_frame = ctk.CTkFrame(options_frame, fg_color="transparent")
+        preset_frame.pack(fill="x", pady=(0, 10), padx=10)
+        
+        ctk.CTkLabel(preset_frame, text="Style:", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left")
+        self.preset_var = tk.StringVar(value="Custom")
+        self.preset_menu = ctk.CTkOptionMenu(preset_frame, variable=self.preset_var, values=self.preset_names(),
+                                             command=self.apply_preset, width=160)
+        self.preset_menu.pack(side="left", padx=10)
+        ctk.CTkButton(preset_frame, text="Save Preset", width=100, command=self.save_preset).pack(side="left", padx=5)
+        ctk.CTkButton(preset_frame, text="Delete", width=70, command=self.delete_preset,
+                      fg_color="gray", hover_color="darkgray").pack(side="left", padx=5)
+        if self.presets is None:
+            self.preset_menu.configure(state="disabled")
+        
+        # Live preview toggle
+        self.live_preview_var = tk.BooleanVar(value=True)
+        live_switch = ctk.CTkSwitch(options_frame, text="Live preview while typing",
+                                    variable=self.live_preview_var,
+                                    command=self.schedule_live_preview)
+        live_switch.pack(anchor="w", pady=(0, 10), padx=10)
 
     def create_footer_section(self, parent):
         """Create the footer with company information and support link"""
@@ -285,6 +385,7 @@ class QRCodeGenerator(ctk.CTk):
     def open_email_client(self, email):
         """Open the user's default email client with a pre-filled recipient."""
         try:
+            import webbrowser
             webbrowser.open(f"mailto:{email}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open email client: {str(e)}")
@@ -295,6 +396,7 @@ class QRCodeGenerator(ctk.CTk):
         if phone:
             self.whatsapp_entry.delete(0, tk.END)
             self.whatsapp_entry.insert(0, phone)
+            self.schedule_live_preview()
         else:
             messagebox.showwarning("Warning", "Please enter a phone number first!")
 
@@ -334,12 +436,15 @@ class QRCodeGenerator(ctk.CTk):
         
         # Store the entry widget in the dictionary for later retrieval
         self.custom_fields[field_name] = entry
+        entry.bind("<KeyRelease>", self.schedule_live_preview)
+        self.schedule_live_preview()
 
     def remove_custom_field(self, frame, field_name):
         """Remove a custom field from the GUI and the dictionary"""
         frame.destroy()
         if field_name in self.custom_fields:
             del self.custom_fields[field_name]
+        self.schedule_live_preview()
 
     def choose_colors(self):
         """Choose QR code colors using standard Tkinter dialogs"""
@@ -356,151 +461,274 @@ class QRCodeGenerator(ctk.CTk):
         # Update the color preview label to show the selected colors
         self.color_preview.configure(text_color=self.current_colors["fill"], 
                                     fg_color=self.current_colors["back"])
+        self.preset_var.set("Custom")
+        
+        # Recolor the current QR code without encoding it again
+        if self.qr_matrix:
+            self.qr_image = self.draw_image(self.qr_matrix, self.current_colors, self.current_style())
+            self.display_views = self.make_display_views(self.qr_matrix, self.current_colors)
+            self.qr_display_frame.configure(fg_color=self.current_colors["back"])
+            self.display_qr_code()
+
+    def current_style(self):
+        """The style in use, as a qr_style preset"""
+        return dict(self.style, fill=self.current_colors["fill"], back=self.current_colors["back"])
+
+    def set_style(self, style):
+        """Switch to another style and re-render the current QR code in it"""
+        self.style = style
+        self.current_colors = {"fill": style["fill"], "back": style["back"]}
+        self.color_preview.configure(text_color=style["fill"], fg_color=style["back"])
+        self.logo_label.configure(text=self.logo_name())
+        # The logo and the error correction level change the encoding, not just the colors
+        if self.qr_payload:
+            self.start_render(self.qr_payload, notify=False)
+
+    def logo_name(self):
+        return os.path.basename(self.style["logo"]) if self.style["logo"] else "None"
+
+    def choose_logo(self):
+        """Pick an image to draw in the center of the QR code"""
+        filename = filedialog.askopenfilename(
+            title="Choose Logo",
+            filetypes=[("Images", "*.png *.jpg *.jpeg *.gif *.bmp *.webp"), ("All Files", "*.*")]
+        )
+        if not filename: return
+        try:
+            qr_style.load_logo(os.path.abspath(filename), os.stat(filename).st_mtime_ns)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open the logo: {str(e)}")
+            return
+        self.preset_var.set("Custom")
+        self.set_style(qr_style.normalize_style(dict(self.current_style(), logo=filename)))
+
+    def remove_logo(self):
+        if self.style["logo"]:
+            self.preset_var.set("Custom")
+            self.set_style(dict(self.current_style(), logo=None))
+
+    def preset_names(self):
+        return ["Custom"] + (self.presets.names() if self.presets else [])
+
+    def apply_preset(self, name):
+        """Switch to a saved style preset"""
+        if name == "Custom" or self.presets is None: return
+        try:
+            style = self.presets.get(name)
+        except (KeyError, ValueError) as e:
+            messagebox.showerror("Error", e.args[0])
+            return
+        if style["logo"] and not os.path.isfile(style["logo"]):
+            messagebox.showwarning("Warning", f"Logo not found: {style['logo']}")
+            style["logo"] = None
+        self.set_style(style)
+
+    def save_preset(self):
+        """Save the current style under a name"""
+        if self.presets is None:
+            messagebox.showerror("Error", "Style presets are unavailable")
+            return
+        name = ctk.CTkInputDialog(text="Name of the style preset:", title="Save Style Preset").get_input()
+        if not name or not name.strip(): return
+        try:
+            self.presets.save(name, self.current_style())
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to save the preset: {str(e)}")
+            return
+        self.preset_menu.configure(values=self.preset_names())
+        self.preset_var.set(name.strip())
+
+    def delete_preset(self):
+        """Delete the selected style preset"""
+        name = self.preset_var.get()
+        if name == "Custom" or self.presets is None: return
+        if not messagebox.askyesno("Delete Preset", f"Delete the style preset '{name}'?"): return
+        try:
+            self.presets.delete(name)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to delete the preset: {str(e)}")
+            return
+        self.preset_menu.configure(values=self.preset_names())
+        self.preset_var.set("Custom")
+
+    def on_close(self):
+        """Remember the style for the next session, then close"""
+        if self.presets is not None:
+            try:
+                self.presets.remember(self.current_style())
+            except (OSError, ValueError) as e:
+                print(f"Could not save the style: {e}", file=sys.stderr)
+        self.destroy()
 
-    def validate_phone(self, phone):
-        """Validate phone number"""
-        if not phone: return ""
-        phone = re.sub(r'[^\d+]', '', phone)
-        if re.match(r'^\+?[\d]{10,15}$', phone): return phone
-        return None
-
-    def validate_email(self, email):
-        """Validate email"""
-        if not email: return ""
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if re.match(email_pattern, email): return email
-        return None
-
-    def validate_url(self, url, platform=""):
-        """Validate and format URL"""
-        if not url: return ""
-        if not url.startswith(('http://', 'https://')):
-            if platform.lower() == 'facebook':
-                url = f"https://facebook.com/{url}"
-            elif platform.lower() == 'linkedin':
-                url = f"https://linkedin.com/in/{url}"
-            else:
-                url = f"https://{url}"
-        return url
-
-    def collect_user_data(self):
+    def collect_user_data(self, show_errors=True):
         """Collect all user data from the form"""
-        name = self.name_entry.get().strip()
-        if not name:
-            messagebox.showerror("Error", "Name is required!")
-            return None
-        
-        phone = self.phone_entry.get().strip()
-        validated_phone = self.validate_phone(phone)
-        if phone and not validated_phone:
-            messagebox.showerror("Error", "Invalid phone number format!")
-            return None
-        
-        whatsapp = self.whatsapp_entry.get().strip()
-        validated_whatsapp = self.validate_phone(whatsapp)
-        if whatsapp and not validated_whatsapp:
-            messagebox.showerror("Error", "Invalid WhatsApp number format!")
-            return None
-        
-        email = self.email_entry.get().strip()
-        validated_email = self.validate_email(email)
-        if email and not validated_email:
-            messagebox.showerror("Error", "Invalid email format!")
-            return None
-        
-        # Collect data from custom fields
-        custom_data = {name: entry.get().strip() for name, entry in self.custom_fields.items() if entry.get().strip()}
-        
-        return {
-            'name': name,
-            'job_title': self.job_title_entry.get().strip(),
-            'company': self.company_entry.get().strip(),
-            'phone': validated_phone or phone,
-            'whatsapp': validated_whatsapp or whatsapp,
-            'email': validated_email or email,
-            'address': self.address_text.get("1.0", tk.END).strip(),
-            'website': self.validate_url(self.website_entry.get().strip()),
-            'facebook': self.validate_url(self.facebook_entry.get().strip(), 'facebook'),
-            'linkedin': self.validate_url(self.linkedin_entry.get().strip(), 'linkedin'),
-            'custom_fields': custom_data
+        record = {
+            'name': self.name_entry.get(),
+            'job_title': self.job_title_entry.get(),
+            'company': self.company_entry.get(),
+            'phone': self.phone_entry.get(),
+            'whatsapp': self.whatsapp_entry.get(),
+            'email': self.email_entry.get(),
+            'address': self.address_text.get("1.0", tk.END),
+            'website': self.website_entry.get(),
+            'facebook': self.facebook_entry.get(),
+            'linkedin': self.linkedin_entry.get(),
+            # Collect data from custom fields
+            'custom_fields': {name: entry.get() for name, entry in self.custom_fields.items()}
         }
+        try:
+            return qr_engine.normalize_record(record)
+        except qr_engine.RecordError as e:
+            if show_errors:
+                messagebox.showerror("Error", "\n".join(message for _, message in e.errors))
+            return None
 
-    def create_vcard_format(self, user_info):
-        """Create VCard format"""
-        vcard_parts = ['BEGIN:VCARD', 'VERSION:3.0']
-        if user_info['name']:
-            vcard_parts.extend([f"FN:{user_info['name']}", f"N:{user_info['name']};;;"])
-        if user_info['job_title']: vcard_parts.append(f"TITLE:{user_info['job_title']}")
-        if user_info['company']: vcard_parts.append(f"ORG:{user_info['company']}")
-        if user_info['phone']: vcard_parts.append(f"TEL:{user_info['phone']}")
-        if user_info['whatsapp']: vcard_parts.append(f"TEL;TYPE=whatsapp:+{user_info['whatsapp'].lstrip('+')}")
-        if user_info['email']: vcard_parts.append(f"EMAIL:{user_info['email']}")
-        if user_info['address']: vcard_parts.append(f"ADR:;;{user_info['address']};;;;")
-        if user_info['website']: vcard_parts.append(f"URL:{user_info['website']}")
-        if user_info['facebook']: vcard_parts.append(f"X-SOCIALPROFILE;TYPE=facebook:{user_info['facebook']}")
-        if user_info['linkedin']: vcard_parts.append(f"X-SOCIALPROFILE;TYPE=linkedin:{user_info['linkedin']}")
-        for name, value in user_info.get('custom_fields', {}).items():
-            # The custom fields are added to the VCard
-            vcard_parts.append(f"X-CUSTOM;TYPE={name}:{value}")
-        vcard_parts.append('END:VCARD')
-        return '\n'.join(vcard_parts)
-
-    def create_text_format(self, user_info):
-        """Create text format with separators"""
-        data_parts = []
-        if user_info['name']: data_parts.append(f"👤 Name: {user_info['name']}")
-        if user_info['job_title']: data_parts.append(f"💼 Job Title: {user_info['job_title']}")
-        if user_info['company']: data_parts.append(f"🏢 Company: {user_info['company']}")
-        data_parts.append("─" * 30)
-        if user_info['phone']: data_parts.append(f"📞 Phone: tel:{user_info['phone']}")
-        if user_info['whatsapp']:
-            whatsapp_number = user_info['whatsapp'].lstrip('+').replace(' ', '').replace('-', '')
-            data_parts.append(f"💬 WhatsApp: https://wa.me/{whatsapp_number}")
-        if user_info['email']: data_parts.append(f"📧 Email: mailto:{user_info['email']}")
-        data_parts.append("─" * 30)
-        if user_info['address']: data_parts.append(f"📍 Address: {user_info['address']}")
-        if user_info['website']: data_parts.append(f"🌐 Website: {user_info['website']}")
-        data_parts.append("─" * 30)
-        if user_info['linkedin']: data_parts.append(f"💼 LinkedIn: {user_info['linkedin']}")
-        if user_info['facebook']: data_parts.append(f"👥 Facebook: {user_info['facebook']}")
-        if user_info.get('custom_fields'):
-            data_parts.append("─" * 30)
-            for name, value in user_info['custom_fields'].items():
-                data_parts.append(f"✨ {name}: {value}")
-        return '\n'.join(data_parts)
+    def bind_live_preview(self):
+        """Schedule a live preview whenever one of the inputs changes"""
+        for widget in (self.name_entry, self.job_title_entry, self.company_entry, self.phone_entry,
+                       self.whatsapp_entry, self.email_entry, self.address_text, self.website_entry,
+                       self.facebook_entry, self.linkedin_entry):
+            widget.bind("<KeyRelease>", self.schedule_live_preview)
+
+    def schedule_live_preview(self, event=None):
+        """Debounce: render only once typing has paused for LIVE_PREVIEW_DELAY_MS"""
+        if self.live_preview_job is not None:
+            self.after_cancel(self.live_preview_job)
+            self.live_preview_job = None
+        if self.live_preview_var.get():
+            self.live_preview_job = self.after(LIVE_PREVIEW_DELAY_MS, self.live_preview)
+
+    def live_preview(self):
+        """Re-render the QR code from the current inputs, without any dialogs"""
+        self.live_preview_job = None
+        # Incomplete input (e.g. a half-typed email) keeps the last good preview
+        user_data = self.collect_user_data(show_errors=False)
+        if not user_data: return
+        try:
+            qr_data = qr_engine.create_payload(user_data, self.format_var.get())
+        except Exception:
+            return
+        # Nothing to do if this payload is already shown or being rendered;
+        # color changes are applied from the existing matrix by choose_colors
+        if qr_data in (self.qr_payload, self.pending_payload): return
+        self.start_render(qr_data, notify=False)
 
     def generate_qr_code(self):
         """Function to generate the QR code based on user input"""
         user_data = self.collect_user_data()
         if not user_data: return
         try:
-            qr_data = self.create_vcard_format(user_data) if self.format_var.get() == "vcard" else self.create_text_format(user_data)
-            qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=4)
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            # Use the colors from self.current_colors when generating the QR image
-            self.qr_image = qr.make_image(fill_color=self.current_colors["fill"], back_color=self.current_colors["back"])
-            
-            # --- The fix to make the background appear seamless ---
-            # Set the foreground color of the display frame to match the QR code's background color
-            self.qr_display_frame.configure(fg_color=self.current_colors["back"])
-            
-            self.display_qr_code()
-            
-            self.save_btn.configure(state="normal")
-            self.preview_btn.configure(state="normal")
-            
-            messagebox.showinfo("Success", "QR code generated successfully!")
-            
+            qr_data = qr_engine.create_payload(user_data, self.format_var.get())
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate QR code: {str(e)}")
+            return
+        self.start_render(qr_data, notify=True)
+
+    def start_render(self, qr_data, notify):
+        """Start a background render; a new request supersedes any render that is still running"""
+        self.render_id += 1
+        self.pending_payload = qr_data
+        worker = threading.Thread(target=self.render_worker,
+                                  args=(self.render_id, qr_data, dict(self.current_colors), notify,
+                                        ctk.ScalingTracker.get_widget_scaling(self.qr_label),
+                                        self.current_style()),
+                                  daemon=True)
+        worker.start()
+        if not self.polling_renders:
+            self.polling_renders = True
+            self.after(50, self.poll_render_queue)
+
+    def render_worker(self, render_id, qr_data, colors, notify, scaling=1.0, style=None):
+        """
+        Encode and rasterize the QR code on a background thread so the window stays responsive.
+        Widgets are never touched here; the result goes on render_queue.
+        """
+        try:
+            style = style or qr_style.DEFAULT_STYLE
+            error_correction = qr_engine.ERROR_CORRECTION_LEVELS[style["error_correction"]]
+            if style["logo"]:
+                # Raised so the code can still be read with the logo hiding part of it
+                error_correction = qr_style.logo_error_correction(error_correction, style["logo_scale"])
+            matrix = qr_engine.encode_matrix(qr_data, error_correction)
+            if render_id != self.render_id: return # Stale: a newer request is running
+            # Use the colors from self.current_colors when generating the QR image.
+            # Without a logo the image is kept as a two-color palette image, a quarter of the size of RGB.
+            image = self.draw_image(matrix, colors, style)
+            if render_id != self.render_id: return
+            views = qr_display.DisplayViews(matrix, colors, style["border"], scaling, self.display_logo(style))
+            views.view(DISPLAY_SIZE) # Render the main window's view here, off the main thread
+            self.render_queue.put((render_id, notify, (matrix, image, colors, views, qr_data), None))
+        except Exception as e:
+            self.render_queue.put((render_id, notify, None, e))
+
+    def poll_render_queue(self):
+        """Show finished renders; runs on the Tk main loop via after()"""
+        while True:
+            try:
+                render_id, notify, result, error = self.render_queue.get_nowait()
+            except queue.Empty:
+                break
+            if render_id != self.render_id:
+                continue # Superseded by a newer request
+            self.polling_renders = False
+            self.pending_payload = None
+            if error is not None:
+                if notify:
+                    messagebox.showerror("Error", f"Failed to generate QR code: {str(error)}")
+                return
+            self.show_render_result(*result, notify=notify)
+            return
+        self.after(50, self.poll_render_queue)
+
+    def show_render_result(self, matrix, image, colors, views, qr_data, notify=True):
+        """Install a finished render in the window"""
+        self.qr_matrix = matrix
+        self.qr_image = image
+        self.display_views = views
+        self.qr_payload = qr_data
+        
+        # The colors may have changed while rendering; recoloring the matrix is cheap
+        if colors != self.current_colors:
+            colors = dict(self.current_colors)
+            self.qr_image = self.draw_image(matrix, colors, self.current_style())
+            self.display_views = self.make_display_views(matrix, colors)
+        
+        # --- The fix to make the background appear seamless ---
+        # Set the foreground color of the display frame to match the QR code's background color
+        self.qr_display_frame.configure(fg_color=colors["back"])
+        
+        self.display_qr_code()
+        
+        self.save_btn.configure(state="normal")
+        self.preview_btn.configure(state="normal")
+        
+        if notify:
+            messagebox.showinfo("Success", "QR code generated successfully!")
+
+    def make_display_views(self, matrix, colors):
+        """Display images for a QR code, drawn at the screen's physical resolution"""
+        return qr_display.DisplayViews(matrix, colors, self.style["border"],
+                                       ctk.ScalingTracker.get_widget_scaling(self.qr_label),
+                                       self.display_logo(self.style))
+
+    def draw_image(self, matrix, colors, style):
+        """The image that is saved: the code at the style's box size and border, with its logo"""
+        image = qr_engine.rasterize(matrix, colors, style["box_size"], style["border"], palette=True)
+        if style["logo"]:
+            image = qr_style.apply_logo(image, matrix, colors, style["box_size"], style["border"],
+                                        style["logo"], style["logo_scale"])
+        return image
+
+    def display_logo(self, style):
+        """The (path, scale) logo argument of qr_display, or None"""
+        return (style["logo"], style["logo_scale"]) if style["logo"] else None
 
     def display_qr_code(self):
         """Display QR code in the GUI"""
-        if self.qr_image:
-            pil_image = self.qr_image.convert('RGB')
-            display_size = (300, 300)
-            pil_image = pil_image.resize(display_size, Image.Resampling.LANCZOS)
+        if self.display_views:
+            # The view is already the exact on-screen size, so CTkImage does not resample it
+            pil_image = self.display_views.view(DISPLAY_SIZE)
+            display_size = (DISPLAY_SIZE, DISPLAY_SIZE)
             
             display_image = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=display_size)
             self.qr_label.configure(image=display_image, text="")
@@ -514,13 +742,26 @@ class QRCodeGenerator(ctk.CTk):
             
         filename = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG Files", "*.png"), ("All Files", "*.*")],
+            filetypes=[("PNG Files", "*.png"), ("SVG Files", "*.svg"), ("PDF Files", "*.pdf"), ("All Files", "*.*")],
             title="Save QR Code"
         )
         
         if filename:
             try:
-                self.qr_image.save(filename)
+                extension = os.path.splitext(filename)[1].lower()
+                if extension == ".png":
+                    qr_engine.save_png(self.qr_image, filename)
+                elif extension in (".svg", ".pdf"):
+                    # Vector files are drawn straight from the modules, not from the image
+                    if self.style["logo"]:
+                        messagebox.showerror("Error", "Logos are only drawn on PNG files; save as .png or remove the logo.")
+                        return
+                    import qr_vector
+                    with open(filename, "wb") as f:
+                        f.write(qr_vector.render(self.qr_matrix, extension[1:], self.current_colors,
+                                                 self.style["box_size"], self.style["border"]))
+                else:
+                    self.qr_image.save(filename)
                 messagebox.showinfo("Success", f"QR code saved as {filename}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save QR code: {str(e)}")
@@ -533,14 +774,14 @@ class QRCodeGenerator(ctk.CTk):
             
         preview_window = ctk.CTkToplevel(self)
         preview_window.title("QR Code Preview")
-        preview_window.geometry("500x500")
+        preview_window.geometry(f"{PREVIEW_SIZE}x{PREVIEW_SIZE}")
         
         # Make the preview window modal (always on top)
         preview_window.attributes("-topmost", True)
         
-        pil_image = self.qr_image.convert('RGB')
+        pil_image = self.display_views.view(PREVIEW_SIZE)
         
-        ctk_image = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=(500, 500))
+        ctk_image = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=(PREVIEW_SIZE, PREVIEW_SIZE))
         label = ctk.CTkLabel(preview_window, image=ctk_image, text="")
         label.image = ctk_image # Keep reference
         label.pack(expand=True)
@@ -610,5 +851,6 @@ class CustomFieldDialog(ctk.CTkToplevel):
 
 # Check if the script is being run directly
 if __name__ == "__main__":
-    app = QRCodeGenerator()
+    # --startup-report prints the startup timings as JSON and exits once the window is built
+    app = QRCodeGenerator(startup_report="--startup-report" in sys.argv)
     app.mainloop()
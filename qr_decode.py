@@ -0,0 +1,511 @@
+# A small QR decoder for the codes this app renders: clean, upright images (any box size,
+# border and colors, with a fill darker than the background, and a logo in the center) and
+# the SVG/PDF files of qr_vector. It reads the modules back, undoes the mask, corrects errors
+# with its own Reed-Solomon decoder and returns the payload.
+#
+# Nothing here comes from qrcode: the function pattern positions, format information, masks,
+# block tables and Reed-Solomon arithmetic follow the QR specification (ISO/IEC 18004)
+# directly, so a bug in the encoder's tables shows up as a decoding failure instead of
+# being shared by both sides. It does not handle photos of codes; use a camera-grade
+# decoder for those.
+#
+# Usage:
+#   python qr_decode.py badges/emp0000001.png badges/emp0000002.svg
+import argparse
+import collections
+import re
+import sys
+import zlib
+
+import qr_engine
+
+# A decoded code: corrected is the number of codewords the error correction had to fix
+Decoded = collections.namedtuple('Decoded', 'payload version error_correction corrected')
+
+# Error correction levels as coded in the format information (the same values as
+# qr_engine.ERROR_CORRECTION_LEVELS), and their column in RS_BLOCKS
+LEVEL_NAMES = {1: "L", 0: "M", 3: "Q", 2: "H"}
+LEVEL_COLUMNS = {1: 0, 0: 1, 3: 2, 2: 3}
+
+# Format information: 5 data bits protected by a BCH(15, 5) code, then XORed with a mask
+FORMAT_GENERATOR = 0b10100110111
+FORMAT_MASK = 0b101010000010010
+
+# Data masks by pattern number; a module is inverted where the condition holds
+MASKS = (
+    lambda r, c: (r + c) % 2 == 0,
+    lambda r, c: r % 2 == 0,
+    lambda r, c: c % 3 == 0,
+    lambda r, c: (r + c) % 3 == 0,
+    lambda r, c: (r // 2 + c // 3) % 2 == 0,
+    lambda r, c: (r * c) % 2 + (r * c) % 3 == 0,
+    lambda r, c: ((r * c) % 2 + (r * c) % 3) % 2 == 0,
+    lambda r, c: ((r + c) % 2 + (r * c) % 3) % 2 == 0,
+)
+
+# Error correction blocks of each version (row) and level (L, M, Q, H): error correction
+# codewords per block, then (block count, data codewords per block) for one or two groups
+RS_BLOCKS = (
+    ((7, 1, 19), (10, 1, 16), (13, 1, 13), (17, 1, 9)),
+    ((10, 1, 34), (16, 1, 28), (22, 1, 22), (28, 1, 16)),
+    ((15, 1, 55), (26, 1, 44), (18, 2, 17), (22, 2, 13)),
+    ((20, 1, 80), (18, 2, 32), (26, 2, 24), (16, 4, 9)),
+    ((26, 1, 108), (24, 2, 43), (18, 2, 15, 2, 16), (22, 2, 11, 2, 12)),
+    ((18, 2, 68), (16, 4, 27), (24, 4, 19), (28, 4, 15)),
+    ((20, 2, 78), (18, 4, 31), (18, 2, 14, 4, 15), (26, 4, 13, 1, 14)),
+    ((24, 2, 97), (22, 2, 38, 2, 39), (22, 4, 18, 2, 19), (26, 4, 14, 2, 15)),
+    ((30, 2, 116), (22, 3, 36, 2, 37), (20, 4, 16, 4, 17), (24, 4, 12, 4, 13)),
+    ((18, 2, 68, 2, 69), (26, 4, 43, 1, 44), (24, 6, 19, 2, 20), (28, 6, 15, 2, 16)),
+    ((20, 4, 81), (30, 1, 50, 4, 51), (28, 4, 22, 4, 23), (24, 3, 12, 8, 13)),
+    ((24, 2, 92, 2, 93), (22, 6, 36, 2, 37), (26, 4, 20, 6, 21), (28, 7, 14, 4, 15)),
+    ((26, 4, 107), (22, 8, 37, 1, 38), (24, 8, 20, 4, 21), (22, 12, 11, 4, 12)),
+    ((30, 3, 115, 1, 116), (24, 4, 40, 5, 41), (20, 11, 16, 5, 17), (24, 11, 12, 5, 13)),
+    ((22, 5, 87, 1, 88), (24, 5, 41, 5, 42), (30, 5, 24, 7, 25), (24, 11, 12, 7, 13)),
+    ((24, 5, 98, 1, 99), (28, 7, 45, 3, 46), (24, 15, 19, 2, 20), (30, 3, 15, 13, 16)),
+    ((28, 1, 107, 5, 108), (28, 10, 46, 1, 47), (28, 1, 22, 15, 23), (28, 2, 14, 17, 15)),
+    ((30, 5, 120, 1, 121), (26, 9, 43, 4, 44), (28, 17, 22, 1, 23), (28, 2, 14, 19, 15)),
+    ((28, 3, 113, 4, 114), (26, 3, 44, 11, 45), (26, 17, 21, 4, 22), (26, 9, 13, 16, 14)),
+    ((28, 3, 107, 5, 108), (26, 3, 41, 13, 42), (30, 15, 24, 5, 25), (28, 15, 15, 10, 16)),
+    ((28, 4, 116, 4, 117), (26, 17, 42), (28, 17, 22, 6, 23), (30, 19, 16, 6, 17)),
+    ((28, 2, 111, 7, 112), (28, 17, 46), (30, 7, 24, 16, 25), (24, 34, 13)),
+    ((30, 4, 121, 5, 122), (28, 4, 47, 14, 48), (30, 11, 24, 14, 25), (30, 16, 15, 14, 16)),
+    ((30, 6, 117, 4, 118), (28, 6, 45, 14, 46), (30, 11, 24, 16, 25), (30, 30, 16, 2, 17)),
+    ((26, 8, 106, 4, 107), (28, 8, 47, 13, 48), (30, 7, 24, 22, 25), (30, 22, 15, 13, 16)),
+    ((28, 10, 114, 2, 115), (28, 19, 46, 4, 47), (28, 28, 22, 6, 23), (30, 33, 16, 4, 17)),
+    ((30, 8, 122, 4, 123), (28, 22, 45, 3, 46), (30, 8, 23, 26, 24), (30, 12, 15, 28, 16)),
+    ((30, 3, 117, 10, 118), (28, 3, 45, 23, 46), (30, 4, 24, 31, 25), (30, 11, 15, 31, 16)),
+    ((30, 7, 116, 7, 117), (28, 21, 45, 7, 46), (30, 1, 23, 37, 24), (30, 19, 15, 26, 16)),
+    ((30, 5, 115, 10, 116), (28, 19, 47, 10, 48), (30, 15, 24, 25, 25), (30, 23, 15, 25, 16)),
+    ((30, 13, 115, 3, 116), (28, 2, 46, 29, 47), (30, 42, 24, 1, 25), (30, 23, 15, 28, 16)),
+    ((30, 17, 115), (28, 10, 46, 23, 47), (30, 10, 24, 35, 25), (30, 19, 15, 35, 16)),
+    ((30, 17, 115, 1, 116), (28, 14, 46, 21, 47), (30, 29, 24, 19, 25), (30, 11, 15, 46, 16)),
+    ((30, 13, 115, 6, 116), (28, 14, 46, 23, 47), (30, 44, 24, 7, 25), (30, 59, 16, 1, 17)),
+    ((30, 12, 121, 7, 122), (28, 12, 47, 26, 48), (30, 39, 24, 14, 25), (30, 22, 15, 41, 16)),
+    ((30, 6, 121, 14, 122), (28, 6, 47, 34, 48), (30, 46, 24, 10, 25), (30, 2, 15, 64, 16)),
+    ((30, 17, 122, 4, 123), (28, 29, 46, 14, 47), (30, 49, 24, 10, 25), (30, 24, 15, 46, 16)),
+    ((30, 4, 122, 18, 123), (28, 13, 46, 32, 47), (30, 48, 24, 14, 25), (30, 42, 15, 32, 16)),
+    ((30, 20, 117, 4, 118), (28, 40, 47, 7, 48), (30, 43, 24, 22, 25), (30, 10, 15, 67, 16)),
+    ((30, 19, 118, 6, 119), (28, 18, 47, 31, 48), (30, 34, 24, 34, 25), (30, 20, 15, 61, 16)),
+)
+
+# Segment modes and the width of their character counts for versions 1-9, 10-26 and 27-40
+MODE_NUMERIC, MODE_ALPHANUMERIC, MODE_BYTE = 1, 2, 4
+COUNT_BITS = {MODE_NUMERIC: (10, 12, 14), MODE_ALPHANUMERIC: (9, 11, 13), MODE_BYTE: (8, 16, 16)}
+ALPHANUMERIC = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+
+
+class DecodeError(ValueError):
+    """The image or matrix is not a QR code this decoder can read"""
+
+
+# --- Function patterns ---
+
+def alignment_positions(version):
+    """Row/column centers of the alignment patterns: 6, then evenly spaced (even steps) up to size - 7"""
+    if version == 1:
+        return []
+    count = version // 7 + 2
+    last = version * 4 + 10
+    step = 26 if version == 32 else (version * 8 + count * 3 + 5) // (count * 4 - 4) * 2
+    return [6] + [last - step * i for i in range(count - 2, -1, -1)]
+
+
+def reserved_modules(version):
+    """Return the set of (row, col) used by finder, timing, alignment, format and version patterns"""
+    size = version * 4 + 17
+    reserved = set()
+
+    def area(rows, cols):
+        reserved.update((r, c) for r in rows for c in cols)
+
+    # Finder patterns with their separators and the format information next to them
+    area(range(9), range(9))
+    area(range(9), range(size - 8, size))
+    area(range(size - 8, size), range(9)) # Includes the dark module at (size - 8, 8)
+    area([6], range(size))
+    area(range(size), [6])
+    positions = alignment_positions(version)
+    for row in positions:
+        for col in positions:
+            if (row < 9 and (col < 9 or col >= size - 8)) or (row >= size - 8 and col < 9):
+                continue # Overlaps a finder pattern
+            area(range(row - 2, row + 3), range(col - 2, col + 3))
+    if version >= 7:
+        area(range(6), range(size - 11, size - 8))
+        area(range(size - 11, size - 8), range(6))
+    return reserved
+
+
+def format_bits(data):
+    """The 15 format information bits for 5 data bits (error correction level and mask)"""
+    value = data << 10
+    for bit in range(14, 9, -1):
+        if value & (1 << bit):
+            value ^= FORMAT_GENERATOR << (bit - 10)
+    return ((data << 10) | value) ^ FORMAT_MASK
+
+
+def read_format(modules):
+    """Return (error_correction, mask_pattern) from the best of the two copies of the format information"""
+    size = len(modules)
+    vertical = [modules[i][8] if i < 6 else modules[i + 1][8] if i < 8 else modules[size - 15 + i][8]
+                for i in range(15)]
+    horizontal = [modules[8][size - i - 1] if i < 8 else modules[8][15 - i] if i < 9 else modules[8][15 - i - 1]
+                  for i in range(15)]
+    best = None
+    for bits in (vertical, horizontal):
+        value = sum(1 << i for i, bit in enumerate(bits) if bit)
+        for data in range(32):
+            distance = bin(format_bits(data) ^ value).count('1')
+            if best is None or distance < best[0]:
+                best = distance, data
+    if best[0] > 3:
+        raise DecodeError("Unreadable format information")
+    return best[1] >> 3, best[1] & 7
+
+
+# --- Reed-Solomon over GF(256) ---
+
+# Exponents and logarithms of the field built on x^8 + x^4 + x^3 + x^2 + 1, generator 2
+GF_EXP = [0] * 512
+GF_LOG = [0] * 256
+_value = 1
+for _i in range(255):
+    GF_EXP[_i] = _value
+    GF_LOG[_value] = _i
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11d
+for _i in range(255, 512):
+    GF_EXP[_i] = GF_EXP[_i - 255]
+
+
+def gf_mul(a, b):
+    return GF_EXP[GF_LOG[a] + GF_LOG[b]] if a and b else 0
+
+
+def gf_inverse(a):
+    return GF_EXP[255 - GF_LOG[a]]
+
+
+def syndromes(block, count):
+    """The block's value at 2^0 .. 2^(count-1); all zero when no codeword is wrong"""
+    result = []
+    for i in range(count):
+        x, value = GF_EXP[i], 0
+        for codeword in block:
+            value = gf_mul(value, x) ^ codeword
+        result.append(value)
+    return result
+
+
+def solve(rows, values):
+    """Solve a linear system over GF(256) by Gaussian elimination"""
+    n = len(values)
+    rows = [list(row) + [value] for row, value in zip(rows, values)]
+    for col in range(n):
+        pivot = next((r for r in range(col, n) if rows[r][col]), None)
+        if pivot is None:
+            raise DecodeError("Too many errors to correct")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        scale = gf_inverse(rows[col][col])
+        rows[col] = [gf_mul(value, scale) for value in rows[col]]
+        for r in range(n):
+            if r != col and rows[r][col]:
+                factor = rows[r][col]
+                rows[r] = [value ^ gf_mul(factor, pivot_value) for value, pivot_value in zip(rows[r], rows[col])]
+    return [row[n] for row in rows]
+
+
+def rs_correct(block, ec_count):
+    """
+    Correct up to ec_count / 2 wrong codewords in a block (data then error correction
+    codewords). Returns (corrected block, number of codewords corrected).
+    """
+    synd = syndromes(block, ec_count)
+    if not any(synd):
+        return block, 0
+
+    # Berlekamp-Massey: the shortest error locator (lowest degree first) that generates the syndromes
+    locator, previous, length, shift, last = [1], [1], 0, 1, 1
+    for n in range(ec_count):
+        delta = synd[n]
+        for i in range(1, length + 1):
+            delta ^= gf_mul(locator[i], synd[n - i])
+        if delta == 0:
+            shift += 1
+            continue
+        scale = gf_mul(delta, gf_inverse(last))
+        updated = locator + [0] * max(0, len(previous) + shift - len(locator))
+        for i, coefficient in enumerate(previous):
+            updated[i + shift] ^= gf_mul(scale, coefficient)
+        if 2 * length <= n:
+            previous, length, last, shift = locator, n + 1 - length, delta, 1
+        else:
+            shift += 1
+        locator = updated
+    if 2 * length > ec_count:
+        raise DecodeError("Too many errors to correct")
+
+    # The roots of the locator are the inverses of the error positions' powers of 2
+    size = len(block)
+    positions = []
+    for index in range(size):
+        x = GF_EXP[(255 - (size - 1 - index)) % 255]
+        value = 0
+        for coefficient in reversed(locator[:length + 1]):
+            value = gf_mul(value, x) ^ coefficient
+        if value == 0:
+            positions.append(index)
+    if len(positions) != length:
+        raise DecodeError("Too many errors to correct")
+
+    # The error values solve syndrome i = sum of value * position^i
+    powers = [GF_EXP[size - 1 - index] for index in positions]
+    rows = [[GF_EXP[(GF_LOG[power] * i) % 255] for power in powers] for i in range(length)]
+    corrected = list(block)
+    for index, error in zip(positions, solve(rows, synd[:length])):
+        corrected[index] ^= error
+    if any(syndromes(corrected, ec_count)):
+        raise DecodeError("Too many errors to correct")
+    return corrected, length
+
+
+# --- Codewords ---
+
+def read_codewords(modules, version, mask_pattern):
+    """Read the data and error correction codewords in placement order, with the mask undone"""
+    size = len(modules)
+    reserved = reserved_modules(version)
+    mask = MASKS[mask_pattern]
+    bits = []
+    row, step = size - 1, -1
+    for col in range(size - 1, 0, -2):
+        if col <= 6:
+            col -= 1 # Skip the vertical timing pattern
+        while 0 <= row < size:
+            for c in (col, col - 1):
+                if (row, c) not in reserved:
+                    bits.append(bool(modules[row][c]) != mask(row, c))
+            row += step
+        row -= step
+        step = -step
+    return [int(''.join('1' if bit else '0' for bit in bits[i:i + 8]), 2) for i in range(0, len(bits) - 7, 8)]
+
+
+def rs_blocks(version, error_correction):
+    """Return (ec_count, [data codewords of each block]) for a version and level"""
+    ec_count, *groups = RS_BLOCKS[version - 1][LEVEL_COLUMNS[error_correction]]
+    return ec_count, [data for count, data in zip(groups[::2], groups[1::2]) for _ in range(count)]
+
+
+def data_codewords(codewords, version, error_correction, correct=True):
+    """
+    Undo the block interleaving, check every block against its error correction codewords
+    and return (data codewords, corrected codewords). Without correct, any wrong codeword
+    is an error.
+    """
+    ec_count, sizes = rs_blocks(version, error_correction)
+    total = sum(sizes) + ec_count * len(sizes)
+    if len(codewords) < total:
+        raise DecodeError("Too few codewords for this version")
+    blocks = [[] for _ in sizes]
+    position = 0
+    for i in range(max(sizes)):
+        for size, block in zip(sizes, blocks):
+            if i < size:
+                block.append(codewords[position])
+                position += 1
+    for _ in range(ec_count):
+        for block in blocks:
+            block.append(codewords[position])
+            position += 1
+
+    data, corrected = [], 0
+    for size, block in zip(sizes, blocks):
+        if correct:
+            block, count = rs_correct(block, ec_count)
+            corrected += count
+        elif any(syndromes(block, ec_count)):
+            raise DecodeError("The error correction codewords do not match the data")
+        data.extend(block[:size])
+    return data, corrected
+
+
+def parse_segments(data, version):
+    """Return the payload bytes of the numeric, alphanumeric and byte mode segments"""
+    bits = ''.join(f"{value:08b}" for value in data)
+    position = 0
+    payload = bytearray()
+    band = 0 if version < 10 else 1 if version < 27 else 2
+
+    def take(count):
+        nonlocal position
+        if position + count > len(bits):
+            raise DecodeError("The data ends inside a segment")
+        value = int(bits[position:position + count], 2)
+        position += count
+        return value
+
+    while len(bits) - position >= 4:
+        mode = take(4)
+        if mode == 0: # Terminator
+            break
+        if mode not in COUNT_BITS:
+            raise DecodeError(f"Unsupported segment mode {mode}")
+        length = take(COUNT_BITS[mode][band])
+        if mode == MODE_NUMERIC:
+            for start in range(0, length, 3):
+                digits = min(3, length - start)
+                payload += f"{take((4, 7, 10)[digits - 1]):0{digits}d}".encode('ascii')
+        elif mode == MODE_ALPHANUMERIC:
+            for start in range(0, length, 2):
+                if length - start >= 2:
+                    pair = take(11)
+                    payload += (ALPHANUMERIC[pair // 45] + ALPHANUMERIC[pair % 45]).encode('ascii')
+                else:
+                    payload += ALPHANUMERIC[take(6)].encode('ascii')
+        else:
+            payload += bytes(take(8) for _ in range(length))
+    return bytes(payload)
+
+
+def read_matrix(modules, correct=True):
+    """Decode a square grid of modules (truthy = dark, no border) into a Decoded"""
+    size = len(modules)
+    version = (size - 17) // 4
+    if size < 21 or (size - 17) % 4 or not 1 <= version <= 40:
+        raise DecodeError(f"{size} modules per side is not a QR code size")
+    error_correction, mask_pattern = read_format(modules)
+    data, corrected = data_codewords(read_codewords(modules, version, mask_pattern), version, error_correction,
+                                     correct)
+    try:
+        payload = parse_segments(data, version).decode('utf-8')
+    except UnicodeDecodeError:
+        raise DecodeError("The payload is not UTF-8") from None
+    return Decoded(payload, version, error_correction, corrected)
+
+
+def decode_matrix(modules, correct=True):
+    """Decode a square grid of modules (truthy = dark, no border) and return the payload string"""
+    return read_matrix(modules, correct).payload
+
+
+# --- Images and vector files ---
+
+def image_modules(image):
+    """
+    Find the code in an image and sample the center of every module. The code is located
+    by its dark bounding box, and the module size by the top-left finder pattern.
+    """
+    from PIL import Image
+    if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+        white = Image.new("RGBA", image.size, "white")
+        image = Image.alpha_composite(white, image.convert("RGBA"))
+    gray = image.convert("L")
+    low, high = gray.getextrema()
+    if high - low < 32:
+        raise DecodeError("The image has no contrast")
+    threshold = (low + high) // 2
+    dark = gray.point(lambda value: 255 if value < threshold else 0)
+    box = dark.getbbox()
+    if box is None:
+        raise DecodeError("The image has no dark modules")
+    left, top, right, bottom = box
+    first_row = dark.crop((left, top, right, top + 1)).tobytes()
+    run = len(first_row) - len(first_row.lstrip(b'\xff'))
+    module = run / 7 # The finder pattern is 7 modules wide
+    size = round((right - left) / module)
+    if abs((bottom - top) - (right - left)) > module or not size:
+        raise DecodeError("The dark area is not square")
+    samples = dark.crop(box).resize((size, size), Image.Resampling.NEAREST).tobytes()
+    return [samples[r * size:(r + 1) * size] for r in range(size)]
+
+
+def runs_to_modules(runs):
+    """Build a module grid from absolute (col, row, length) runs of dark modules, border included"""
+    runs = list(runs)
+    if not runs:
+        raise DecodeError("No dark modules found")
+    left = min(col for col, _, _ in runs)
+    top = min(row for _, row, _ in runs)
+    size = max(col + length for col, _, length in runs) - left
+    modules = [bytearray(size) for _ in range(size)]
+    for col, row, length in runs:
+        if not 0 <= row - top < size:
+            raise DecodeError("The dark area is not square")
+        modules[row - top][col - left:col - left + length] = b'\x01' * length
+    return modules
+
+
+def svg_modules(data):
+    """Read the modules back from the path of a qr_vector SVG"""
+    path = re.search(rb'<path [^>]*\bd="([^"]*)"', data)
+    if path is None:
+        raise DecodeError("No QR code path in the SVG")
+    runs, x, y = [], 0, 0
+    for dx, dy, length in re.findall(rb'm(-?\d+) (-?\d+)h(\d+)v1h-\d+z', path.group(1)):
+        x, y = x + int(dx), y + int(dy)
+        runs.append((x, y, int(length)))
+    return runs_to_modules(runs)
+
+
+def pdf_modules(data):
+    """Read the modules back from the first page of a qr_vector PDF"""
+    stream = re.search(rb'/FlateDecode >>\nstream\n(.*?)\nendstream', data, re.S)
+    if stream is None:
+        raise DecodeError("No content stream in the PDF")
+    ops = zlib.decompress(stream.group(1))
+    # Module runs are the "x y n 1 re" rectangles; the background is one "0 0 side side re"
+    runs = [(int(x), int(y), int(n)) for x, y, n in re.findall(rb'^(\d+) (\d+) (\d+) 1 re$', ops, re.M)]
+    return runs_to_modules(runs)
+
+
+def read_bytes(data, correct=True):
+    """Decode PNG (or any image PIL reads), SVG or PDF bytes into a Decoded"""
+    import io
+    if data.startswith(b'%PDF'):
+        return read_matrix(pdf_modules(data), correct)
+    if data.lstrip().startswith((b'<?xml', b'<svg')):
+        return read_matrix(svg_modules(data), correct)
+    from PIL import Image
+    return read_image(Image.open(io.BytesIO(data)), correct)
+
+
+def decode_bytes(data, correct=True):
+    """Decode PNG (or any image PIL reads), SVG or PDF bytes and return the payload string"""
+    return read_bytes(data, correct).payload
+
+
+def read_image(image, correct=True):
+    """Decode a PIL image of a QR code into a Decoded"""
+    return read_matrix(image_modules(image), correct)
+
+
+def decode_image(image, correct=True):
+    """Decode a PIL image of a QR code and return the payload string"""
+    return read_image(image, correct).payload
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode QR codes rendered by this app (PNG, SVG or PDF).")
+    parser.add_argument('files', nargs='+')
+    args = parser.parse_args(argv)
+    failed = 0
+    for path in args.files:
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            decoded = read_bytes(data)
+        except DecodeError as e:
+            failed += 1
+            print(f"{path}: {e}", file=sys.stderr)
+            continue
+        print(f"{path}: {qr_engine.payload_hash(decoded.payload)[:12]}, version {decoded.version}, "
+              f"level {LEVEL_NAMES[decoded.error_correction]}, {decoded.corrected} codewords corrected\n"
+              f"{decoded.payload}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
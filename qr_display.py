@@ -0,0 +1,53 @@
+# Display images for the app. Each size is drawn straight from the module matrix with a
+# whole number of pixels per module (nearest neighbour, so no filtering and no blur), padded
+# with the background color to the exact size, and cached, so showing the same code again
+# or in another widget costs nothing.
+import qr_engine
+
+
+def render_view(matrix, colors, pixels, border=qr_engine.DEFAULT_BORDER, logo=None):
+    """
+    Return a pixels x pixels RGB (RGBA for a transparent background) image of the code.
+    Codes with more modules than pixels are drawn at one pixel per module instead.
+    logo is a (path, scale) pair drawn in the center, see qr_style.
+    """
+    from PIL import ImageOps
+    side = matrix.size + 2 * border
+    box_size = max(1, pixels // side)
+    image = qr_engine.rasterize(matrix, colors, box_size, border, palette=True)
+    background = 1 if image.mode == "1" else 0 # Palette index of the background
+    if logo:
+        import qr_style
+        image = qr_style.apply_logo(image, matrix, colors, box_size, border, *logo)
+        background = qr_style.back_color(colors)[:len(image.mode)]
+    extra = pixels - image.width
+    if extra > 0:
+        # Widen the quiet zone to fill the exact size
+        before, after = extra // 2, extra - extra // 2
+        image = ImageOps.expand(image, (before, before, after, after), fill=background)
+    if image.mode == "RGBA" or image.mode == "P" and image.palette.mode == "RGBA":
+        return image.convert("RGBA")
+    return image.convert("RGB")
+
+
+class DisplayViews:
+    """
+    The display images of one QR code (matrix and colors), rendered on first use and cached
+    by size. scaling is the display's DPI scaling: sizes are logical pixels and the images
+    are rendered at the physical size, so the toolkit never has to resample them.
+    """
+    def __init__(self, matrix, colors, border=qr_engine.DEFAULT_BORDER, scaling=1.0, logo=None):
+        self.matrix = matrix
+        self.colors = dict(colors)
+        self.border = border
+        self.scaling = scaling
+        self.logo = logo
+        self._views = {}
+
+    def view(self, size):
+        """Return the image for a size x size (logical pixels) widget"""
+        pixels = round(size * self.scaling)
+        image = self._views.get(pixels)
+        if image is None:
+            image = self._views[pixels] = render_view(self.matrix, self.colors, pixels, self.border, self.logo)
+        return image
@@ -0,0 +1,290 @@
+# GUI-free QR code engine shared by the desktop app and the batch tools.
+# Nothing in here may import customtkinter/tkinter so it stays usable on
+# headless servers. qrcode, PIL and NumPy are imported on first use, so importing
+# this module (and starting the app or the CLIs) stays fast.
+import hashlib
+import io
+import re
+
+# Default colors used by the desktop app and the batch CLI
+DEFAULT_COLORS = {"fill": "black", "back": "#f0f0f0"}
+
+# Default QR code settings
+DEFAULT_ERROR_CORRECTION = 0 # qrcode.constants.ERROR_CORRECT_M
+
+# qrcode's error correction constants by level name (recovers about 7/15/25/30% of the code)
+ERROR_CORRECTION_LEVELS = {"L": 1, "M": 0, "Q": 3, "H": 2}
+DEFAULT_BOX_SIZE = 10
+DEFAULT_BORDER = 4
+
+# The fields understood by the vCard/text formatters
+RECORD_FIELDS = ('name', 'job_title', 'company', 'phone', 'whatsapp', 'email',
+                 'address', 'website', 'facebook', 'linkedin')
+
+
+# Validation patterns, compiled once
+PHONE_STRIP_RE = re.compile(r'[^\d+]')
+PHONE_RE = re.compile(r'^\+?[\d]{10,15}$')
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Prefix added to URLs given without a scheme, per platform
+URL_PREFIXES = {'facebook': "https://facebook.com/", 'linkedin': "https://linkedin.com/in/"}
+
+# Messages for the fields that can fail validation, in the order they are checked
+FIELD_ERRORS = (('name', "Name is required!"), ('phone', "Invalid phone number format!"),
+                ('whatsapp', "Invalid WhatsApp number format!"), ('email', "Invalid email format!"))
+
+
+class RecordError(ValueError):
+    """
+    Raised when a record fails validation. The message is the first problem found;
+    errors lists every (field, message) pair.
+    """
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or [(None, message)]
+
+
+def validate_phone(phone):
+    """Validate phone number"""
+    if not phone: return ""
+    phone = PHONE_STRIP_RE.sub('', phone)
+    if PHONE_RE.match(phone): return phone
+    return None
+
+
+def validate_email(email):
+    """Validate email"""
+    if not email: return ""
+    if EMAIL_RE.match(email): return email
+    return None
+
+
+def validate_url(url, platform=""):
+    """Validate and format URL"""
+    if not url: return ""
+    if not url.startswith(('http://', 'https://')):
+        url = URL_PREFIXES.get(platform.lower(), "https://") + url
+    return url
+
+
+def normalize_record(record):
+    """
+    Validate a raw record and return the user info dictionary used by the formatters.
+    Raises RecordError with the same messages the GUI shows, listing every invalid field.
+    """
+    def field(key):
+        return str(record.get(key) or '').strip()
+
+    name = field('name')
+    phone = field('phone')
+    validated_phone = validate_phone(phone)
+    whatsapp = field('whatsapp')
+    validated_whatsapp = validate_phone(whatsapp)
+    email = field('email')
+    validated_email = validate_email(email)
+
+    failed = {'name': not name, 'phone': phone and not validated_phone,
+              'whatsapp': whatsapp and not validated_whatsapp, 'email': email and not validated_email}
+    errors = [(key, message) for key, message in FIELD_ERRORS if failed[key]]
+    if errors:
+        raise RecordError(errors[0][1], errors)
+
+    # Drop empty custom fields, like the GUI does
+    custom_fields = record.get('custom_fields') or {}
+    custom_data = {str(k).strip(): str(v).strip() for k, v in custom_fields.items() if str(v or '').strip()}
+
+    return {
+        'name': name,
+        'job_title': field('job_title'),
+        'company': field('company'),
+        'phone': validated_phone or phone,
+        'whatsapp': validated_whatsapp or whatsapp,
+        'email': validated_email or email,
+        'address': field('address'),
+        'website': validate_url(field('website')),
+        'facebook': validate_url(field('facebook'), 'facebook'),
+        'linkedin': validate_url(field('linkedin'), 'linkedin'),
+        'custom_fields': custom_data
+    }
+
+
+def create_vcard_format(user_info):
+    """Create VCard format"""
+    vcard_parts = ['BEGIN:VCARD', 'VERSION:3.0']
+    if user_info['name']:
+        vcard_parts.extend([f"FN:{user_info['name']}", f"N:{user_info['name']};;;"])
+    if user_info['job_title']: vcard_parts.append(f"TITLE:{user_info['job_title']}")
+    if user_info['company']: vcard_parts.append(f"ORG:{user_info['company']}")
+    if user_info['phone']: vcard_parts.append(f"TEL:{user_info['phone']}")
+    if user_info['whatsapp']: vcard_parts.append(f"TEL;TYPE=whatsapp:+{user_info['whatsapp'].lstrip('+')}")
+    if user_info['email']: vcard_parts.append(f"EMAIL:{user_info['email']}")
+    if user_info['address']: vcard_parts.append(f"ADR:;;{user_info['address']};;;;")
+    if user_info['website']: vcard_parts.append(f"URL:{user_info['website']}")
+    if user_info['facebook']: vcard_parts.append(f"X-SOCIALPROFILE;TYPE=facebook:{user_info['facebook']}")
+    if user_info['linkedin']: vcard_parts.append(f"X-SOCIALPROFILE;TYPE=linkedin:{user_info['linkedin']}")
+    for name, value in user_info.get('custom_fields', {}).items():
+        # The custom fields are added to the VCard
+        vcard_parts.append(f"X-CUSTOM;TYPE={name}:{value}")
+    vcard_parts.append('END:VCARD')
+    return '\n'.join(vcard_parts)
+
+
+def create_text_format(user_info):
+    """Create text format with separators"""
+    data_parts = []
+    if user_info['name']: data_parts.append(f"👤 Name: {user_info['name']}")
+    if user_info['job_title']: data_parts.append(f"💼 Job Title: {user_info['job_title']}")
+    if user_info['company']: data_parts.append(f"🏢 Company: {user_info['company']}")
+    data_parts.append("─" * 30)
+    if user_info['phone']: data_parts.append(f"📞 Phone: tel:{user_info['phone']}")
+    if user_info['whatsapp']:
+        whatsapp_number = user_info['whatsapp'].lstrip('+').replace(' ', '').replace('-', '')
+        data_parts.append(f"💬 WhatsApp: https://wa.me/{whatsapp_number}")
+    if user_info['email']: data_parts.append(f"📧 Email: mailto:{user_info['email']}")
+    data_parts.append("─" * 30)
+    if user_info['address']: data_parts.append(f"📍 Address: {user_info['address']}")
+    if user_info['website']: data_parts.append(f"🌐 Website: {user_info['website']}")
+    data_parts.append("─" * 30)
+    if user_info['linkedin']: data_parts.append(f"💼 LinkedIn: {user_info['linkedin']}")
+    if user_info['facebook']: data_parts.append(f"👥 Facebook: {user_info['facebook']}")
+    if user_info.get('custom_fields'):
+        data_parts.append("─" * 30)
+        for name, value in user_info['custom_fields'].items():
+            data_parts.append(f"✨ {name}: {value}")
+    return '\n'.join(data_parts)
+
+
+# Payload formats understood by create_payload()
+FORMATS = ("vcard", "vcard4", "text")
+
+
+def create_payload(user_info, qr_format="vcard"):
+    """Build the QR payload string in the requested format ("vcard", "vcard4" or "text")"""
+    if qr_format == "vcard":
+        return create_vcard_format(user_info)
+    if qr_format == "vcard4":
+        import qr_vcard
+        return qr_vcard.create_vcard4_format(user_info)
+    if qr_format == "text":
+        return create_text_format(user_info)
+    raise ValueError(f"Unknown QR format: {qr_format}")
+
+
+class QRMatrix:
+    """
+    The encoded modules of a QR code (True = dark), without colors, box size or border.
+    Encoding is the expensive step, so a matrix can be kept and rasterized again with
+    different styling.
+    """
+    __slots__ = ('modules', 'version', 'error_correction')
+
+    def __init__(self, modules, version, error_correction):
+        self.modules = tuple(tuple(bool(m) for m in row) for row in modules)
+        self.version = version
+        self.error_correction = error_correction
+
+    @property
+    def size(self):
+        """Number of modules per side"""
+        return len(self.modules)
+
+    def __eq__(self, other):
+        return isinstance(other, QRMatrix) and (self.modules, self.version, self.error_correction) == \
+            (other.modules, other.version, other.error_correction)
+
+    def __hash__(self):
+        return hash((self.modules, self.version, self.error_correction))
+
+    def __repr__(self):
+        return f"QRMatrix(version={self.version}, size={self.size})"
+
+    def to_bytes(self):
+        """Serialize to a compact byte string (one bit per module)"""
+        bits = 0
+        for row in self.modules:
+            for module in row:
+                bits = (bits << 1) | module
+        count = self.size * self.size
+        return bytes([self.version, self.error_correction]) + bits.to_bytes((count + 7) // 8, 'big')
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild a matrix serialized with to_bytes()"""
+        version, error_correction = data[0], data[1]
+        size = version * 4 + 17
+        count = size * size
+        bits = int.from_bytes(data[2:], 'big')
+        flat = [(bits >> (count - 1 - i)) & 1 for i in range(count)]
+        modules = [flat[r * size:(r + 1) * size] for r in range(size)]
+        return cls(modules, version, error_correction)
+
+
+def encode_matrix(payload, error_correction=DEFAULT_ERROR_CORRECTION, version=None):
+    """
+    Encode the payload into a QRMatrix (version fitting, masking and so on).
+    The payload is a string, or a list of qrcode QRData segments; version is the
+    smallest version to try.
+    """
+    import qrcode
+    qr = qrcode.QRCode(version=version or 1, error_correction=error_correction, border=0)
+    if isinstance(payload, str):
+        qr.add_data(payload)
+    else:
+        for segment in payload:
+            qr.add_data(segment)
+    qr.make(fit=True)
+    return QRMatrix(qr.modules, qr.version, int(error_correction))
+
+
+def rasterize(matrix, colors=None, box_size=DEFAULT_BOX_SIZE, border=DEFAULT_BORDER, palette=False):
+    """
+    Draw a QRMatrix as an image, using the NumPy rasterizer when it is available.
+    With palette=True the result is a 1-bit or 2-color palette image instead of RGB.
+    """
+    import qr_raster
+    if palette or qr_raster.available():
+        return qr_raster.rasterize(matrix, colors or DEFAULT_COLORS, box_size, border, palette)
+    return rasterize_reference(matrix, colors, box_size, border)
+
+
+def rasterize_reference(matrix, colors=None, box_size=DEFAULT_BOX_SIZE, border=DEFAULT_BORDER):
+    """Draw a QRMatrix module by module, exactly as qrcode's make_image() would"""
+    from qrcode.image.pil import PilImage
+    colors = colors or DEFAULT_COLORS
+    image = PilImage(border, matrix.size, box_size, qrcode_modules=matrix.modules,
+                     fill_color=colors["fill"], back_color=colors["back"])
+    for r, row in enumerate(matrix.modules):
+        for c, module in enumerate(row):
+            if module:
+                image.drawrect(r, c)
+    return image
+
+
+def payload_hash(payload):
+    """Return the SHA-256 hex digest identifying a payload"""
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_qr_image(payload, colors=None, error_correction=DEFAULT_ERROR_CORRECTION,
+                  box_size=DEFAULT_BOX_SIZE, border=DEFAULT_BORDER):
+    """Encode the payload and return the QR code image"""
+    return rasterize(encode_matrix(payload, error_correction), colors, box_size, border)
+
+
+def save_png(image, fp):
+    """
+    Save a QR code image as PNG. 1-bit and palette images are written with
+    optimize=True, which packs two-color images at one bit per pixel.
+    """
+    if image.mode in ("1", "P"):
+        image.save(fp, format="PNG", optimize=True)
+    else:
+        image.save(fp, format="PNG")
+
+
+def image_to_png(image):
+    """Encode a QR code image as PNG bytes"""
+    buffer = io.BytesIO()
+    save_png(image, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,225 @@
+# Incremental batch generation driven by a SQLite manifest.
+#
+# The manifest maps every record id to the hash of its payload, a hash of the styling
+# options and the file written for it. A run diffs the input against it and renders only
+# new or changed records; outputs of records that are no longer in the input are deleted
+# once the whole input has been read. Each file is written (atomically) before its
+# manifest row is committed, so a run that crashes can simply be started again: finished
+# records are skipped and nothing is deleted until an input has been read to the end.
+#
+# Usage:
+#   python qr_batch.py employees.csv -o badges/ --incremental
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import qr_archive
+import qr_batch
+import qr_engine
+import qr_style
+import qr_validate
+
+MANIFEST_DB_NAME = ".qr_manifest.sqlite"
+
+# Records diffed per query
+DIFF_CHUNK = 500
+
+
+def style_key(options):
+    """Hash of every option that changes the output files, including the logo file's contents"""
+    if options.get('logo'):
+        options = dict(options, logo=qr_style.logo_key(options['logo'], options.get('logo_scale') or
+                                                       qr_style.DEFAULT_STYLE["logo_scale"]))
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def write_atomic(path, data):
+    """Write a file so it is either complete or not there at all, even after a crash"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def output_path(output, stored):
+    """
+    Return the absolute path of a manifest row's file, or None if it is not in the output
+    directory. Rows hold the file name; older manifests held the path as given on the
+    command line, which depends on the directory the run started from, so only its file
+    name is used.
+    """
+    output = os.path.abspath(output)
+    path = os.path.abspath(os.path.join(output, os.path.basename(stored)))
+    return path if os.path.dirname(path) == output else None
+
+
+class ManifestStore:
+    """SQLite table of record id -> payload hash, style key, output file name and QR version"""
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS outputs (
+                record_id TEXT PRIMARY KEY,
+                payload_hash TEXT NOT NULL,
+                style_key TEXT NOT NULL,
+                path TEXT NOT NULL,
+                version INTEGER,
+                last_seen INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started REAL NOT NULL,
+                finished REAL
+            );
+        """)
+        self.db.commit()
+
+    def start_run(self):
+        run_id = self.db.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+        self.db.commit()
+        return run_id
+
+    def finish_run(self, run_id):
+        self.db.execute("UPDATE runs SET finished = ? WHERE run_id = ?", (time.time(), run_id))
+        self.db.commit()
+
+    def lookup(self, record_ids):
+        """Return {record_id: (payload_hash, style_key, file name)} for the known ids"""
+        record_ids = list(record_ids)
+        rows = self.db.execute(
+            f"SELECT record_id, payload_hash, style_key, path FROM outputs "
+            f"WHERE record_id IN ({','.join('?' * len(record_ids))})", record_ids)
+        return {row[0]: row[1:] for row in rows}
+
+    def mark_seen(self, record_ids, run_id):
+        self.db.executemany("UPDATE outputs SET last_seen = ? WHERE record_id = ?",
+                            ((run_id, record_id) for record_id in record_ids))
+
+    def put(self, record_id, payload_hash, key, path, version, run_id):
+        """Store a record's output file name; returns the one it had before, if any"""
+        row = self.db.execute("SELECT path FROM outputs WHERE record_id = ?", (record_id,)).fetchone()
+        self.db.execute("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?)",
+                        (record_id, payload_hash, key, path, version, run_id))
+        return row[0] if row else None
+
+    def stale(self, run_id):
+        """Return [(record_id, file name)] for records not seen in the given run"""
+        return self.db.execute("SELECT record_id, path FROM outputs WHERE last_seen < ?", (run_id,)).fetchall()
+
+    def remove(self, record_ids):
+        self.db.executemany("DELETE FROM outputs WHERE record_id = ?", ((record_id,) for record_id in record_ids))
+
+    def entries(self):
+        """Yield (record_id, path, payload_hash, version) for every output, by record id"""
+        yield from self.db.execute("SELECT record_id, path, payload_hash, version FROM outputs ORDER BY record_id")
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def write_manifest_jsonl(store, output):
+    """Rewrite the directory's manifest.jsonl from the store, so it lists every output"""
+    lines = (json.dumps({"record_id": record_id, "member": os.path.basename(path), "payload_hash": payload_hash,
+                         "version": version}) + '\n' for record_id, path, payload_hash, version in store.entries())
+    write_atomic(os.path.join(output, qr_archive.MANIFEST_NAME), ''.join(lines).encode('utf-8'))
+
+
+def run_incremental(path, output, options=None, workers=1, chunk_size=64, max_in_flight=None,
+                    error_report=None, cache_options=None, metrics=None, manifest_path=None, transport="pickle"):
+    """
+    Bring the output directory up to date with the input file, rendering only new or
+    changed records and deleting the outputs of removed ones.
+    Returns a dictionary of counters (written, unchanged, removed, failed, cache_hits, cache_misses).
+    """
+    options = dict(options or {})
+    image_format = options.get('image_format', 'png')
+    key = style_key(options)
+    os.makedirs(output, exist_ok=True)
+    store = ManifestStore(manifest_path or os.path.join(output, MANIFEST_DB_NAME))
+    run_id = store.start_run()
+    stats = {"written": 0, "unchanged": 0, "removed": 0, "failed": 0, "cache_hits": 0, "cache_misses": 0}
+
+    def changed_records():
+        """Diff the input against the manifest and yield the records that need rendering"""
+        records = qr_validate.iter_validated(qr_batch.iter_records(path), DIFF_CHUNK)
+        while True:
+            chunk = list(itertools.islice(records, DIFF_CHUNK))
+            if not chunk:
+                return
+            ids = [qr_batch.record_id(record, index) for index, record, _, _ in chunk]
+            known = store.lookup(ids)
+            unchanged = []
+            for rid, (index, record, user_info, errors) in zip(ids, chunk):
+                entry = known.get(rid)
+                if entry and not errors:
+                    payload = qr_batch.create_payload(user_info, options.get('qr_format', 'vcard'),
+                                                      options.get('optimize'))
+                    existing = output_path(output, entry[2])
+                    if entry[:2] == (qr_engine.payload_hash(payload), key) and existing and os.path.exists(existing):
+                        unchanged.append(rid)
+                        continue
+                # Pin the id, since ids made from the position would shift in the filtered stream
+                yield dict(record, id=rid)
+            store.mark_seen(unchanged, run_id)
+            stats["unchanged"] += len(unchanged)
+
+    report = open(error_report, 'w', encoding='utf-8') if error_report else None
+    try:
+        results = qr_batch.render_records(changed_records(), options, workers, chunk_size, max_in_flight,
+                                          cache_options=cache_options, transport=transport)
+        for result in results:
+            if metrics is not None:
+                metrics.add_result(result)
+            if result.error is not None:
+                # A record that fails keeps its last good output
+                store.mark_seen([result.record_id], run_id)
+                stats["failed"] += 1
+                print(f"record {result.record_id}: {result.error}", file=sys.stderr)
+                if report:
+                    report.write(json.dumps(result._replace(data=None, metrics=None)._asdict()) + '\n')
+                continue
+            member = f"{result.record_id}.{image_format}"
+            file_path = output_path(output, member)
+            write_atomic(file_path, result.data)
+            previous = store.put(result.record_id, result.payload_hash, key, member, result.version, run_id)
+            previous = previous and output_path(output, previous)
+            if previous and previous != file_path and os.path.exists(previous):
+                os.remove(previous) # The output format changed
+            # In WAL mode a commit is cheap next to a render, and nothing finished is lost
+            store.commit()
+            stats["written"] += 1
+            stats["cache_hits" if result.cached else "cache_misses"] += 1
+        store.commit()
+
+        # The whole input has been read: whatever was not seen has been removed from it
+        stale = store.stale(run_id)
+        for _, member in stale:
+            file_path = output_path(output, member)
+            try:
+                if file_path:
+                    os.remove(file_path)
+            except FileNotFoundError:
+                pass
+        store.remove(record_id for record_id, _ in stale)
+        stats["removed"] = len(stale)
+        store.finish_run(run_id)
+        write_manifest_jsonl(store, output)
+    finally:
+        if report:
+            report.close()
+        store.close()
+    return stats
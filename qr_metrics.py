@@ -0,0 +1,241 @@
+# Instrumentation for the generation pipeline: per-stage timers, counters and summaries,
+# reported through pluggable sinks (a JSON-lines event log and a Prometheus text-format
+# file), plus an opt-in cProfile/tracemalloc hook for a single run.
+#
+# The render path fills a StageTimer per record (see qr_batch.render_job); the results
+# travel back from the worker processes with the BatchResult and are added up here.
+import collections
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+class StageTimer:
+    """Adds up the time spent in each named stage of one render"""
+    def __init__(self):
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+class NullTimer:
+    """A StageTimer that measures nothing, for callers that don't collect metrics"""
+    stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        yield
+
+
+NULL_TIMER = NullTimer()
+
+
+class Metrics:
+    """
+    Counters and summaries (count, sum, min, max) keyed by name and labels, plus the
+    sinks that receive one event per record.
+    """
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.counters = collections.Counter()
+        self.summaries = {}
+        self.help = {}
+
+    def count(self, name, value=1, **labels):
+        self.counters[name, tuple(sorted(labels.items()))] += value
+
+    def observe(self, name, value, **labels):
+        key = name, tuple(sorted(labels.items()))
+        summary = self.summaries.get(key)
+        if summary is None:
+            self.summaries[key] = [1, value, value, value]
+        else:
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = min(summary[2], value)
+            summary[3] = max(summary[3], value)
+
+    def add_result(self, result):
+        """Account for one qr_batch.BatchResult and pass it on to the sinks as an event"""
+        info = result.metrics or {}
+        if result.error is not None:
+            self.count("qr_records_total", status="failed")
+        else:
+            self.count("qr_records_total", status="ok")
+            self.count("qr_cache_requests_total", result="hit" if result.cached else "miss")
+            self.count("qr_versions_total", version=str(result.version))
+            self.observe("qr_payload_bytes", info.get("payload_bytes", 0))
+            self.observe("qr_image_bytes", len(result.data))
+        for stage, seconds in info.get("stages", {}).items():
+            self.observe("qr_stage_seconds", seconds, stage=stage)
+
+        if self.sinks:
+            event = {"record_id": result.record_id, "ok": result.error is None, "cached": result.cached,
+                     "version": result.version, "payload_bytes": info.get("payload_bytes"),
+                     "image_bytes": len(result.data) if result.data is not None else None,
+                     "stages": {stage: round(seconds, 6) for stage, seconds in info.get("stages", {}).items()}}
+            for sink in self.sinks:
+                sink.write(event)
+
+    def summary(self):
+        """Plain dictionary of every metric, e.g. for printing or JSON"""
+        def name(key):
+            metric, labels = key
+            return metric + ''.join(f"[{k}={v}]" for k, v in labels)
+        data = {name(key): value for key, value in sorted(self.counters.items())}
+        for key, (count, total, low, high) in sorted(self.summaries.items()):
+            data[name(key)] = {"count": count, "sum": total, "min": low, "max": high}
+        return data
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close(self)
+
+
+# --- Sinks ---
+
+class MetricsSink:
+    """Base class for metrics sinks: write() gets one event per record, close() the totals"""
+    def write(self, event):
+        pass
+
+    def close(self, metrics):
+        pass
+
+
+class JSONLinesSink(MetricsSink):
+    """Write one JSON line per record, and a final line with the totals"""
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, event):
+        self._file.write(json.dumps(event) + '\n')
+
+    def close(self, metrics):
+        self._file.write(json.dumps({"summary": metrics.summary()}) + '\n')
+        self._file.close()
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def prometheus_text(metrics):
+    """Render the metrics in the Prometheus text exposition format"""
+    lines = []
+    by_name = collections.defaultdict(list)
+    for (name, labels), value in metrics.counters.items():
+        by_name[name].append((labels, value))
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {name} counter")
+        lines.extend(f"{name}{_labels(labels)} {value}" for labels, value in sorted(by_name[name]))
+
+    by_name.clear()
+    for (name, labels), summary in metrics.summaries.items():
+        by_name[name].append((labels, summary))
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {name} summary")
+        for labels, (count, total, low, high) in sorted(by_name[name]):
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.9g}")
+        lines.append(f"# TYPE {name}_max gauge")
+        lines.extend(f"{name}_max{_labels(labels)} {summary[3]:.9g}" for labels, summary in sorted(by_name[name]))
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusSink(MetricsSink):
+    """Write the totals as a Prometheus text file (e.g. for node_exporter's textfile collector)"""
+    def __init__(self, path):
+        self.path = path
+
+    def close(self, metrics):
+        # Write atomically, so a scraper never reads half a file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(prometheus_text(metrics))
+        os.replace(tmp, self.path)
+
+
+# --- Profiling ---
+
+def peak_rss(children=False):
+    """
+    Peak resident set size in bytes of this process, or with children=True of its largest
+    finished child process (e.g. a worker). None where it can't be read.
+    """
+    try:
+        import resource
+    except ImportError: # Windows
+        return None if children else _windows_peak_rss()
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Kilobytes on Linux, bytes on macOS
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def _windows_peak_rss():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return counters.PeakWorkingSetSize
+
+
+@contextlib.contextmanager
+def profiled(profile_path=None, trace_memory=False, top=15, out=None):
+    """
+    Run the body under cProfile and/or tracemalloc. The profile is saved to profile_path
+    (open it with pstats or snakeviz) and the top entries of both are printed to out.
+    Only the current process is profiled.
+    """
+    out = out or sys.stderr
+    profiler = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(top)
+            print(buffer.getvalue(), file=out)
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"Python memory: {current / 1e6:.1f} MB in use, {peak / 1e6:.1f} MB peak", file=out)
+            for stat in snapshot.statistics('lineno')[:top]:
+                print(f"  {stat}", file=out)
@@ -0,0 +1,232 @@
+# Payload optimizer: builds the most compact QR code for a record.
+#
+# Two things make the standard payloads large: decoration (emoji, "─" separators and
+# redundant vCard components) and byte mode, which costs 8 bits per character. This
+# module writes compact vCard/text forms (upper-casing the parts that are case-insensitive,
+# such as URL schemes and hosts, so they fit the 5.5-bit alphanumeric mode) and splits
+# the payload into numeric/alphanumeric/byte segments with the fewest total bits.
+#
+# Usage:
+#   python qr_optimize.py employees.csv [--format text]   (reports version savings per record)
+import argparse
+import bisect
+import collections
+import sys
+from urllib.parse import urlsplit, urlunsplit
+
+from qrcode import util
+
+import qr_engine
+
+# Result of planning a record: the segments to encode and the QR version they need
+OptimizedCode = collections.namedtuple('OptimizedCode', 'payload segments version modules bits')
+
+MODES = (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE)
+
+# Cost per character in sixths of a bit: numeric 10/3, alphanumeric 11/2, byte 8
+CHAR_COST = {util.MODE_NUMBER: 20, util.MODE_ALPHA_NUM: 33, util.MODE_8BIT_BYTE: 48}
+
+# First version of each range that shares the same character count field sizes
+VERSION_CLASSES = (1, 10, 27)
+
+DIGITS = frozenset(b"0123456789")
+ALPHA_NUM = frozenset(util.ALPHA_NUM)
+
+
+def upper_origin(url):
+    """
+    Upper-case the scheme and host of a URL (both case-insensitive), keeping the port and
+    path. URLs with a user name or password, which are case-sensitive, are left unchanged,
+    and so are hosts with percent-escapes or non-ASCII characters.
+    """
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc or '@' in parts.netloc:
+        return url
+    host, colon, port = parts.netloc.rpartition(':')
+    if not (colon and port.isdigit()):
+        host, port = parts.netloc, None
+    if host.isascii() and '%' not in host:
+        host = host.upper()
+    netloc = f"{host}:{port}" if port is not None else host
+    return urlunsplit((parts.scheme.upper(), netloc, parts.path, parts.query, parts.fragment))
+
+
+def compact_vcard_format(user_info):
+    """Create the shortest VCard form: no empty trailing components, upper-case URL origins"""
+    vcard_parts = ['BEGIN:VCARD', 'VERSION:3.0']
+    if user_info['name']:
+        vcard_parts.extend([f"FN:{user_info['name']}", f"N:{user_info['name']}"])
+    if user_info['job_title']: vcard_parts.append(f"TITLE:{user_info['job_title']}")
+    if user_info['company']: vcard_parts.append(f"ORG:{user_info['company']}")
+    if user_info['phone']: vcard_parts.append(f"TEL:{user_info['phone']}")
+    if user_info['whatsapp']: vcard_parts.append(f"TEL;TYPE=WHATSAPP:+{user_info['whatsapp'].lstrip('+')}")
+    if user_info['email']: vcard_parts.append(f"EMAIL:{user_info['email']}")
+    if user_info['address']: vcard_parts.append(f"ADR:;;{user_info['address']}")
+    if user_info['website']: vcard_parts.append(f"URL:{upper_origin(user_info['website'])}")
+    if user_info['facebook']: vcard_parts.append(f"X-SOCIALPROFILE;TYPE=FACEBOOK:{upper_origin(user_info['facebook'])}")
+    if user_info['linkedin']: vcard_parts.append(f"X-SOCIALPROFILE;TYPE=LINKEDIN:{upper_origin(user_info['linkedin'])}")
+    for name, value in user_info.get('custom_fields', {}).items():
+        vcard_parts.append(f"X-CUSTOM;TYPE={name}:{value}")
+    vcard_parts.append('END:VCARD')
+    return '\n'.join(vcard_parts)
+
+
+def compact_text_format(user_info):
+    """Create the text format without emoji or separators, with upper-case labels and link schemes"""
+    data_parts = []
+    if user_info['name']: data_parts.append(f"NAME: {user_info['name']}")
+    if user_info['job_title']: data_parts.append(f"TITLE: {user_info['job_title']}")
+    if user_info['company']: data_parts.append(f"COMPANY: {user_info['company']}")
+    if user_info['phone']: data_parts.append(f"PHONE: TEL:{user_info['phone']}")
+    if user_info['whatsapp']:
+        whatsapp_number = user_info['whatsapp'].lstrip('+').replace(' ', '').replace('-', '')
+        data_parts.append(f"WHATSAPP: HTTPS://WA.ME/{whatsapp_number}")
+    if user_info['email']: data_parts.append(f"EMAIL: MAILTO:{user_info['email']}")
+    if user_info['address']: data_parts.append(f"ADDRESS: {user_info['address']}")
+    if user_info['website']: data_parts.append(f"WEBSITE: {upper_origin(user_info['website'])}")
+    if user_info['linkedin']: data_parts.append(f"LINKEDIN: {upper_origin(user_info['linkedin'])}")
+    if user_info['facebook']: data_parts.append(f"FACEBOOK: {upper_origin(user_info['facebook'])}")
+    for name, value in user_info.get('custom_fields', {}).items():
+        data_parts.append(f"{name}: {value}")
+    return '\n'.join(data_parts)
+
+
+def create_compact_payload(user_info, qr_format="vcard"):
+    """Build the compact payload string in the requested format ("vcard", "vcard4" or "text")"""
+    if qr_format == "vcard":
+        return compact_vcard_format(user_info)
+    if qr_format == "vcard4":
+        # Already free of decoration; its escaping and CRLFs are required by the format
+        return qr_engine.create_payload(user_info, qr_format)
+    if qr_format == "text":
+        return compact_text_format(user_info)
+    raise ValueError(f"Unknown QR format: {qr_format}")
+
+
+def _allowed(mode, byte):
+    if mode == util.MODE_NUMBER:
+        return byte in DIGITS
+    if mode == util.MODE_ALPHA_NUM:
+        return byte in ALPHA_NUM
+    return True
+
+
+def segment(data, version):
+    """
+    Split data (bytes) into [(mode, bytes), ...] with the fewest total bits for the
+    given version, by dynamic programming over the three modes.
+    """
+    if not data:
+        return [(util.MODE_8BIT_BYTE, data)]
+    header = {mode: (4 + util.length_in_bits(mode, version)) * 6 for mode in MODES}
+    infinity = float('inf')
+
+    # cost[mode] = cheapest encoding of the prefix that ends in a segment of this mode
+    cost = None
+    choices = [] # per byte: mode -> mode of the previous byte
+    for byte in data:
+        new_cost, previous = {}, {}
+        for mode in MODES:
+            if not _allowed(mode, byte):
+                new_cost[mode] = infinity
+            elif cost is None:
+                new_cost[mode] = header[mode] + CHAR_COST[mode]
+            else:
+                # Continue the current segment, or start a new one after the cheapest other mode
+                best_mode = min(MODES, key=lambda m: cost[m] + (0 if m == mode else header[mode]))
+                new_cost[mode] = cost[best_mode] + (0 if best_mode == mode else header[mode]) + CHAR_COST[mode]
+                previous[mode] = best_mode
+        choices.append(previous)
+        cost = new_cost
+
+    # Walk back to recover the mode of every byte, then merge runs into segments
+    mode = min(MODES, key=lambda m: cost[m])
+    modes = []
+    for i in range(len(data) - 1, -1, -1):
+        modes.append(mode)
+        if i:
+            mode = choices[i][mode]
+    modes.reverse()
+
+    segments = []
+    start = 0
+    for i in range(1, len(data) + 1):
+        if i == len(data) or modes[i] != modes[start]:
+            segments.append((modes[start], data[start:i]))
+            start = i
+    return segments
+
+
+def segment_bits(segments, version):
+    """Exact number of data bits the segments need at the given version"""
+    bits = 0
+    for mode, chunk in segments:
+        bits += 4 + util.length_in_bits(mode, version)
+        if mode == util.MODE_NUMBER:
+            bits += 10 * (len(chunk) // 3) + (0, 4, 7)[len(chunk) % 3]
+        elif mode == util.MODE_ALPHA_NUM:
+            bits += 11 * (len(chunk) // 2) + 6 * (len(chunk) % 2)
+        else:
+            bits += 8 * len(chunk)
+    return bits
+
+
+def plan(payload, error_correction=qr_engine.DEFAULT_ERROR_CORRECTION):
+    """Pick the segmentation and the smallest QR version for the payload"""
+    data = payload.encode('utf-8')
+    limits = util.BIT_LIMIT_TABLE[int(error_correction)]
+    best = None
+    for i, first in enumerate(VERSION_CLASSES):
+        last = VERSION_CLASSES[i + 1] - 1 if i + 1 < len(VERSION_CLASSES) else 40
+        segments = segment(data, first)
+        bits = segment_bits(segments, first)
+        version = bisect.bisect_left(limits, bits, first)
+        if version <= last and (best is None or version < best.version):
+            best = OptimizedCode(payload, segments, version, version * 4 + 17, bits)
+    if best is None:
+        raise ValueError("Payload too large for a QR code")
+    return best
+
+
+def to_qr_data(segments):
+    """Convert segments into qrcode QRData objects"""
+    return [util.QRData(chunk, mode=mode, check_data=False) for mode, chunk in segments]
+
+
+def encode_optimized(payload, error_correction=qr_engine.DEFAULT_ERROR_CORRECTION):
+    """Encode the payload with the optimal segmentation and return the QRMatrix"""
+    code = plan(payload, error_correction)
+    return qr_engine.encode_matrix(to_qr_data(code.segments), error_correction, version=code.version)
+
+
+def main(argv=None):
+    import qr_batch
+
+    parser = argparse.ArgumentParser(description="Report how much the optimizer shrinks each record's QR code.")
+    parser.add_argument('input', help="input .csv or .jsonl file")
+    parser.add_argument('--format', dest='qr_format', choices=qr_engine.FORMATS, default='vcard')
+    args = parser.parse_args(argv)
+
+    totals = collections.Counter()
+    print(f"{'record':<20} {'standard':>16} {'optimized':>16}")
+    for index, record in enumerate(qr_batch.iter_records(args.input), 1):
+        rid = qr_batch.record_id(record, index)
+        try:
+            user_info = qr_engine.normalize_record(record)
+        except qr_engine.RecordError as e:
+            print(f"{rid:<20} {e}")
+            continue
+        standard = qr_engine.encode_matrix(qr_engine.create_payload(user_info, args.qr_format))
+        optimized = plan(create_compact_payload(user_info, args.qr_format))
+        totals["records"] += 1
+        totals["standard"] += standard.size ** 2
+        totals["optimized"] += optimized.modules ** 2
+        print(f"{rid:<20} {f'v{standard.version} ({standard.size}x{standard.size})':>16} "
+              f"{f'v{optimized.version} ({optimized.modules}x{optimized.modules})':>16}")
+    if totals["records"]:
+        print(f"{totals['records']} records, {1 - totals['optimized'] / totals['standard']:.0%} fewer modules")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
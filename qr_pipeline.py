@@ -0,0 +1,247 @@
+# Streaming pipeline for very large inputs: read -> validate -> format -> encode -> rasterize,
+# with the caller writing the results. Each stage runs in its own thread and hands its
+# items to the next one through a queue of at most `buffer` items. A stage whose queue is
+# full waits until the next stage catches up (backpressure), so no more than the sum of
+# the buffer sizes is ever in memory, whether the input has a thousand rows or fifty million.
+# Records, payloads and images only exist while they travel through the stages.
+#
+# Usage:
+#   python qr_batch.py huge.csv -o badges.tar --pipeline
+#   python qr_batch.py huge.csv -o badges.tar --buffer read=4096 --buffer rasterize=8
+import queue
+import threading
+import time
+
+import qr_batch
+import qr_engine
+import qr_metrics
+import qr_style
+import qr_validate
+import qr_vector
+
+STAGES = ("read", "validate", "format", "encode", "rasterize")
+
+# Items each stage may queue for the next one. Later items are larger (a rendered image
+# is several kB), so their buffers are smaller.
+DEFAULT_BUFFERS = {"read": 1024, "validate": 512, "format": 256, "encode": 64, "rasterize": 16}
+
+# Largest block of records validated at once (see qr_validate.validate_columns)
+MAX_VALIDATE_BLOCK = qr_validate.BLOCK_SIZE
+
+_DONE = object()
+
+
+class _Failure:
+    """An exception raised inside a stage, passed on to be raised again by the consumer"""
+    def __init__(self, error):
+        self.error = error
+
+
+class Stage:
+    """
+    Runs a generator in a thread and hands its items over through a bounded queue.
+    Iterate over the stage to consume them; items, the time spent blocked on a full
+    queue and the deepest the queue got are kept for reporting.
+    """
+    def __init__(self, name, iterable, buffer):
+        self.name = name
+        self.buffer = buffer
+        self.items = 0
+        self.blocked = 0.0
+        self.peak = 0
+        self._queue = queue.Queue(maxsize=buffer)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(iterable,), name=f"qr-{name}", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        """Queue an item, waiting while the queue is full; False if the consumer went away"""
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            self.blocked += time.perf_counter() - start
+            return True
+        return False
+
+    def _run(self, iterable):
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not self._put(item):
+                    return
+                self.items += 1
+                self.peak = max(self.peak, self._queue.qsize())
+        except BaseException as e:
+            self._put(_Failure(e))
+            return
+        finally:
+            # Stops the upstream stages too when this one is cut short
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+        self._put(_DONE)
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self._stop.set()
+
+    def report(self):
+        return {"items": self.items, "buffer": self.buffer, "peak": self.peak, "blocked": round(self.blocked, 3)}
+
+
+class Job:
+    """One record on its way through the stages"""
+    __slots__ = ('index', 'record_id', 'user_info', 'error', 'payload', 'matrix', 'data', 'version', 'timer')
+
+    def __init__(self, index, record_id, user_info, error):
+        self.index, self.record_id = index, record_id
+        self.user_info, self.error = user_info, error
+        self.payload = self.matrix = self.data = self.version = None
+        self.timer = qr_metrics.StageTimer()
+
+    def result(self):
+        if self.error is not None:
+            return qr_batch.BatchResult(self.index, self.record_id, None, self.error, False, None, None,
+                                        {"stages": self.timer.stages})
+        metrics = {"stages": self.timer.stages, "payload_bytes": len(self.payload.encode('utf-8'))}
+        return qr_batch.BatchResult(self.index, self.record_id, self.data, None, False,
+                                    qr_engine.payload_hash(self.payload), self.version, metrics)
+
+
+# --- Stages ---
+
+def validate_stage(records, block_size):
+    """Validate column-wise, a block at a time, and start a Job per record"""
+    first_index = 1
+    for block in qr_batch.iter_chunks(records, block_size):
+        start = time.perf_counter()
+        user_infos, errors = qr_validate.validate_columns(block, first_index)
+        seconds = (time.perf_counter() - start) / len(block) # Shared evenly by the block's records
+        messages = {}
+        for error in errors:
+            messages.setdefault(error.index, []).append(error.message)
+        for index, (record, user_info) in enumerate(zip(block, user_infos), first_index):
+            job = Job(index, qr_batch.record_id(record, index), user_info,
+                      ' '.join(messages[index]) if index in messages else None)
+            job.timer.stages["validate"] = seconds
+            yield job
+        first_index += len(block)
+        del block, user_infos
+
+
+def format_stage(jobs, qr_format, optimize):
+    for job in jobs:
+        if job.error is None:
+            try:
+                with job.timer.stage("format"):
+                    job.payload = qr_batch.create_payload(job.user_info, qr_format, optimize)
+            except Exception as e:
+                job.error = str(e)
+        job.user_info = None
+        yield job
+
+
+def encode_stage(jobs, error_correction, optimize, encode=qr_batch.get_matrix):
+    for job in jobs:
+        if job.error is None:
+            try:
+                with job.timer.stage("encode"):
+                    job.matrix = encode(job.payload, error_correction, optimize)
+            except Exception as e:
+                job.error = str(e)
+        yield job
+
+
+def rasterize_stage(jobs, colors, box_size, border, palette, image_format, logo=None, logo_scale=None):
+    for job in jobs:
+        if job.error is None:
+            try:
+                if image_format == "png":
+                    with job.timer.stage("rasterize"):
+                        image = qr_engine.rasterize(job.matrix, colors, box_size, border, palette)
+                    if logo:
+                        with job.timer.stage("logo"):
+                            image = qr_style.apply_logo(image, job.matrix, colors, box_size, border, logo, logo_scale)
+                    with job.timer.stage("save"):
+                        job.data = qr_engine.image_to_png(image)
+                    del image
+                else:
+                    with job.timer.stage("vector"):
+                        job.data = qr_vector.render(job.matrix, image_format, colors, box_size, border)
+                job.version = job.matrix.version
+            except Exception as e:
+                job.error = str(e)
+        job.matrix = None
+        yield job
+
+
+def parse_buffers(specs):
+    """Turn ["encode=32", ...] into a full {stage: size} dictionary"""
+    buffers = dict(DEFAULT_BUFFERS)
+    for spec in specs or ():
+        name, _, size = spec.partition('=')
+        if name not in buffers or not size.isdigit() or int(size) < 1:
+            raise ValueError(f"Invalid buffer {spec!r}: expected STAGE=SIZE with STAGE one of {', '.join(STAGES)}")
+        buffers[name] = int(size)
+    return buffers
+
+
+class Pipeline:
+    """
+    The chain of stages for one run. Iterate over it for a qr_batch.BatchResult per record,
+    in input order; stages() reports how each stage did. Failed records pass through the
+    stages untouched, so their results stay in order too. encode(payload, error_correction,
+    optimize) returns a payload's QRMatrix (default: qr_batch.get_matrix, through the cache).
+    """
+    def __init__(self, records, options=None, buffers=None, cache_options=None, encode=None):
+        options = dict(options or {})
+        self.buffers = dict(DEFAULT_BUFFERS, **(buffers or {}))
+        self.options = options
+        self.records = records
+        self.cache_options = cache_options
+        self.encode = encode or qr_batch.get_matrix
+        self._stages = []
+
+    def _chain(self, name, iterable):
+        stage = Stage(name, iterable, self.buffers[name])
+        self._stages.append(stage)
+        return stage
+
+    def __iter__(self):
+        options = self.options
+        optimize = options.get('optimize', False)
+        error_correction = options.get('error_correction', qr_engine.DEFAULT_ERROR_CORRECTION)
+        logo, logo_scale = options.get('logo'), options.get('logo_scale') or qr_style.DEFAULT_STYLE["logo_scale"]
+        if logo:
+            if options.get('image_format', 'png') != 'png':
+                raise ValueError("Logos are only drawn on PNG output")
+            error_correction = qr_style.logo_error_correction(error_correction, logo_scale)
+        # The matrix cache is kept (re-runs skip the encoding); the image cache is not set up,
+        # since a single pass over millions of distinct records would never hit it
+        qr_batch.init_worker(self.cache_options, images=False)
+        jobs = self._chain("read", self.records)
+        jobs = self._chain("validate", validate_stage(jobs, min(self.buffers["validate"], MAX_VALIDATE_BLOCK)))
+        jobs = self._chain("format", format_stage(jobs, options.get('qr_format', 'vcard'), optimize))
+        jobs = self._chain("encode", encode_stage(jobs, error_correction, optimize, self.encode))
+        jobs = self._chain("rasterize", rasterize_stage(jobs, options.get('colors') or qr_engine.DEFAULT_COLORS,
+                                                        options.get('box_size', qr_engine.DEFAULT_BOX_SIZE),
+                                                        options.get('border', qr_engine.DEFAULT_BORDER),
+                                                        options.get('palette', False),
+                                                        options.get('image_format', 'png'), logo, logo_scale))
+        for job in jobs:
+            yield job.result()
+
+    def stages(self):
+        """{stage: {"items", "buffer", "peak", "blocked"}}; blocked is the time spent waiting on the next stage"""
+        return {stage.name: stage.report() for stage in self._stages}
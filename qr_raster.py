@@ -0,0 +1,82 @@
+# Vectorized rasterizer: turns a QRMatrix into a PIL image with NumPy instead of
+# drawing one rectangle per module. The matrix is upscaled with repeat() and the colors
+# are applied with a single palette conversion. NumPy is optional; without it qr_engine
+# falls back to qrcode's own drawing.
+from PIL import Image, ImageColor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def available():
+    """Return True if the NumPy rasterizer can be used"""
+    return np is not None
+
+
+def resolve_mode(colors):
+    """
+    Pick the image mode and pixel values the same way qrcode's PilImage does:
+    1-bit for black on white, RGBA for a transparent background, RGB otherwise.
+    Returns (mode, fill_value, back_value).
+    """
+    fill, back = colors["fill"], colors["back"]
+    fill = fill.lower() if isinstance(fill, str) else fill
+    back = back.lower() if isinstance(back, str) else back
+    if fill == "black" and back == "white":
+        return "1", 0, 255
+    if back == "transparent":
+        return "RGBA", ImageColor.getcolor(fill, "RGBA") if isinstance(fill, str) else fill, (0, 0, 0, 0)
+    return ("RGB",
+            ImageColor.getcolor(fill, "RGB") if isinstance(fill, str) else fill,
+            ImageColor.getcolor(back, "RGB") if isinstance(back, str) else back)
+
+
+def module_mask(matrix, box_size, border):
+    """Return a boolean pixel array (True = dark) for the matrix with its border, upscaled by box_size"""
+    mask = np.array(matrix.modules, dtype=bool)
+    if border:
+        mask = np.pad(mask, border, constant_values=False)
+    return mask.repeat(box_size, axis=0).repeat(box_size, axis=1)
+
+
+def index_image(matrix, box_size, border):
+    """Return a "P" image whose pixels are 1 for dark modules and 0 for the background"""
+    if np is not None:
+        indices = module_mask(matrix, box_size, border).view(np.uint8)
+        height, width = indices.shape
+        return Image.frombuffer("P", (width, height), indices.tobytes(), "raw", "P", 0, 1)
+
+    # Without NumPy: one pixel per module, then an exact nearest-neighbour upscale
+    side = matrix.size + 2 * border
+    blank = bytes(side)
+    rows = [blank] * border + [bytes(border) + bytes(row) + bytes(border) for row in matrix.modules] + [blank] * border
+    image = Image.frombytes("P", (side, side), b''.join(rows))
+    return image.resize((side * box_size, side * box_size), Image.Resampling.NEAREST)
+
+
+def rasterize(matrix, colors, box_size, border, palette=False):
+    """
+    Draw a QRMatrix as a PIL image, pixel-identical to qrcode's make_image().
+    With palette=True the image is kept as a 1-bit or 2-entry palette image instead
+    of being expanded to RGB, which needs a third of the memory or less.
+    """
+    mode, fill, back = resolve_mode(colors)
+
+    if mode == "1" and np is not None:
+        # Light pixels are 1 in mode "1", so pack the inverted mask 8 pixels per byte
+        mask = module_mask(matrix, box_size, border)
+        height, width = mask.shape
+        packed = np.packbits(~mask, axis=1)
+        return Image.frombuffer("1", (width, height), packed.tobytes(), "raw", "1", 0, 1)
+
+    # Palette lookup done by PIL in C: index 0 is the background, index 1 the module color
+    image = index_image(matrix, box_size, border)
+    if mode == "1":
+        image.putpalette(bytes((255, 255, 255, 0, 0, 0)))
+        return image.convert("1")
+    image.putpalette(bytes(back) + bytes(fill), mode)
+    if palette:
+        return image
+    return image.convert(mode)
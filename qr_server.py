@@ -0,0 +1,271 @@
+# Small asyncio HTTP service that renders QR codes on demand.
+#
+# Usage:
+#   python qr_server.py --port 8080 --workers 4
+#
+#   GET  /qr?name=Jane+Doe&phone=%2B15551234567&format=vcard&fill=black&back=white
+#   POST /qr   (JSON body with the record fields, plus optional "format" and style keys)
+#   GET  /health
+#   GET  /metrics   (Prometheus text format)
+#
+# Query parameters named custom.<Field> become custom fields; optimize=1 returns the
+# smallest code (see qr_optimize). Rendering runs on a process pool; concurrent requests
+# for the same code share one render, and responses carry an ETag derived from the
+# payload and styling so clients and proxies can cache them.
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import qr_batch
+import qr_cache
+import qr_engine
+import qr_metrics
+
+MAX_BODY_BYTES = 64 * 1024
+
+# Limits of the styling options, so one request cannot ask for a huge image
+MAX_BOX_SIZE = 20
+MAX_BORDER = 16
+
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    """Raised to answer a request with an error status"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_style(params):
+    """Pull the format and styling options out of the request parameters; raises HTTPError(400) for bad ones"""
+    from PIL import ImageColor
+    try:
+        qr_format, style = params.pop('format', 'vcard'), {
+            'colors': {"fill": params.pop('fill', qr_engine.DEFAULT_COLORS['fill']),
+                       "back": params.pop('back', qr_engine.DEFAULT_COLORS['back'])},
+            'box_size': int(params.pop('box_size', qr_engine.DEFAULT_BOX_SIZE)),
+            'border': int(params.pop('border', qr_engine.DEFAULT_BORDER)),
+            'palette': str(params.pop('palette', '')).lower() in ('1', 'true', 'yes'),
+            'optimize': str(params.pop('optimize', '')).lower() in ('1', 'true', 'yes'),
+        }
+    except (TypeError, ValueError) as e:
+        raise HTTPError(400, f"Invalid option: {e}")
+    if qr_format not in qr_engine.FORMATS:
+        raise HTTPError(400, f"Invalid option: format must be one of {', '.join(qr_engine.FORMATS)}")
+    if not 1 <= style['box_size'] <= MAX_BOX_SIZE:
+        raise HTTPError(400, f"Invalid option: box_size must be between 1 and {MAX_BOX_SIZE}")
+    if not 0 <= style['border'] <= MAX_BORDER:
+        raise HTTPError(400, f"Invalid option: border must be between 0 and {MAX_BORDER}")
+    for name, color in style['colors'].items():
+        if name == "back" and str(color).lower() == "transparent":
+            continue
+        try:
+            ImageColor.getrgb(color)
+        except (AttributeError, TypeError, ValueError):
+            raise HTTPError(400, f"Invalid option: {name} is not a color: {color!r}") from None
+    return qr_format, style
+
+
+def params_to_record(params):
+    """
+    Turn flat request parameters into a record; custom.<Field> keys become custom fields.
+    Raises HTTPError(400) unless every value is a string (or null) and custom_fields is an
+    object of strings.
+    """
+    custom_fields = params.pop('custom_fields', None)
+    if custom_fields is None:
+        custom_fields = {}
+    if not isinstance(custom_fields, dict):
+        raise HTTPError(400, "Invalid field: custom_fields must be an object")
+    record = {'custom_fields': dict(custom_fields)}
+    for key, value in params.items():
+        if key.startswith('custom.'):
+            record['custom_fields'][key[len('custom.'):]] = value
+        else:
+            record[key] = value
+    fields = [(key, value) for key, value in record.items() if key != 'custom_fields']
+    for key, value in fields + list(record['custom_fields'].items()):
+        if value is not None and not isinstance(value, str):
+            raise HTTPError(400, f"Invalid field: {key} must be a string")
+    return record
+
+
+def render_png(payload, style):
+    """Worker process entry point: render the payload to PNG bytes"""
+    data, _, _ = qr_batch.render_payload(payload, **style)
+    return data
+
+
+class QRServer:
+    """Renders QR codes for HTTP requests, coalescing identical concurrent requests"""
+    def __init__(self, workers=1, cache_options=None, max_age=86400):
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=qr_batch.init_worker,
+                                        initargs=(cache_options,))
+        self.max_age = max_age
+        self.in_flight = {} # cache key -> future of the running render
+        self.stats = {"requests": 0, "renders": 0, "coalesced": 0, "not_modified": 0}
+        self.metrics = qr_metrics.Metrics()
+
+    async def render(self, key, payload, style):
+        """Render the payload, joining an identical render that is already running"""
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            self.metrics.count("qr_renders_total", result="coalesced")
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        future = loop.run_in_executor(self.pool, render_png, payload, style)
+        self.in_flight[key] = future
+        self.stats["renders"] += 1
+        self.metrics.count("qr_renders_total", result="rendered")
+        try:
+            data = await asyncio.shield(future)
+            self.metrics.observe("qr_render_seconds", time.perf_counter() - start)
+            self.metrics.observe("qr_payload_bytes", len(payload.encode('utf-8')))
+            self.metrics.observe("qr_image_bytes", len(data))
+            return data
+        finally:
+            self.in_flight.pop(key, None)
+
+    async def handle_qr(self, method, query, headers, body):
+        if method == 'GET':
+            params = dict(parse_qsl(query))
+        elif method == 'POST':
+            try:
+                params = json.loads(body or b'{}')
+            except ValueError:
+                raise HTTPError(400, "Request body must be JSON")
+            if not isinstance(params, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+        else:
+            raise HTTPError(405, "Use GET or POST")
+
+        qr_format, style = parse_style(params)
+        try:
+            user_info = qr_engine.normalize_record(params_to_record(params))
+            payload = qr_batch.create_payload(user_info, qr_format, style['optimize'])
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        # The ETag only depends on the payload and styling, so a client that already
+        # has the image is answered without rendering anything
+        key = qr_cache.make_key(payload, style['colors'], qr_engine.DEFAULT_ERROR_CORRECTION,
+                                style['box_size'], style['border'], style['palette'], style['optimize'])
+        etag = f'"{key}"'
+        cache_headers = {"ETag": etag, "Cache-Control": f"public, max-age={self.max_age}"}
+        if headers.get('if-none-match') == etag:
+            self.stats["not_modified"] += 1
+            self.metrics.count("qr_renders_total", result="not_modified")
+            return 304, cache_headers, b''
+        data = await self.render(key, payload, style)
+        return 200, dict(cache_headers, **{"Content-Type": "image/png"}), data
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == '/qr':
+            return await self.handle_qr(method, url.query, headers, body)
+        if url.path == '/health':
+            return 200, {"Content-Type": "application/json"}, json.dumps(self.stats).encode('utf-8')
+        if url.path == '/metrics':
+            return 200, {"Content-Type": "text/plain; version=0.0.4"}, \
+                qr_metrics.prometheus_text(self.metrics).encode('utf-8')
+        raise HTTPError(404, "Not found")
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                self.stats["requests"] += 1
+                try:
+                    length = int(headers.get('content-length', 0))
+                    if length > MAX_BODY_BYTES:
+                        headers['connection'] = 'close' # The unread body makes the stream unusable
+                        raise HTTPError(413, "Request body too large")
+                    body = await reader.readexactly(length) if length else b''
+                    status, response_headers, data = await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, response_headers, data = e.status, {"Content-Type": "text/plain; charset=utf-8"}, \
+                        str(e).encode('utf-8')
+                except Exception as e:
+                    status, response_headers, data = 500, {"Content-Type": "text/plain; charset=utf-8"}, \
+                        f"Failed to generate QR code: {e}".encode('utf-8')
+
+                self.metrics.count("qr_http_requests_total", status=str(status))
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                response_headers["Content-Length"] = str(len(data))
+                response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+                head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n" + \
+                    ''.join(f"{k}: {v}\r\n" for k, v in response_headers.items()) + "\r\n"
+                writer.write(head.encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        """Serve until SIGTERM (or Ctrl+C, which interrupts asyncio.run)"""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except NotImplementedError:
+            pass # Windows: there is no SIGTERM to catch, terminate() ends the process outright
+        print(f"Serving QR codes on http://{host}:{port}/qr", flush=True)
+        async with server:
+            await stop.wait()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve QR code images over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=1, help="render processes (default: 1)")
+    parser.add_argument('--cache-items', type=int, default=1024,
+                        help="in-memory render cache entries per worker (0 disables it)")
+    parser.add_argument('--max-age', type=int, default=86400, help="Cache-Control max-age in seconds")
+    args = parser.parse_args(argv)
+
+    cache_options = {'max_items': args.cache_items} if args.cache_items > 0 else None
+    server = QRServer(args.workers, cache_options, args.max_age)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
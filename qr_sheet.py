@@ -0,0 +1,292 @@
+# Print sheets: tiles the QR codes of a batch of records onto A4/Letter pages, with an
+# optional name/company caption under each code, ready for label sheets.
+# Pages are drawn and written one at a time (a multi-page PDF with vector codes, or a
+# multi-page TIFF at the requested DPI), so memory stays bounded for any number of records.
+#
+# Usage:
+#   python qr_sheet.py employees.csv -o sheets.pdf --page a4 --columns 3 --rows 4 --caption
+#   python qr_sheet.py employees.csv -o sheets.tiff --page letter --dpi 300 --workers 4
+import argparse
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import qr_batch
+import qr_engine
+import qr_validate
+import qr_vector
+
+POINTS_PER_INCH = 72
+
+# Page sizes in points
+PAGE_SIZES = {"a4": (595.28, 841.89), "letter": (612, 792)}
+
+
+class SheetLayout:
+    """A grid of equal cells on a page. Sizes are in points, measured from the top-left corner."""
+    def __init__(self, page="a4", columns=3, rows=4, margin=36, gap=12, caption=False, font_size=9):
+        if columns < 1 or rows < 1:
+            raise ValueError("A sheet needs at least one column and one row")
+        self.width, self.height = PAGE_SIZES[page]
+        self.columns, self.rows = columns, rows
+        self.margin, self.gap = margin, gap
+        self.font_size = font_size
+        self.line_height = font_size * 1.25
+        self.caption_height = 2 * self.line_height if caption else 0
+        self.cell_width = (self.width - 2 * margin - (columns - 1) * gap) / columns
+        self.cell_height = (self.height - 2 * margin - (rows - 1) * gap) / rows
+        self.code_size = min(self.cell_width, self.cell_height - self.caption_height)
+        if self.code_size <= 0:
+            raise ValueError("The page is too small for this many columns and rows")
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    def cells(self):
+        """Yield the top-left corner (x, y) of every code on a page, row by row"""
+        for row in range(self.rows):
+            for column in range(self.columns):
+                x = self.margin + column * (self.cell_width + self.gap) + (self.cell_width - self.code_size) / 2
+                yield x, self.margin + row * (self.cell_height + self.gap)
+
+
+def caption_lines(user_info):
+    """The caption printed under a code: the name and the company"""
+    return [line for line in (user_info['name'], user_info['company']) if line]
+
+
+def shorten(text, fits):
+    """Cut text (adding an ellipsis) until fits(text) is true"""
+    if fits(text):
+        return text
+    while text and not fits(text + "…"):
+        text = text[:-1]
+    return text + "…"
+
+
+class PDFSheetWriter:
+    """Writes sheets as PDF pages, with vector codes and Helvetica captions"""
+    RESOURCES = "<< /Font << /F1 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica " \
+                "/Encoding /WinAnsiEncoding >> >> >>"
+
+    # Average Helvetica character width, as a share of the font size (for shortening captions)
+    CHAR_WIDTH = 0.55
+
+    def __init__(self, path, layout, colors, border, dpi=None):
+        self.layout, self.colors, self.border = layout, colors, border
+        self._file = open(path, 'wb')
+        self._pdf = qr_vector.PDFWriter(self._file)
+
+    def fit_error(self, matrix):
+        """Vector codes scale to any cell"""
+        return None
+
+    def _text(self, text, x, baseline):
+        data = text.encode('cp1252', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+        return b"BT /F1 %s Tf %s %s Td (%s) Tj ET\n" % (
+            f"{self.layout.font_size:g}".encode(), f"{x:.2f}".encode(), f"{baseline:.2f}".encode(), data)
+
+    def add_page(self, items):
+        """Draw one page from [(matrix, caption_lines), ...]"""
+        layout = self.layout
+        max_chars = int(layout.code_size / (layout.font_size * self.CHAR_WIDTH))
+        ops = []
+        for (matrix, caption), (x, y) in zip(items, layout.cells()):
+            module = layout.code_size / (matrix.size + 2 * self.border)
+            ops.append(qr_vector.pdf_code_ops(matrix, self.colors, self.border, x, layout.height - y, module))
+            if caption:
+                ops.append(b"0 g\n")
+            for i, line in enumerate(caption):
+                baseline = layout.height - (y + layout.code_size + i * layout.line_height + layout.font_size)
+                ops.append(self._text(shorten(line, lambda text: len(text) <= max_chars), x, baseline))
+        self._pdf.add_page(layout.width, layout.height, b''.join(ops), self.RESOURCES)
+
+    def close(self):
+        self._pdf.close()
+        self._file.close()
+
+
+class TIFFSheetWriter:
+    """Writes sheets as the pages of a multi-page TIFF, rendered at dpi"""
+    # Used for captions when it is installed (it covers accented names); Pillow's font otherwise
+    FONT = "DejaVuSans.ttf"
+
+    def __init__(self, path, layout, colors, border, dpi=300):
+        from PIL import ImageFont, TiffImagePlugin
+        import qr_raster
+        self.layout, self.colors, self.border, self.dpi = layout, colors, border, dpi
+        self.scale = dpi / POINTS_PER_INCH
+        self.size = (round(layout.width * self.scale), round(layout.height * self.scale))
+        # Black-on-white sheets stay 1-bit (with fax compression); anything else is RGB
+        self.mode = "1" if qr_raster.resolve_mode(colors)[0] == "1" else "RGB"
+        self.compression = "group4" if self.mode == "1" else "tiff_deflate"
+        try:
+            self.font = ImageFont.truetype(self.FONT, layout.font_size * self.scale)
+        except OSError:
+            self.font = ImageFont.load_default(size=layout.font_size * self.scale)
+        self._tiff = TiffImagePlugin.AppendingTiffWriter(path, new=True)
+
+    def _box_size(self, matrix):
+        """Whole pixels per module of a code in its cell (0 if it does not fit)"""
+        return int(self.layout.code_size * self.scale) // (matrix.size + 2 * self.border)
+
+    def fit_error(self, matrix):
+        """Why a code cannot be drawn in its cell at this resolution, or None if it can"""
+        if self._box_size(matrix) < 1:
+            return f"a version {matrix.version} code does not fit in its cell at {self.dpi} dpi"
+        return None
+
+    def add_page(self, items):
+        """Draw one page from [(matrix, caption_lines), ...]"""
+        from PIL import Image, ImageDraw
+        layout, scale = self.layout, self.scale
+        page = Image.new(self.mode, self.size, "white")
+        draw = ImageDraw.Draw(page)
+        code_pixels = int(layout.code_size * scale)
+        for (matrix, caption), (x, y) in zip(items, layout.cells()):
+            # Whole pixels per module keep the modules sharp; center what is left over
+            side = matrix.size + 2 * self.border
+            box_size = self._box_size(matrix)
+            if box_size < 1:
+                raise ValueError(self.fit_error(matrix))
+            width = box_size * side
+            offset = (code_pixels - width) // 2
+            left, top = round(x * scale) + offset, round(y * scale) + offset
+            page.paste(qr_engine.rasterize(matrix, self.colors, box_size, self.border, palette=True), (left, top))
+            for i, line in enumerate(caption):
+                line = shorten(line, lambda text: draw.textlength(text, font=self.font) <= width)
+                draw.text((left, top + width + round(i * layout.line_height * scale)), line,
+                          fill="black", font=self.font)
+        page.save(self._tiff, format="TIFF", compression=self.compression, dpi=(self.dpi, self.dpi))
+        self._tiff.newFrame()
+
+    def close(self):
+        self._tiff.close()
+
+
+def open_sheet_writer(path, layout, colors, border, dpi):
+    """Pick the sheet writer from the output extension: .pdf or .tif/.tiff"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.pdf':
+        return PDFSheetWriter(path, layout, colors, border, dpi)
+    if ext in ('.tif', '.tiff'):
+        return TIFFSheetWriter(path, layout, colors, border, dpi)
+    raise ValueError(f"Unsupported sheet format: {path} (expected .pdf or .tiff)")
+
+
+def encode_payload(payload, optimize=False):
+    """
+    Worker entry point: (QRMatrix, None) for a payload, through the matrix cache, or
+    (None, error message) if it cannot be encoded (e.g. too long for a QR code)
+    """
+    try:
+        return qr_batch.get_matrix(payload, optimize=optimize), None
+    except Exception as e:
+        return None, str(e)
+
+
+def compose_sheets(path, output, qr_format="vcard", colors=None, border=qr_engine.DEFAULT_BORDER,
+                   optimize=False, layout=None, caption=False, dpi=300, workers=1, cache_options=None):
+    """
+    Tile the codes of every record in the input file onto pages written to output.
+    Only one page of records is held at a time. Returns a dictionary of counters
+    (codes, pages, failed); bad records are reported on stderr and skipped.
+    """
+    layout = layout or SheetLayout(caption=caption)
+    colors = dict(colors or qr_engine.DEFAULT_COLORS)
+    if str(colors["back"]).lower() == "transparent":
+        colors["back"] = "white" # Printed sheets have no transparency
+    stats = {"codes": 0, "pages": 0, "failed": 0}
+
+    def valid_records():
+        for index, record, user_info, errors in qr_validate.iter_validated(qr_batch.iter_records(path)):
+            if errors:
+                stats["failed"] += 1
+                message = ' '.join(error.message for error in errors)
+                print(f"record {qr_batch.record_id(record, index)}: {message}", file=sys.stderr)
+                continue
+            yield qr_batch.record_id(record, index), user_info
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=qr_batch.init_worker, initargs=(cache_options,))
+    else:
+        qr_batch.init_worker(cache_options)
+    def fail(rid, message):
+        stats["failed"] += 1
+        print(f"record {rid}: {message}", file=sys.stderr)
+
+    writer = open_sheet_writer(output, layout, colors, border, dpi)
+    try:
+        records = valid_records()
+        cells = [] # Encoded codes waiting for a page; failed records leave no gap
+        while True:
+            batch = list(itertools.islice(records, layout.per_page))
+            jobs = []
+            for rid, user_info in batch:
+                try:
+                    jobs.append((rid, user_info, qr_batch.create_payload(user_info, qr_format, optimize)))
+                except Exception as e:
+                    fail(rid, e)
+            payloads = [payload for _, _, payload in jobs]
+            if pool is not None and payloads:
+                encoded = list(pool.map(encode_payload, payloads, itertools.repeat(optimize),
+                                        chunksize=max(1, len(payloads) // workers)))
+            else:
+                encoded = [encode_payload(payload, optimize) for payload in payloads]
+            for (rid, user_info, _), (matrix, error) in zip(jobs, encoded):
+                if error is None:
+                    error = writer.fit_error(matrix)
+                if error is not None:
+                    fail(rid, error)
+                    continue
+                cells.append((matrix, caption_lines(user_info) if caption else []))
+            while len(cells) >= layout.per_page or (cells and not batch):
+                writer.add_page(cells[:layout.per_page])
+                stats["codes"] += len(cells[:layout.per_page])
+                stats["pages"] += 1
+                del cells[:layout.per_page]
+            if not batch:
+                break
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.shutdown()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tile QR codes onto printable A4/Letter sheets (PDF or TIFF).")
+    parser.add_argument('input', help="input .csv or .jsonl file")
+    parser.add_argument('-o', '--output', default='sheets.pdf', help="output .pdf or .tiff file (default: sheets.pdf)")
+    parser.add_argument('--format', dest='qr_format', choices=qr_engine.FORMATS, default='vcard')
+    parser.add_argument('--fill', default=qr_engine.DEFAULT_COLORS['fill'], help="QR code color")
+    parser.add_argument('--back', default=qr_engine.DEFAULT_COLORS['back'], help="background color")
+    parser.add_argument('--border', type=int, default=qr_engine.DEFAULT_BORDER)
+    parser.add_argument('--optimize', action='store_true', help="use the smallest QR codes (see qr_optimize)")
+    parser.add_argument('--page', choices=sorted(PAGE_SIZES), default='a4')
+    parser.add_argument('--columns', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=4)
+    parser.add_argument('--margin', type=float, default=36, help="page margin in points (default: 36, half an inch)")
+    parser.add_argument('--gap', type=float, default=12, help="space between cells in points (default: 12)")
+    parser.add_argument('--caption', action='store_true', help="print the name and company under each code")
+    parser.add_argument('--font-size', type=float, default=9, help="caption size in points (default: 9)")
+    parser.add_argument('--dpi', type=int, default=300, help="TIFF resolution (default: 300)")
+    parser.add_argument('--workers', type=int, default=1, help="encoding processes (default: 1)")
+    args = parser.parse_args(argv)
+
+    try:
+        layout = SheetLayout(args.page, args.columns, args.rows, args.margin, args.gap, args.caption, args.font_size)
+    except ValueError as e:
+        parser.error(str(e))
+    stats = compose_sheets(args.input, args.output, args.qr_format, {"fill": args.fill, "back": args.back},
+                           args.border, args.optimize, layout, args.caption, args.dpi, args.workers,
+                           {'max_items': 1024})
+    print(f"{stats['codes']} QR codes on {stats['pages']} pages written to {args.output}, {stats['failed']} failed")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# Shared-memory transport for the multi-process batch path. Instead of pickling every
+# rendered image back to the parent, workers copy it into a slot of a ring of fixed-size
+# slots in one multiprocessing.shared_memory block and return only the slot number.
+# The parent hands a read-only view of the slot to the writer (no copy, no unpickling)
+# and recycles the slot once the next result is asked for. Slots are assigned by the
+# parent when it submits a chunk, so the ring never needs locking.
+#
+# Pickling stays the default transport. Copying through shared memory only pays off for
+# large images: with 177 kB PNGs it cut the parent's CPU time per record by about 30%, but
+# with typical codes of a few kB it was slower than pickling. So images smaller than
+# min_bytes, larger than a slot, or without a free slot still travel pickled. The ring's
+# size is capped at ring_bytes, which bounds the shared memory a run uses.
+#
+# Usage:
+#   python qr_batch.py employees.csv -o badges/ --workers 8 --transport shm
+import collections
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import qr_batch
+
+# Default slot size; bigger outputs fall back to pickling
+DEFAULT_SLOT_BYTES = 256 * 1024
+
+# Images smaller than this are pickled: on one core, pickling was as fast as the copy into a
+# slot for 8-53 kB PNGs (benchmarks/bench_transport.py), and faster for a few kB
+DEFAULT_MIN_BYTES = 128 * 1024
+
+# Upper bound on the size of the whole ring
+DEFAULT_RING_BYTES = 32 * 1024 * 1024
+
+
+# The ring of the current worker process, attached by init_worker()
+_ring = None
+
+
+def attach(name):
+    """Open the parent's shared memory block; only the parent unlinks it"""
+    try:
+        return shared_memory.SharedMemory(name, track=False) # Python 3.13+
+    except TypeError:
+        # Pool workers share the parent's resource tracker, which is told about the unlink
+        return shared_memory.SharedMemory(name)
+
+
+class SlotRing:
+    """`slots` slots of slot_bytes each, in one shared memory block owned by the parent"""
+    def __init__(self, slots, slot_bytes=DEFAULT_SLOT_BYTES):
+        self.slots, self.slot_bytes = slots, slot_bytes
+        self.block = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free = collections.deque(range(slots))
+
+    @property
+    def name(self):
+        return self.block.name
+
+    def take(self, count):
+        """count slots, or None in their place once the ring is out of free slots"""
+        return [self.free.popleft() if self.free else None for _ in range(count)]
+
+    def give_back(self, slots):
+        self.free.extend(slot for slot in slots if slot is not None)
+
+    def view(self, slot, length):
+        """A view of the image in a slot"""
+        start = slot * self.slot_bytes
+        return self.block.buf[start:start + length]
+
+    def close(self):
+        self.block.close()
+        self.block.unlink()
+
+
+def init_worker(cache_options, ring_name, slot_bytes, min_bytes=DEFAULT_MIN_BYTES):
+    """Pool initializer: the render caches plus the ring"""
+    global _ring
+    qr_batch.init_worker(cache_options)
+    _ring = attach(ring_name), slot_bytes, min_bytes
+
+
+def render_chunk(chunk, options, slots):
+    """Render a chunk (see qr_batch.render_chunk) and move each large enough image into its slot"""
+    block, slot_bytes, min_bytes = _ring
+    results = qr_batch.render_chunk(chunk, options)
+    for i, (result, slot) in enumerate(zip(results, slots)):
+        if slot is not None and result.data is not None and min_bytes <= len(result.data) <= slot_bytes:
+            start = slot * slot_bytes
+            block.buf[start:start + len(result.data)] = result.data
+            results[i] = result._replace(data=(slot, len(result.data))) # A plain tuple pickles fastest
+    return results
+
+
+def render_records(records, options=None, workers=2, chunk_size=64, max_in_flight=None, ordered=True,
+                   cache_options=None, slot_bytes=DEFAULT_SLOT_BYTES, min_bytes=DEFAULT_MIN_BYTES,
+                   ring_bytes=DEFAULT_RING_BYTES):
+    """
+    Like qr_batch.render_records with workers, but images come back through shared memory.
+    A result's data is then a memoryview that is valid until the next result is
+    requested; copy it (bytes(data)) to keep it longer. Images smaller than min_bytes
+    come back pickled, and the ring holds at most ring_bytes (at least one slot).
+    """
+    options = options or {}
+    max_in_flight = max_in_flight or workers * 4
+    ring = SlotRing(max(1, min(max_in_flight * chunk_size, ring_bytes // slot_bytes)), slot_bytes)
+
+    def deliver(future, slots):
+        for result in future.result():
+            if type(result.data) is tuple:
+                view = ring.view(*result.data)
+                try:
+                    yield result._replace(data=view)
+                finally:
+                    view.release()
+            else:
+                yield result
+        ring.give_back(slots)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(cache_options, ring.name, slot_bytes, min_bytes)) as pool:
+            pending = collections.deque() if ordered else {}
+            for chunk in qr_batch.iter_chunks(enumerate(records, 1), chunk_size):
+                slots = ring.take(len(chunk))
+                future = pool.submit(render_chunk, chunk, options, slots)
+                if ordered:
+                    pending.append((future, slots))
+                    if len(pending) >= max_in_flight:
+                        yield from deliver(*pending.popleft())
+                    continue
+                pending[future] = slots
+                if len(pending) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from deliver(future, pending.pop(future))
+            while pending:
+                if ordered:
+                    yield from deliver(*pending.popleft())
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from deliver(future, pending.pop(future))
+    finally:
+        ring.close()
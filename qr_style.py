@@ -0,0 +1,294 @@
+# Named style presets: colors, error correction, box size, border and an optional logo in the
+# center of the code, kept in a JSON file in the user's config directory so the app and the
+# batch CLI share them. The app also keeps the last style used there between sessions.
+#
+# A logo is scaled once per logo file and code size and kept, with the alpha mask of its
+# plate, in a per-process cache; drawing it on each code is then a single paste. A logo hides
+# part of the code, so the error correction level is raised until it can recover the hidden
+# modules.
+#
+# Usage:
+#   python qr_style.py save acme --fill "#003366" --back white --logo acme.png
+#   python qr_style.py list
+#   python qr_batch.py employees.csv -o badges/ --preset acme
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+
+import qr_engine
+
+# The settings a preset holds, with their defaults
+DEFAULT_STYLE = {
+    "fill": qr_engine.DEFAULT_COLORS["fill"],
+    "back": qr_engine.DEFAULT_COLORS["back"],
+    "error_correction": "M",
+    "box_size": qr_engine.DEFAULT_BOX_SIZE,
+    "border": qr_engine.DEFAULT_BORDER,
+    "logo": None,
+    "logo_scale": 0.2, # Width of the logo's plate, as a fraction of the code's width
+}
+
+# Share of the codewords each error correction level can recover
+RECOVERY = {"L": 0.07, "M": 0.15, "Q": 0.25, "H": 0.30}
+
+# A hidden area cuts through more codewords than its share of the modules (codewords are
+# 2x4 blocks, and the plate's edges split them), and about half of the recovery should be
+# left for wear and bad prints, so four times its share must be recoverable. Over all 40
+# versions the plate then takes at most 83% of any block's recovery (version 1), and at
+# most half of it for most versions.
+LOGO_SAFETY = 4.0
+
+# Largest logo plate that level H can still recover with that margin
+MAX_LOGO_SCALE = 0.27
+
+PRESETS_ENV = "QR_PRESETS"
+
+
+# --- Presets on disk ---
+
+def config_dir():
+    """The per-user settings directory (APPDATA on Windows, XDG_CONFIG_HOME or ~/.config elsewhere)"""
+    if sys.platform == "win32" and os.environ.get("APPDATA"):
+        base = os.environ["APPDATA"]
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "qr_code_generator")
+
+
+def default_path():
+    """The presets file: $QR_PRESETS if set, else presets.json in config_dir()"""
+    return os.environ.get(PRESETS_ENV) or os.path.join(config_dir(), "presets.json")
+
+
+def normalize_style(style):
+    """Return a complete, checked copy of a style; raises ValueError for bad settings"""
+    unknown = set(style) - set(DEFAULT_STYLE)
+    if unknown:
+        raise ValueError(f"Unknown style settings: {', '.join(sorted(unknown))}")
+    style = dict(DEFAULT_STYLE, **style)
+    if style["error_correction"] not in RECOVERY:
+        raise ValueError(f"Invalid error correction level {style['error_correction']!r}: expected L, M, Q or H")
+    style["box_size"], style["border"] = int(style["box_size"]), int(style["border"])
+    if style["box_size"] < 1 or style["border"] < 0:
+        raise ValueError("The box size must be at least 1 and the border at least 0")
+    style["logo_scale"] = float(style["logo_scale"])
+    if not 0 < style["logo_scale"] <= MAX_LOGO_SCALE:
+        raise ValueError(f"The logo scale must be above 0 and at most {MAX_LOGO_SCALE}")
+    if style["logo"]:
+        style["logo"] = os.path.abspath(os.path.expanduser(style["logo"]))
+    else:
+        style["logo"] = None
+    return style
+
+
+class PresetStore:
+    """
+    The presets file: {"presets": {name: style}, "last": style}. Every change is written
+    straight away, atomically, so a crash never leaves a half-written file.
+    """
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self.data = {"presets": {}, "last": None}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.data.update(json.load(f))
+        except FileNotFoundError:
+            pass
+
+    def names(self):
+        return sorted(self.data["presets"], key=str.lower)
+
+    def get(self, name):
+        """Return the style of a preset; raises KeyError for unknown names"""
+        try:
+            return normalize_style(self.data["presets"][name])
+        except KeyError:
+            raise KeyError(f"No style preset named {name!r} in {self.path}") from None
+
+    def save(self, name, style):
+        if not name or not name.strip():
+            raise ValueError("A preset needs a name")
+        self.data["presets"][name.strip()] = normalize_style(style)
+        self._write()
+
+    def delete(self, name):
+        if self.data["presets"].pop(name, None) is not None:
+            self._write()
+
+    def last(self):
+        """The style the app was closed with, or the defaults"""
+        try:
+            return normalize_style(self.data["last"] or {})
+        except ValueError:
+            return dict(DEFAULT_STYLE)
+
+    def remember(self, style):
+        style = normalize_style(style)
+        if style != self.data["last"]:
+            self.data["last"] = style
+            self._write()
+
+    def _write(self):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def render_options(style):
+    """The qr_batch render options of a style"""
+    style = normalize_style(style)
+    options = {
+        'colors': {"fill": style["fill"], "back": style["back"]},
+        'error_correction': qr_engine.ERROR_CORRECTION_LEVELS[style["error_correction"]],
+        'box_size': style["box_size"],
+        'border': style["border"],
+    }
+    if style["logo"]:
+        options['logo'] = style["logo"]
+        options['logo_scale'] = style["logo_scale"]
+    return options
+
+
+# --- Logos ---
+
+def logo_error_correction(error_correction, logo_scale=DEFAULT_STYLE["logo_scale"]):
+    """Return the error correction constant to use under a logo: at least error_correction"""
+    levels = {constant: level for level, constant in qr_engine.ERROR_CORRECTION_LEVELS.items()}
+    needed = logo_scale ** 2 * LOGO_SAFETY
+    for level in sorted(RECOVERY, key=RECOVERY.get):
+        if RECOVERY[level] >= max(needed, RECOVERY[levels[error_correction]]):
+            return qr_engine.ERROR_CORRECTION_LEVELS[level]
+    raise ValueError(f"A logo scale of {logo_scale} hides more than error correction can recover")
+
+
+def logo_key(logo, logo_scale=DEFAULT_STYLE["logo_scale"]):
+    """What identifies a logo in cache keys: its path, modification time and size, and the scale"""
+    stat = os.stat(logo)
+    return [os.path.abspath(logo), stat.st_mtime_ns, stat.st_size, float(logo_scale)]
+
+
+@functools.lru_cache(maxsize=8)
+def load_logo(path, mtime_ns):
+    """Decode a logo file once (per modification time) as RGBA"""
+    from PIL import Image
+    with Image.open(path) as image:
+        return image.convert("RGBA")
+
+
+def back_color(colors):
+    """The background of the code as an RGBA tuple"""
+    from PIL import ImageColor
+    back = colors["back"]
+    if isinstance(back, str):
+        return (0, 0, 0, 0) if back.lower() == "transparent" else ImageColor.getcolor(back, "RGBA")
+    return tuple(back) + (255,) * (4 - len(back))
+
+
+def plate_geometry(modules, box_size, border, logo_scale):
+    """Return (offset, side) in pixels of the logo's plate: whole modules, centered on the code"""
+    plate = int(modules * logo_scale)
+    if plate % 2 != modules % 2:
+        plate -= 1 # Same parity as the code, so the plate sits on the module grid
+    plate = max(3, plate)
+    return (border + (modules - plate) // 2) * box_size, plate * box_size
+
+
+@functools.lru_cache(maxsize=64)
+def logo_overlay(path, mtime_ns, logo_scale, modules, box_size, back, mode):
+    """
+    Return (overlay, mask) for a code of `modules` modules: the logo scaled to fit its plate
+    with one module of margin, on the background color, and the plate's rounded-corner mask.
+    Cached, so each logo and code size is only scaled once.
+    """
+    from PIL import Image, ImageDraw
+    logo = load_logo(path, mtime_ns)
+    _, side = plate_geometry(modules, box_size, 0, logo_scale)
+    inner = side - 2 * box_size
+    ratio = min(inner / logo.width, inner / logo.height)
+    scaled = logo.resize((max(1, round(logo.width * ratio)), max(1, round(logo.height * ratio))),
+                         Image.Resampling.LANCZOS)
+    overlay = Image.new("RGBA", (side, side), back)
+    overlay.alpha_composite(scaled, ((side - scaled.width) // 2, (side - scaled.height) // 2))
+    mask = Image.new("L", (side, side), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, side - 1, side - 1), radius=box_size, fill=255)
+    return overlay.convert(mode), mask
+
+
+def apply_logo(image, matrix, colors, box_size, border, logo, logo_scale=DEFAULT_STYLE["logo_scale"]):
+    """
+    Paste the logo in the center of a rasterized code and return the image, which is
+    converted to RGB (RGBA for a transparent background) first if needed.
+    """
+    if image.mode in ("1", "L", "P"):
+        rgba = image.mode == "P" and image.palette.mode == "RGBA"
+        image = image.convert("RGBA" if rgba else "RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+    mtime_ns = os.stat(logo).st_mtime_ns
+    overlay, mask = logo_overlay(os.path.abspath(logo), mtime_ns, float(logo_scale), matrix.size, box_size,
+                                 back_color(colors), image.mode)
+    offset, _ = plate_geometry(matrix.size, box_size, border, logo_scale)
+    image.paste(overlay, (offset, offset), mask)
+    return image
+
+
+# --- Command line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the style presets shared by the app and qr_batch.py.")
+    parser.add_argument('--presets', help=f"presets file (default: ${PRESETS_ENV} or {default_path()})")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="list the presets")
+    show = commands.add_parser('show', help="print a preset as JSON")
+    show.add_argument('name')
+    save = commands.add_parser('save', help="create or replace a preset")
+    save.add_argument('name')
+    save.add_argument('--fill', default=DEFAULT_STYLE["fill"], help="QR code color")
+    save.add_argument('--back', default=DEFAULT_STYLE["back"], help="background color")
+    save.add_argument('--error-correction', choices=sorted(RECOVERY), default=DEFAULT_STYLE["error_correction"],
+                      help="raised automatically when there is a logo")
+    save.add_argument('--box-size', type=int, default=DEFAULT_STYLE["box_size"])
+    save.add_argument('--border', type=int, default=DEFAULT_STYLE["border"])
+    save.add_argument('--logo', help="image drawn in the center of the code")
+    save.add_argument('--logo-scale', type=float, default=DEFAULT_STYLE["logo_scale"],
+                      help=f"width of the logo's plate as a fraction of the code (default: 0.2, "
+                           f"at most {MAX_LOGO_SCALE})")
+    delete = commands.add_parser('delete', help="remove a preset")
+    delete.add_argument('name')
+    args = parser.parse_args(argv)
+
+    store = PresetStore(args.presets)
+    try:
+        if args.command == 'list':
+            for name in store.names():
+                style = store.get(name)
+                logo = f", logo {style['logo']}" if style["logo"] else ""
+                print(f"{name}: {style['fill']} on {style['back']}, level {style['error_correction']}, "
+                      f"box {style['box_size']}, border {style['border']}{logo}")
+        elif args.command == 'show':
+            print(json.dumps(store.get(args.name), indent=2, ensure_ascii=False))
+        elif args.command == 'save':
+            if args.logo and not os.path.isfile(args.logo):
+                parser.error(f"Logo file not found: {args.logo}")
+            store.save(args.name, {key: getattr(args, key) for key in DEFAULT_STYLE})
+            print(f"Preset {args.name!r} saved to {store.path}")
+        else:
+            store.delete(args.name)
+    except (KeyError, ValueError) as e:
+        print(e.args[0], file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# Bulk validation: checks records a column at a time instead of one record at a time.
+#
+# qr_engine.normalize_record() validates a single record and is what the app uses. For
+# imports of many rows this module turns a block of records into columns and runs each
+# check over a whole column with the precompiled patterns, collecting every error of
+# every record instead of stopping at the first one. Valid records come out exactly as
+# normalize_record() would return them.
+#
+# Usage:
+#   python qr_validate.py employees.csv [--report errors.jsonl]
+import argparse
+import collections
+import itertools
+import json
+import sys
+import time
+
+import qr_engine
+
+# One problem with one field of one record
+FieldError = collections.namedtuple('FieldError', 'index field message value')
+
+MESSAGES = dict(qr_engine.FIELD_ERRORS)
+
+# Records per column pass. In benchmarks/bench_validate.py the column passes are 1.05-1.2x
+# as fast as record-at-a-time validation with blocks of 64 to 512 records. With 4096-record
+# blocks they break even, and with 20000-record blocks they reach only 0.88x, because the
+# columns no longer fit in the CPU cache.
+BLOCK_SIZE = 512
+
+
+def column(records, key):
+    """Return the stripped string values of one field across all records"""
+    return [str(record.get(key) or '').strip() for record in records]
+
+
+def validate_phones(values):
+    """Normalize a column of phone numbers; invalid numbers become None, empty ones ""."""
+    strip, match = qr_engine.PHONE_STRIP_RE.sub, qr_engine.PHONE_RE.match
+    return [phone if phone and match(phone) else (None if value else '')
+            for value, phone in zip(values, [strip('', value) for value in values])]
+
+
+def validate_emails(values):
+    """Check a column of email addresses; invalid ones become None, empty ones ""."""
+    match = qr_engine.EMAIL_RE.match
+    return [email if not email or match(email) else None for email in values]
+
+
+def validate_urls(values, platform=""):
+    """Add the scheme (or the platform's profile prefix) to a column of URLs"""
+    prefix = qr_engine.URL_PREFIXES.get(platform, "https://")
+    return [url if not url or url.startswith(('http://', 'https://')) else prefix + url for url in values]
+
+
+def validate_columns(records, first_index=1, block_size=BLOCK_SIZE):
+    """
+    Validate a list of records column by column.
+    Returns (user_infos, errors): user_infos has the normalized record, or None for invalid
+    records; errors is a list of FieldError, indexed from first_index. Longer lists are
+    validated block_size records at a time.
+    """
+    if len(records) > block_size:
+        user_infos, errors = [], []
+        for start in range(0, len(records), block_size):
+            block_infos, block_errors = validate_columns(records[start:start + block_size], first_index + start,
+                                                         block_size)
+            user_infos.extend(block_infos)
+            errors.extend(block_errors)
+        return user_infos, errors
+    columns = {key: column(records, key) for key in qr_engine.RECORD_FIELDS}
+    checked = {
+        'phone': validate_phones(columns['phone']),
+        'whatsapp': validate_phones(columns['whatsapp']),
+        'email': validate_emails(columns['email']),
+        'website': validate_urls(columns['website']),
+        'facebook': validate_urls(columns['facebook'], 'facebook'),
+        'linkedin': validate_urls(columns['linkedin'], 'linkedin'),
+    }
+
+    failed = [False] * len(records)
+    errors = []
+    for i, name in enumerate(columns['name']):
+        if not name:
+            failed[i] = True
+            errors.append(FieldError(first_index + i, 'name', MESSAGES['name'], name))
+    for key in ('phone', 'whatsapp', 'email'):
+        for i, value in enumerate(checked[key]):
+            if value is None:
+                failed[i] = True
+                errors.append(FieldError(first_index + i, key, MESSAGES[key], columns[key][i]))
+    # Report each record's problems together, in the order the form checks them
+    errors.sort(key=lambda error: error.index)
+
+    # Put the records back together from the normalized columns
+    keys = qr_engine.RECORD_FIELDS + ('custom_fields',)
+    custom_fields = [{str(k).strip(): str(v).strip() for k, v in (record.get('custom_fields') or {}).items()
+                      if str(v or '').strip()} for record in records]
+    rows = zip(*[checked.get(key, columns[key]) for key in qr_engine.RECORD_FIELDS], custom_fields)
+    user_infos = [None if bad else dict(zip(keys, row)) for bad, row in zip(failed, rows)]
+    return user_infos, errors
+
+
+def iter_validated(records, block_size=BLOCK_SIZE):
+    """
+    Validate a stream of records in blocks. Yields (index, record, user_info, errors) for
+    every record, where errors lists the record's FieldErrors (empty when it is valid).
+    """
+    iterator = iter(records)
+    first_index = 1
+    while True:
+        block = list(itertools.islice(iterator, block_size))
+        if not block:
+            return
+        user_infos, errors = validate_columns(block, first_index, block_size)
+        by_index = collections.defaultdict(list)
+        for error in errors:
+            by_index[error.index].append(error)
+        for i, (record, user_info) in enumerate(zip(block, user_infos)):
+            yield first_index + i, record, user_info, by_index.get(first_index + i, [])
+        first_index += len(block)
+
+
+def main(argv=None):
+    import qr_batch
+
+    parser = argparse.ArgumentParser(description="Validate a CSV or JSONL file of records without rendering.")
+    parser.add_argument('input', help="input .csv or .jsonl file")
+    parser.add_argument('--report', help="write every invalid field to this JSON-lines file")
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE,
+                        help=f"records read and validated together (default: {BLOCK_SIZE})")
+    args = parser.parse_args(argv)
+
+    counts = collections.Counter()
+    report = open(args.report, 'w', encoding='utf-8') if args.report else None
+    start = time.perf_counter()
+    try:
+        for index, record, user_info, errors in iter_validated(qr_batch.iter_records(args.input), args.block_size):
+            counts["records"] += 1
+            if not errors:
+                continue
+            counts["invalid"] += 1
+            rid = qr_batch.record_id(record, index)
+            for error in errors:
+                counts[error.field] += 1
+                if report:
+                    report.write(json.dumps(dict(error._asdict(), record_id=rid)) + '\n')
+    finally:
+        if report:
+            report.close()
+    elapsed = time.perf_counter() - start
+
+    rate = counts["records"] / elapsed if elapsed else 0
+    print(f"{counts['records']} records, {counts['invalid']} invalid ({rate:,.0f} records/s)")
+    for key, _ in qr_engine.FIELD_ERRORS:
+        if counts[key]:
+            print(f"  {key}: {counts[key]}")
+    return 1 if counts["invalid"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
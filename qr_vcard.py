@@ -0,0 +1,210 @@
+# vCard 4.0 (RFC 6350) payloads: escaped values, folded lines and CRLF line ends, built one
+# card at a time. A vCard file may hold several cards, so a batch can also be packed into
+# fewer QR codes: cards are grouped, in input order, into payloads that fit a byte budget
+# (by default the byte capacity of --max-version at the chosen error correction level).
+#
+# Usage:
+#   python qr_vcard.py employees.csv -o contacts/ --max-version 25 --error-correction M
+#   python qr_batch.py employees.csv -o badges/ --format vcard4   (one vCard 4.0 per code)
+import argparse
+import collections
+import itertools
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import qr_archive
+import qr_batch
+import qr_engine
+import qr_validate
+import qr_vector
+
+# Content lines longer than this many octets are folded
+FOLD_OCTETS = 75
+
+# One QR code's worth of cards: the record ids, the payload and its size in bytes
+Pack = collections.namedtuple('Pack', 'record_ids payload size')
+
+
+def escape(value):
+    """Escape a text value: backslash, comma, semicolon and line breaks"""
+    return value.replace('\\', '\\\\').replace(',', '\\,').replace(';', '\\;') \
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+
+
+def param_value(value):
+    """Encode a parameter value with RFC 6868 caret escapes, quoted if it holds : ; or ,"""
+    value = value.replace('^', '^^').replace('\r\n', '^n').replace('\n', '^n').replace('"', "^'")
+    if any(c in value for c in ':;,'):
+        return f'"{value}"'
+    return value
+
+
+def fold(line):
+    """Fold a content line into pieces of at most FOLD_OCTETS octets, never inside a UTF-8 character"""
+    data = line.encode('utf-8')
+    if len(data) <= FOLD_OCTETS:
+        return line
+    pieces = []
+    start, limit = 0, FOLD_OCTETS
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and data[end] & 0xC0 == 0x80: # Continuation byte
+            end -= 1
+        pieces.append(data[start:end].decode('utf-8'))
+        start, limit = end, FOLD_OCTETS - 1 # Continuation lines start with a space
+    return '\r\n '.join(pieces)
+
+
+def card_lines(user_info):
+    """Yield the unfolded content lines of one card"""
+    yield 'BEGIN:VCARD'
+    yield 'VERSION:4.0'
+    if user_info['name']:
+        yield f"FN:{escape(user_info['name'])}"
+        yield f"N:{escape(user_info['name'])};;;;"
+    if user_info['job_title']: yield f"TITLE:{escape(user_info['job_title'])}"
+    if user_info['company']: yield f"ORG:{escape(user_info['company'])}"
+    if user_info['phone']: yield f"TEL;VALUE=uri:tel:{user_info['phone']}"
+    if user_info['whatsapp']: yield f"TEL;TYPE=whatsapp;VALUE=uri:tel:+{user_info['whatsapp'].lstrip('+')}"
+    if user_info['email']: yield f"EMAIL:{escape(user_info['email'])}"
+    if user_info['address']: yield f"ADR:;;{escape(user_info['address'])};;;;"
+    # URIs are not text values, so they are not escaped
+    if user_info['website']: yield f"URL:{user_info['website']}"
+    if user_info['facebook']: yield f"X-SOCIALPROFILE;TYPE=facebook:{user_info['facebook']}"
+    if user_info['linkedin']: yield f"X-SOCIALPROFILE;TYPE=linkedin:{user_info['linkedin']}"
+    for name, value in user_info.get('custom_fields', {}).items():
+        yield f"X-CUSTOM;TYPE={param_value(name)}:{escape(value)}"
+    yield 'END:VCARD'
+
+
+def create_vcard4_format(user_info):
+    """Create one vCard 4.0 card"""
+    return ''.join(fold(line) + '\r\n' for line in card_lines(user_info))
+
+
+def capacity(version, error_correction=qr_engine.DEFAULT_ERROR_CORRECTION):
+    """Bytes of byte-mode data a QR code of this version and error correction level holds"""
+    from qrcode import util
+    bits = util.BIT_LIMIT_TABLE[int(error_correction)][version]
+    return (bits - 4 - util.length_in_bits(util.MODE_8BIT_BYTE, version)) // 8
+
+
+def pack_cards(cards, budget, reject=None):
+    """
+    Group (record_id, card) pairs, in order, into Packs of at most budget bytes. Only the
+    current pack is held in memory. A card larger than the budget on its own is left out
+    and passed to reject(record_id, size).
+    """
+    ids, parts, size = [], [], 0
+    for rid, card in cards:
+        length = len(card.encode('utf-8'))
+        if length > budget:
+            if reject is not None:
+                reject(rid, length)
+            continue
+        if parts and size + length > budget:
+            yield Pack(ids, ''.join(parts), size)
+            ids, parts, size = [], [], 0
+        ids.append(rid)
+        parts.append(card)
+        size += length
+    if parts:
+        yield Pack(ids, ''.join(parts), size)
+
+
+def render_pack(payload, style):
+    """Worker entry point: render a packed payload, returning (data, version, error)"""
+    try:
+        data, _, version = qr_batch.render_payload(payload, **style)
+    except Exception as e:
+        return None, None, str(e)
+    return data, version, None
+
+
+def run_packed(path, output, budget, style, workers=1, max_in_flight=None):
+    """
+    Pack the valid records of the input file into as few QR codes as the budget allows
+    and write them to output (a directory or archive, see qr_archive.open_sink).
+    Cards larger than the budget and packs that fail to render are reported on stderr
+    and skipped. Returns a dictionary of counters (records, codes, oversized, failed).
+    """
+    stats = {"records": 0, "codes": 0, "oversized": 0, "failed": 0}
+    image_format = style.get('image_format', 'png')
+
+    def cards():
+        for index, record, user_info, errors in qr_validate.iter_validated(qr_batch.iter_records(path)):
+            rid = qr_batch.record_id(record, index)
+            if errors:
+                stats["failed"] += 1
+                print(f"record {rid}: {' '.join(error.message for error in errors)}", file=sys.stderr)
+                continue
+            yield rid, create_vcard4_format(user_info)
+
+    def reject(rid, size):
+        stats["oversized"] += 1
+        print(f"record {rid}: card is larger than the budget ({size} > {budget} bytes)", file=sys.stderr)
+
+    def write(sink, pack, data, version, error):
+        if error is not None:
+            stats["failed"] += len(pack.record_ids)
+            first, last = pack.record_ids[0], pack.record_ids[-1]
+            print(f"records {first}..{last}: {error}" if first != last else f"record {first}: {error}",
+                  file=sys.stderr)
+            return
+        stats["codes"] += 1
+        stats["records"] += len(pack.record_ids)
+        sink.write(pack.record_ids, f"contacts-{stats['codes']:05d}.{image_format}", data,
+                   qr_engine.payload_hash(pack.payload), version)
+
+    packs = pack_cards(cards(), budget, reject)
+    with qr_archive.open_sink(output) as sink:
+        if workers <= 1:
+            for pack in packs:
+                write(sink, pack, *render_pack(pack.payload, style))
+            return stats
+        # Like qr_batch.render_records: bounded submission, results written in order
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = collections.deque()
+            for pack in itertools.chain(packs, [None]):
+                if pack is not None:
+                    pending.append((pack, pool.submit(render_pack, pack.payload, style)))
+                while pending and (pack is None or len(pending) >= (max_in_flight or workers * 4)):
+                    done, future = pending.popleft()
+                    write(sink, done, *future.result())
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack the contacts of a CSV or JSONL file into as few "
+                                                 "vCard 4.0 QR codes as possible.")
+    parser.add_argument('input', help="input .csv or .jsonl file")
+    parser.add_argument('-o', '--output', default='contacts', help="output directory or .zip/.tar archive")
+    parser.add_argument('--error-correction', choices=sorted(qr_engine.ERROR_CORRECTION_LEVELS), default='M')
+    parser.add_argument('--max-version', type=int, default=25,
+                        help="largest QR version to fill (default: 25, still easy to scan when printed)")
+    parser.add_argument('--max-bytes', type=int, help="byte budget per code (default: the capacity of --max-version)")
+    parser.add_argument('--fill', default=qr_engine.DEFAULT_COLORS['fill'], help="QR code color")
+    parser.add_argument('--back', default=qr_engine.DEFAULT_COLORS['back'], help="background color")
+    parser.add_argument('--box-size', type=int, default=qr_engine.DEFAULT_BOX_SIZE)
+    parser.add_argument('--border', type=int, default=qr_engine.DEFAULT_BORDER)
+    parser.add_argument('--output-format', dest='image_format', choices=('png',) + qr_vector.FORMATS,
+                        default='png')
+    parser.add_argument('--workers', type=int, default=1, help="number of worker processes (default: 1)")
+    args = parser.parse_args(argv)
+    if not 1 <= args.max_version <= 40:
+        parser.error("--max-version must be between 1 and 40")
+
+    error_correction = qr_engine.ERROR_CORRECTION_LEVELS[args.error_correction]
+    budget = capacity(args.max_version, error_correction)
+    if args.max_bytes:
+        budget = min(budget, args.max_bytes)
+    style = {'colors': {"fill": args.fill, "back": args.back}, 'error_correction': error_correction,
+             'box_size': args.box_size, 'border': args.border, 'image_format': args.image_format}
+    stats = run_packed(args.input, args.output, budget, style, args.workers)
+    print(f"{stats['records']} contacts packed into {stats['codes']} QR codes of up to {budget} bytes "
+          f"in {args.output}, {stats['oversized']} too large, {stats['failed']} failed")
+    return 1 if stats['failed'] or stats['oversized'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
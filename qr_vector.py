@@ -0,0 +1,168 @@
+# Vector output: SVG and PDF written straight from the module matrix, with no raster image.
+# Each run of adjacent dark modules in a row becomes one rectangle of a single path, so file
+# size and rendering time grow with the number of modules, not the number of pixels.
+# Sizes follow the PNG output: a module is box_size pixels wide (PDF: points, at 72 dpi).
+import io
+import re
+import zlib
+
+import qr_engine
+
+FORMATS = ('svg', 'pdf')
+
+DARK_RUN_RE = re.compile(b'\x01+')
+
+
+def dark_runs(matrix):
+    """Yield (row, column, length) for every horizontal run of dark modules"""
+    for r, row in enumerate(matrix.modules):
+        for run in DARK_RUN_RE.finditer(bytes(row)):
+            yield r, run.start(), run.end() - run.start()
+
+
+def color_components(color):
+    """Return (r, g, b, a) for a color name, hex string or tuple, as PIL understands them"""
+    if isinstance(color, str):
+        if color.lower() == "transparent":
+            return 0, 0, 0, 0
+        from PIL import ImageColor
+        return ImageColor.getcolor(color, "RGBA")
+    return tuple(color) + (255,) * (4 - len(color))
+
+
+# --- SVG ---
+
+def svg_paint(attribute, color):
+    """Return the fill attribute(s) for a color, with an opacity when it is translucent"""
+    r, g, b, a = color_components(color)
+    paint = f'{attribute}="#{r:02x}{g:02x}{b:02x}"'
+    if a < 255:
+        paint += f' {attribute}-opacity="{a / 255:.3g}"'
+    return paint
+
+
+def svg_path(matrix, border):
+    """
+    Path data with one rectangle per run. Each rectangle starts with a move relative to the
+    previous one (closing a subpath returns to its start), which keeps the numbers short.
+    """
+    commands = []
+    x = y = 0
+    for r, c, n in dark_runs(matrix):
+        commands.append(f"m{c + border - x} {r + border - y}h{n}v1h-{n}z")
+        x, y = c + border, r + border
+    return ''.join(commands)
+
+
+def to_svg(matrix, colors=None, box_size=qr_engine.DEFAULT_BOX_SIZE, border=qr_engine.DEFAULT_BORDER):
+    """Return the QR code as SVG bytes. Coordinates are in modules; width/height in pixels."""
+    colors = colors or qr_engine.DEFAULT_COLORS
+    side = matrix.size + 2 * border
+    pixels = side * box_size
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+             f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+             f'viewBox="0 0 {side} {side}" shape-rendering="crispEdges">\n']
+    if color_components(colors["back"])[3]:
+        parts.append(f'<rect width="{side}" height="{side}" {svg_paint("fill", colors["back"])}/>\n')
+    parts.append(f'<path {svg_paint("fill", colors["fill"])} d="{svg_path(matrix, border)}"/>\n</svg>\n')
+    return ''.join(parts).encode('utf-8')
+
+
+# --- PDF ---
+
+def pdf_rgb(color):
+    r, g, b, _ = color_components(color)
+    return ' '.join(f"{v / 255:.4g}" for v in (r, g, b))
+
+
+def pdf_code_ops(matrix, colors, border, x, top, module):
+    """
+    Return the PDF drawing operators for one code whose top-left corner is at (x, top)
+    in points (PDF's y axis points up), module points per module.
+    """
+    side = matrix.size + 2 * border
+    # Flip the y axis and scale, so the code is drawn in module coordinates
+    ops = [f"q {module:g} 0 0 {-module:g} {x:g} {top:g} cm"]
+    if color_components(colors["back"])[3]:
+        ops.append(f"{pdf_rgb(colors['back'])} rg 0 0 {side} {side} re f")
+    ops.append(f"{pdf_rgb(colors['fill'])} rg")
+    ops.extend(f"{c + border} {r + border} {n} 1 re" for r, c, n in dark_runs(matrix))
+    ops.append("f Q\n")
+    return '\n'.join(ops).encode('ascii')
+
+
+class PDFWriter:
+    """
+    Minimal PDF writer that streams pages to a binary file object as they are added;
+    only the page tree, which is small, is written at the end. Use as a context manager.
+    """
+    CATALOG_ID, PAGES_ID = 1, 2
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.position = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.fp.write(data)
+        self.position += len(data)
+
+    def _object(self, obj_id, body):
+        self.offsets[obj_id] = self.position
+        self._write(b"%d 0 obj\n" % obj_id + body + b"\nendobj\n")
+
+    def add_page(self, width, height, content, resources="<< >>"):
+        """Add a page of the given size in points, drawn by the content operators (bytes)"""
+        page_id, content_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(page_id, f"<< /Type /Page /Parent {self.PAGES_ID} 0 R /MediaBox [0 0 {width:g} {height:g}] "
+                              f"/Contents {content_id} 0 R /Resources {resources} >>".encode('ascii'))
+        data = zlib.compress(content)
+        self._object(content_id, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data +
+                     b"\nendstream")
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = ' '.join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._object(self.PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode('ascii'))
+        self._object(self.CATALOG_ID, f"<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>".encode('ascii'))
+        xref = self.position
+        lines = [f"xref\n0 {self.next_id}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{self.offsets[obj_id]:010d} 00000 n \n" for obj_id in range(1, self.next_id))
+        lines.append(f"trailer\n<< /Size {self.next_id} /Root {self.CATALOG_ID} 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self._write(''.join(lines).encode('ascii'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def to_pdf(matrix, colors=None, box_size=qr_engine.DEFAULT_BOX_SIZE, border=qr_engine.DEFAULT_BORDER):
+    """Return the QR code as a one-page PDF (bytes), box_size points per module"""
+    colors = colors or qr_engine.DEFAULT_COLORS
+    size = (matrix.size + 2 * border) * box_size
+    buffer = io.BytesIO()
+    with PDFWriter(buffer) as pdf:
+        pdf.add_page(size, size, pdf_code_ops(matrix, colors, border, 0, size, box_size))
+    return buffer.getvalue()
+
+
+def render(matrix, image_format, colors=None, box_size=qr_engine.DEFAULT_BOX_SIZE, border=qr_engine.DEFAULT_BORDER):
+    """Return the QR code as "svg" or "pdf" bytes"""
+    if image_format == "svg":
+        return to_svg(matrix, colors, box_size, border)
+    if image_format == "pdf":
+        return to_pdf(matrix, colors, box_size, border)
+    raise ValueError(f"Unknown vector format: {image_format}")
+
+
+def side_modules(data, image_format, box_size):
+    """Read the side length in modules (border included) back from rendered SVG/PDF bytes"""
+    if image_format == "svg":
+        return int(re.search(rb'viewBox="0 0 (\d+)', data).group(1))
+    return round(float(re.search(rb'/MediaBox \[0 0 ([\d.]+)', data).group(1)) / box_size)